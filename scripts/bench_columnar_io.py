@@ -0,0 +1,66 @@
+"""
+Benchmark: CSV vs Parquet / Feather survey I/O
+----------------------------------------------
+مقارنة أداء القراءة والكتابة والذاكرة بين الصيغ
+
+Replicates a seeded export to the requested row counts, then compares
+plain CSV (default pandas dtypes) with Parquet and Feather holding
+categorical answer columns and compact integer item columns.
+
+Usage / الاستخدام:
+  pip install pandas numpy pyarrow
+  python bench_columnar_io.py --input realistic_seeded_data.csv --rows 100000 1000000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from survey_io import categorize, compact_numeric, read_table, write_table
+from survey_schema import load_schema, resolve_column_bounds
+
+def replicate(df, n_rows):
+    reps = -(-n_rows // len(df))
+    return pd.concat([df] * reps, ignore_index=True).iloc[:n_rows].reset_index(drop=True)
+
+def compact(df, schema):
+    """The dtypes clean_survey_data.py writes: categories plus compact item columns."""
+    items = list(resolve_column_bounds(df.columns, schema))
+    df = categorize(df.copy(), exclude=items)
+    return compact_numeric(df, items)
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def mb(n_bytes):
+    return n_bytes / 1024 ** 2
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CSV vs columnar survey I/O")
+    parser.add_argument("--input", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "realistic_seeded_data.csv"))
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    seed = pd.read_csv(args.input)
+    schema = load_schema()
+
+    print(f"{'rows':>9} | {'format':>8} | {'write (s)':>9} | {'read (s)':>8} | {'file MB':>8} | {'memory MB':>9}")
+    print("-" * 68)
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.rows:
+            plain = replicate(seed, n)
+            typed = compact(plain, schema)
+            for fmt, frame in (("csv", plain), ("parquet", typed), ("feather", typed)):
+                path = os.path.join(tmp, f"bench.{fmt}")
+                _, t_write = timed(write_table, frame, path)
+                loaded, t_read = timed(read_table, path)
+                memory = loaded.memory_usage(deep=True).sum()
+                print(f"{n:>9} | {fmt:>8} | {t_write:>9.2f} | {t_read:>8.2f} | {mb(os.path.getsize(path)):>8.1f} | {mb(memory):>9.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark: MinHash/LSH vs brute-force Levenshtein near-duplicate detection
+--------------------------------------------------------------------------
+مقارنة أداء كشف النصوص شبه المكررة
+
+Generates synthetic Arabic open-text answers with a controlled share of
+perturbed copies (typos, diacritics, hamza variants, punctuation), then
+times both detectors and reports how closely LSH reproduces the exact
+O(n²) Levenshtein result.
+
+Usage / الاستخدام:
+  pip install pandas numpy python-Levenshtein
+  python bench_near_duplicates.py --sizes 500 1000 2000 --lsh-only-sizes 100000
+"""
+
+import argparse
+import time
+
+import numpy as np
+import Levenshtein
+
+from arabic_text import fold_text
+from near_duplicates import near_duplicate_mask
+
+WORDS = [
+    "أواجه", "صعوبة", "منع", "طفلي", "السكريات", "الوجبات", "السريعة", "ضيق", "الوقت", "تأثير",
+    "الإعلانات", "ارتفاع", "الأسعار", "إقناع", "أطفالي", "الخضروات", "المدرسة", "العمل", "الإفطار",
+    "الحلويات", "المشروبات", "الغازية", "قلة", "الوعي", "الأقارب", "يرفض", "الأكل", "أحتاج",
+    "وصفات", "صحية", "نصائح", "عملية", "الفواكه", "الحليب", "البروتين", "اللحوم", "الأسماك",
+    "البيض", "البقوليات", "الحبوب", "الماء", "العصائر", "النوم", "الرياضة", "الوزن", "الطول",
+    "الطبيب", "الأخصائي", "المنصة", "التطبيق", "القصص", "المقالات", "الجدة", "الجيران", "السوق",
+    "المطبخ", "الثلاجة", "التخزين", "الطهي", "التسوق",
+]
+
+def perturb(text, rng):
+    """Small edit that keeps the answer a near-duplicate of the original."""
+    choice = rng.integers(4)
+    if choice == 0:
+        return text.replace("أ", "ا").replace("ة", "ه")
+    if choice == 1:
+        return text.replace("ي", "يَ", 1) + "!!"
+    if choice == 2:
+        pos = rng.integers(len(text))
+        return text[:pos] + text[pos + 1:]
+    return text + " جدا"
+
+def synthetic_answers(n, dupe_rate=0.2, seed=7):
+    rng = np.random.default_rng(seed)
+    answers = []
+    for _ in range(n):
+        if answers and rng.random() < dupe_rate:
+            answers.append(perturb(answers[rng.integers(len(answers))], rng))
+        else:
+            k = rng.integers(6, 12)
+            answers.append(" ".join(rng.choice(WORDS, size=k, replace=False)))
+    return answers
+
+def brute_force_mask(texts, threshold, min_chars=10):
+    """Reference O(n²) detector: Levenshtein ratio against every earlier answer."""
+    norm = [fold_text(t) for t in texts]
+    flagged = np.zeros(len(texts), dtype=bool)
+    for i in range(len(norm)):
+        if len(norm[i]) <= min_chars:
+            continue
+        for j in range(i):
+            if len(norm[j]) > min_chars and Levenshtein.ratio(norm[i], norm[j]) >= threshold:
+                flagged[i] = True
+                break
+    return flagged
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark near-duplicate open-text detection")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 1000, 2000])
+    parser.add_argument("--lsh-only-sizes", type=int, nargs="*", default=[100_000])
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    print(f"{'rows':>8} | {'brute (s)':>10} | {'lsh (s)':>8} | {'speedup':>8} | {'precision':>9} | {'recall':>6}")
+    print("-" * 64)
+    for n in args.sizes:
+        texts = synthetic_answers(n)
+        exact, t_exact = timed(brute_force_mask, texts, args.threshold)
+        approx, t_lsh = timed(near_duplicate_mask, texts, threshold=args.threshold)
+        tp = int((exact & approx).sum())
+        precision = tp / approx.sum() if approx.sum() else 1.0
+        recall = tp / exact.sum() if exact.sum() else 1.0
+        print(f"{n:>8} | {t_exact:>10.2f} | {t_lsh:>8.3f} | {t_exact / t_lsh:>7.0f}x | {precision:>9.2%} | {recall:>6.2%}")
+
+    for n in args.lsh_only_sizes:
+        texts = synthetic_answers(n)
+        approx, t_lsh = timed(near_duplicate_mask, texts, threshold=args.threshold)
+        print(f"{n:>8} | {'(skipped)':>10} | {t_lsh:>8.3f} | {'':>8} | flagged {int(approx.sum())}")
+
+if __name__ == "__main__":
+    main()
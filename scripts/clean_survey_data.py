@@ -4,150 +4,859 @@ NutriAware Data Quality ETL Pipeline
 مستخرج ومنظف بيانات الاستبيان - NutriAware
 
 Usage / الاستخدام:
-  pip install pandas numpy python-Levenshtein
+  pip install pandas numpy
   python clean_survey_data.py --input raw_data.csv --output cleaned_data.csv
+
+  # Streaming mode for exports that do not fit in memory / وضع التدفق للملفات الكبيرة:
+  python clean_survey_data.py --input raw_data.csv --output cleaned_data.csv --chunksize 200000
+
+  # Parquet / Arrow IPC (Feather) in or out, picked by extension / ملفات عمودية:
+  python clean_survey_data.py --input raw_data.parquet --output cleaned_data.parquet
+
+  # Incremental runs: only rows past the stored timestamp watermark / تشغيل تزايدي:
+  # (imputed demo_education values depend on how the rows were split into runs)
+  python clean_survey_data.py --input raw_data.csv --output cleaned_data.csv --state etl_state.npz
+
+  # Live JSONL submissions in micro-batches (see ingest_daemon.py) / استيعاب مباشر:
+  python ingest_daemon.py --source submissions/ --output cleaned_data.csv
+
+  # Spread the row-local stages over 8 processes (same output as a serial run) / معالجة متوازية:
+  python clean_survey_data.py --input raw_data.csv --output cleaned_data.csv --workers 8
+
+  # Per-stage timings/memory are always in quality_summary.json ("stages"); also / قياس الأداء:
+  python clean_survey_data.py --input raw_data.csv --output cleaned_data.csv --trace etl_trace.json --profile
+
+  # Reject near-duplicate open-text answers (MinHash/LSH) / رفض النصوص شبه المكررة:
+  python clean_survey_data.py --input raw_data.csv --output cleaned_data.csv --near-dup-threshold 0.8
+
+Unchanged input + rules + code restore the previous outputs from the result
+cache (see result_cache.py); --no-cache forces a full run. Incremental
+(--state) runs are never cached. / تُستعاد النتائج من الذاكرة المؤقتة إذا لم يتغير شيء
 """
 
 import pandas as pd
 import numpy as np
-from datetime import datetime
 import json
 import argparse
-import Levenshtein
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from arabic_text import fold_text, normalize_text_columns, open_text_key, text_columns
+from logic_rules import build_logic_rules, rule_violations
+from survey_schema import load_schema, resolve_column_bounds, resolve_column_options
+from near_duplicates import near_duplicate_mask
+from rejection_ledger import RejectionLedger, multi_reason_rows, retag_reasons
+from result_cache import DEFAULT_MAX_MB, ResultCache
+from stage_metrics import StageRecorder
+from survey_io import categorize, compact_numeric, read_table, table_format, write_table
+
+# Columns ignored when looking for exact duplicates / أعمدة مستثناة من فحص التكرار
+DEDUP_EXCLUDE_COLS = ["respondentId", "timestamp"]
+
+# Rejection reasons per stage, in pipeline order / أسباب الرفض حسب المرحلة
+DUPLICATE_REASON = "Exact Duplicate"
+RANGE_REASON = "Out of Range"
+LOGIC_REASON = "Logical Inconsistency"
+TEMPLATE_REASON = "Repeated Open Text Template"
+NEAR_DUPLICATE_REASON = "Near-Duplicate Open Text"
+REJECTION_STAGES = [DUPLICATE_REASON, RANGE_REASON, LOGIC_REASON, TEMPLATE_REASON, NEAR_DUPLICATE_REASON]
+
+DEFAULT_CHUNKSIZE = 100_000
+
+PROFILE_PATH = "etl_profile.prof"
+PROFILE_TOP_N = 25
+
+# Imputation draws are seeded so reruns (and --workers runs) give identical output
+DEFAULT_SEED = 42
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Clean and validate NutriAware survey data")
     parser.add_argument("--input", default="survey_responses_raw.csv", help="Input dataset path")
     parser.add_argument("--output", default="cleaned_dataset.csv", help="Output dataset path")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="Stream the input in chunks of N rows (bounded memory)")
+    parser.add_argument("--schema", default=None, help="Survey schema JSON (defaults to docs/surveySchema.json)")
+    parser.add_argument("--state", default=None,
+                        help="Incremental mode: state file (.npz) carrying the watermark and stage state between runs")
+    parser.add_argument("--near-dup-threshold", type=float, default=None,
+                        help="Reject open-text answers whose MinHash similarity to an earlier answer is >= this (e.g. 0.8)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes for the row-local stages (hashing, normalization, range checks)")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="RNG seed for probabilistic imputation")
+    parser.add_argument("--trace", default=None,
+                        help="Also write per-stage timings as Chrome trace-event JSON (chrome://tracing, Perfetto)")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Record tracemalloc allocation peaks per stage (slower)")
+    parser.add_argument("--no-cache", action="store_true", help="Always recompute; do not read or write the result cache")
+    parser.add_argument("--cache-dir", default=None, help="Result cache directory (default ~/.cache/nutriaware)")
+    parser.add_argument("--cache-max-mb", type=float, default=DEFAULT_MAX_MB,
+                        help="Evict least recently used cache entries beyond this size")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"Run under cProfile, print the top hot spots and save {PROFILE_PATH}")
     return parser.parse_args()
 
-def run_pipeline(input_path, output_path):
+def load_dummy_data(input_path):
+    print(f"⚠️ Input file {input_path} not found. Creating a dummy file to demonstrate the pipeline.")
+    df = pd.DataFrame({
+        "respondentId": ["R1", "R2", "R3", "R4", "R5"],
+        "timestamp": ["2026-02-24T10:00:00Z"] * 5,
+        "demo_parentAge": [35, 35, 99, 25, 35],
+        "demo_relationship": ["أم", "أم ", "أب", "أخ", "أم"],
+        "demo_education": ["جامعي", "جامعي", "ابتدائي", "ثانوي", "جامعي"],
+        "health_gender": ["ذكر", "ذكر", "أنثى", "ذكر", "ذكر"],
+        "nps_score": [10, 10, 15, -1, None],
+        "open_challenges": ["لا يوجد", "لا يوجد", "صعوبة في التنوع", "الوقت", "لايوجد"]
+    })
+    input_path = "dummy_data.csv"
+    df.to_csv(input_path, index=False)
+    print("✅ Dummy file created for demonstration.\n")
+    return df, input_path
+
+def dedup_columns(columns):
+    return [c for c in columns if c not in DEDUP_EXCLUDE_COLS]
+
+def row_hashes(df, cols):
+    """64-bit hash per row over `cols`, used to find duplicates across chunks."""
+    return pd.util.hash_pandas_object(df[cols], index=False).to_numpy()
+
+def normalize_text(df, column_options, range_rules):
+    """
+    Stage 2 on a copy of the text columns (IDs and scored items excluded):
+    Arabic spelling/whitespace cleanup, answer choices snapped to the
+    schema's spelling ("ام" -> "أم").
+    """
+    exclude = DEDUP_EXCLUDE_COLS + [r["column"] for r in range_rules]
+    return normalize_text_columns(df[text_columns(df, exclude)].copy(), column_options)
+
+def build_range_rules(columns, schema):
+    """
+    One rule per column with schema bounds (Likert items, NPS, sliders, DDS).
+    قواعد النطاق مستخرجة من مخطط الاستبيان
+    """
+    rules = []
+    for col, (item_id, min_val, max_val) in resolve_column_bounds(columns, schema).items():
+        reason = f"{col} Out of Range ({min_val}-{max_val})"
+        if item_id == "NPS1":
+            reason = f"NPS Out of Range ({min_val}-{max_val})"
+        rules.append({"name": col, "column": col, "min": min_val, "max": max_val, "reason": reason})
+    return rules
+
+def range_violations(df, rules):
+    """
+    Boolean frame (rows x rules), True where a value breaks its rule.
+    Missing values pass; blanks and non-numeric text fail.
+    """
+    violations = {}
+    for rule in rules:
+        raw = df[rule["column"]]
+        values = pd.to_numeric(raw, errors="coerce")
+        violations[rule["name"]] = (raw.notna() & ~values.between(rule["min"], rule["max"])).to_numpy()
+    return pd.DataFrame(violations, index=df.index, columns=[r["name"] for r in rules])
+
+def first_violation_reason(violations, rules):
+    """Rejection reason of the first rule each (invalid) row breaks."""
+    reasons = np.array([r["reason"] for r in rules], dtype=object)
+    return reasons[violations.to_numpy().argmax(axis=1)]
+
+def find_long_repeats(counts, total_rows):
+    # We don't necessarily reject "لا يوجد" but if it's a long string repeating exactly, we flag it.
+    # For simplicity, if length > 10 and repeats > 5%, flag it.
+    return counts[(counts > (total_rows * 0.05)) & (counts.index.str.len() > 10)].index
+
+def open_text_columns(columns):
+    return [c for c in columns if str(c).startswith("open_") and c != "open_text_norm"]
+
+def near_duplicate_rows(df, threshold):
+    """Rows where any open-text answer is a near-duplicate of an earlier row's answer."""
+    mask = np.zeros(len(df), dtype=bool)
+    for col in open_text_columns(df.columns):
+        mask |= near_duplicate_mask(df[col], threshold=threshold)
+    return pd.Series(mask, index=df.index)
+
+def impute_education(df, probs, rng):
+    """Fill missing `demo_education` by sampling from `probs` with `rng`. Returns the imputed count."""
+    missing_ed = df["demo_education"].isna() | (df["demo_education"] == "")
+    n_missing = int(missing_ed.sum())
+    if n_missing == 0 or probs.empty:
+        return 0
+    imputed_vals = rng.choice(probs.index, size=n_missing, p=probs.values)
+    df.loc[missing_ed, "demo_education"] = imputed_vals
+    return n_missing
+
+def _row_local_partition(df, range_rules, column_options):
+    """
+    Everything stages 1-5 compute one row at a time, for every row of `df`:
+    dedup hashes, normalized text columns, range violations, folded open text.
+    Index-aligned with `df` so the caller can filter it by any later mask.
+    """
+    local = {
+        "hashes": pd.Series(row_hashes(df, dedup_columns(df.columns)), index=df.index),
+        "violations": range_violations(df, range_rules),
+        "text": normalize_text(df, column_options, range_rules),
+    }
+    if "open_challenges" in df.columns:
+        local["open_text_norm"] = open_text_key(df["open_challenges"])
+    return local
+
+def row_local_stages(df, range_rules, column_options, workers=1):
+    """
+    _row_local_partition over `df`, split into contiguous partitions across
+    `workers` processes. Only the dataset-wide reductions (duplicates,
+    template counts, imputation probabilities) are left to the caller.
+    """
+    n_parts = max(1, min(workers, len(df)))
+    if n_parts == 1:
+        return _row_local_partition(df, range_rules, column_options)
+    bounds = np.linspace(0, len(df), n_parts + 1).astype(int)
+    parts = [df.iloc[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+    with ProcessPoolExecutor(max_workers=n_parts) as pool:
+        results = list(pool.map(_row_local_partition, parts, repeat(range_rules), repeat(column_options)))
+    return {key: pd.concat([r[key] for r in results]) for key in results[0]}
+
+def write_summary(stats, metrics=None):
+    summary = dict(stats)
+    if metrics is not None:
+        summary["stages"] = metrics.summary()
+    with open("quality_summary.json", "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=4, ensure_ascii=False)
+
+def rejected_path_for(output_path):
+    """rejected_rows in the same format as the cleaned output (CSV by default)."""
+    ext = os.path.splitext(output_path)[1].lower()
+    return "rejected_rows" + (ext if table_format(output_path) != "csv" else ".csv")
+
+def print_report(stats, output_path, rejected_path="rejected_rows.csv"):
+    print("\n" + "="*40)
+    print("✅ ETL Cleaning Pipeline Completed / اكتمل التنظيف")
+    print("="*40)
+    print(f"Initial Rows: {stats['initial_rows']}")
+    print(f"Final Rows:   {stats['final_rows']} ({(stats['final_rows']/stats['initial_rows'])*100:.1f}%)")
+    print(f"Rejected:     {stats['rejected']}")
+    if stats.get("rejected_multiple_reasons"):
+        print(f"  of which failing several checks: {stats['rejected_multiple_reasons']} (see rejection_reasons)")
+    print(f"Imputed:      {stats['imputed']}")
+    print(f"\nOutputs generated:")
+    print(f"- {output_path}")
+    print(f"- {rejected_path}")
+    print(f"- quality_summary.json")
+
+def run_pipeline(input_path, output_path, chunksize=None, schema_path=None, near_dup_threshold=None,
+                 state_path=None, workers=1, seed=DEFAULT_SEED, metrics=None):
+    schema = load_schema(schema_path)
+    metrics = metrics or StageRecorder()
+    rng = np.random.RandomState(seed)
+    if chunksize or state_path:
+        if table_format(input_path) != "csv" or table_format(output_path) != "csv":
+            raise ValueError("Streaming and incremental modes read and write CSV only.")
+        if near_dup_threshold:
+            print("⚠️ Near-duplicate open-text detection needs the whole dataset; skipped in streaming mode.")
+        if workers > 1:
+            print("⚠️ --workers applies to in-memory runs; streaming mode runs on one process.")
+        return run_pipeline_chunked(input_path, output_path, chunksize or DEFAULT_CHUNKSIZE, schema,
+                                    state_path=state_path, rng=rng, metrics=metrics)
+
     print(f"🔄 Starting ETL Pipeline on: {input_path}")
     
-    try:
-        df = pd.read_csv(input_path)
-    except FileNotFoundError:
-        print(f"⚠️ Input file {input_path} not found. Creating a dummy file to demonstrate the pipeline.")
-        df = pd.DataFrame({
-            "respondentId": ["R1", "R2", "R3", "R4", "R5"],
-            "timestamp": ["2026-02-24T10:00:00Z"] * 5,
-            "demo_parentAge": [35, 35, 99, 25, 35],
-            "demo_relationship": ["أم", "أم ", "أب", "أخ", "أم"],
-            "demo_education": ["جامعي", "جامعي", "ابتدائي", "ثانوي", "جامعي"],
-            "health_gender": ["ذكر", "ذكر", "أنثى", "ذكر", "ذكر"],
-            "nps_score": [10, 10, 15, -1, None],
-            "open_challenges": ["لا يوجد", "لا يوجد", "صعوبة في التنوع", "الوقت", "لايوجد"]
-        })
-        input_path = "dummy_data.csv"
-        df.to_csv(input_path, index=False)
-        print("✅ Dummy file created for demonstration.\n")
+    with metrics.stage("read") as st:
+        try:
+            df = read_table(input_path)
+        except FileNotFoundError:
+            df, input_path = load_dummy_data(input_path)
+
+        # Answer options repeat, so text columns shrink a lot as categoricals
+        range_rules = build_range_rules(df.columns, schema)
+        logic_rules = build_logic_rules(df.columns, schema)
+        column_options = resolve_column_options(df.columns, schema)
+        df = categorize(df, exclude=[r["column"] for r in range_rules])
+        st["rows_out"] = len(df)
 
     initial_count = len(df)
-    rejected_rows = pd.DataFrame()
+    # Rejections are kept as row positions + reason bits; rows are copied once, at the end
+    ledger = RejectionLedger(initial_count, REJECTION_STAGES)
     stats = {"initial_rows": initial_count, "rejected": 0, "imputed": 0, "final_rows": 0}
 
+    # Row-local work for stages 1-5, on `workers` processes; the stages
+    # below only filter it and do the dataset-wide reductions
+    if workers > 1:
+        print(f"⚙️ Running row-local stages on {workers} worker processes.")
+    with metrics.stage("row_local", rows_in=len(df)) as st:
+        local = row_local_stages(df, range_rules, column_options, workers)
+        st["rows_out"] = len(df)
+
     # 1. Exact Duplicates (excluding ID and Timestamp) / إزالة التكرار التام
-    cols_to_check = [c for c in df.columns if c not in ["respondentId", "timestamp"]]
-    dupes = df.duplicated(subset=cols_to_check, keep='first')
-    
-    # Track rejected
-    df_dupes = df[dupes].copy()
-    if not df_dupes.empty:
-        df_dupes["rejection_reason"] = "Exact Duplicate"
-        rejected_rows = pd.concat([rejected_rows, df_dupes])
-    
-    df = df[~dupes].copy()
-    stats["rejected_exact_duplicates"] = int(dupes.sum())
+    with metrics.stage("exact_duplicates", rows_in=initial_count) as st:
+        dupes = local["hashes"].duplicated(keep='first').to_numpy()
+        stats["rejected_exact_duplicates"] = int(ledger.reject(DUPLICATE_REASON, dupes).sum())
+        st["rows_out"] = int(ledger.alive.sum())
     print(f"🗑️ Removed {stats['rejected_exact_duplicates']} exact duplicates.")
 
     # 2. Normalize Categorical Strings / توحيد النصوص
-    if "demo_relationship" in df.columns:
-        df["demo_relationship"] = df["demo_relationship"].astype(str).str.strip().str.replace("ام", "أم").replace("اب", "أب")
+    with metrics.stage("normalize", rows_in=int(ledger.alive.sum())) as st:
+        for col, values in local["text"].items():
+            # Partitions from --workers concatenate categoricals as plain objects
+            categorical = isinstance(df[col].dtype, pd.CategoricalDtype)
+            df[col] = values.astype("category") if categorical else values
+        st["rows_out"] = int(ledger.alive.sum())
     
     # 3. Numeric Ranges Validation / التحقق من النطاقات الرقمية
-    def validate_range(row, col, min_val, max_val):
-        val = row.get(col)
-        if pd.isna(val) or val == "":
-            return False # Track separately
-        try:
-            v = float(val)
-            return min_val <= v <= max_val
-        except:
-            return False
-
-    # Example: NPS must be 0-10
-    if "nps_score" in df.columns:
-        valid_nps = df.apply(lambda r: pd.isna(r["nps_score"]) or validate_range(r, "nps_score", 0, 10), axis=1)
-        invalid_nps = df[~valid_nps].copy()
-        if not invalid_nps.empty:
-            invalid_nps["rejection_reason"] = "NPS Out of Range (0-10)"
-            rejected_rows = pd.concat([rejected_rows, invalid_nps])
-        
-        # Clamp or Drop
-        # Let's drop them for strict quality, or clamp them if preferred. We'll drop for quality.
-        df = df[valid_nps].copy()
-        stats["rejected_out_of_range_nps"] = int((~valid_nps).sum())
-        print(f"📉 Removed {stats['rejected_out_of_range_nps']} rows with invalid NPS scores.")
-
-    # 4. Logical Constraints (Relationship vs Gender if applicable)
-    # If relationship is 'أم' (Mother), and 'health_gender' refers to the parent, they must be female.
-    # Assuming health_gender is child's gender initially, but if it's parent's:
-    # df_invalid_gender = df[(df["demo_relationship"] == "أب") & (df["health_gender"] == "أنثى")]
-
-    # 5. Low Entropy / Near-Duplicates in Open Text (Levenshtein)
+    if range_rules:
+        checked = ledger.alive
+        with metrics.stage("ranges", rows_in=int(checked.sum())) as st:
+            violations = local["violations"]
+            invalid = violations.any(axis=1).to_numpy()
+            # Drop them for strict quality rather than clamping
+            reasons = first_violation_reason(violations[invalid], range_rules)
+            stats["rejected_out_of_range"] = int(ledger.reject(RANGE_REASON, invalid, reasons).sum())
+            rule_counts = violations[checked].sum()
+            stats["range_rule_rejections"] = {name: int(n) for name, n in rule_counts.items()}
+            if "nps_score" in violations.columns:
+                stats["rejected_out_of_range_nps"] = int(rule_counts["nps_score"])
+            st["rows_out"] = int(ledger.alive.sum())
+        print(f"📉 Removed {stats['rejected_out_of_range']} rows with out-of-range values ({len(range_rules)} rules).")
+
+    # 4. Logical Constraints (attention checks, cross-field consistency) / الاتساق المنطقي
+    if logic_rules:
+        checked = ledger.alive
+        with metrics.stage("logic", rows_in=int(checked.sum())) as st:
+            # On the normalized answers; each column is evaluated once per distinct value
+            violations = rule_violations(df, logic_rules)
+            invalid = violations.any(axis=1).to_numpy()
+            reasons = first_violation_reason(violations[invalid], logic_rules)
+            stats["rejected_logic"] = int(ledger.reject(LOGIC_REASON, invalid, reasons).sum())
+            stats["logic_rule_rejections"] = {name: int(n) for name, n in violations[checked].sum().items()}
+            st["rows_out"] = int(ledger.alive.sum())
+        print(f"🧩 Removed {stats['rejected_logic']} rows with inconsistent answers ({len(logic_rules)} rules).")
+
+    # 5. Repeated Open Text Templates / النصوص المكررة
     if "open_challenges" in df.columns:
-        # Normalize text
-        df["open_text_norm"] = df["open_challenges"].astype(str).str.replace(" ", "").str.lower()
-        # Find too common phrases
-        counts = df["open_text_norm"].value_counts()
-        too_common = counts[counts > (len(df) * 0.1)].index # e.g., "لايوجد" repeating >10%
-        
-        # We don't necessarily reject "لا يوجد" but if it's a long string repeating exactly, we flag it.
-        # For simplicity, if length > 10 and repeats > 5%, flag it.
-        long_repeats = counts[(counts > (len(df) * 0.05)) & (counts.index.str.len() > 10)].index
-        
-        df_text_dupes = df[df["open_text_norm"].isin(long_repeats)].copy()
-        if not df_text_dupes.empty:
-            df_text_dupes["rejection_reason"] = "Repeated Open Text Template"
-            rejected_rows = pd.concat([rejected_rows, df_text_dupes])
-            df = df[~df["open_text_norm"].isin(long_repeats)]
-        
-        df.drop(columns=["open_text_norm"], inplace=True, errors='ignore')
+        alive = ledger.alive
+        n_alive = int(alive.sum())
+        with metrics.stage("open_text_templates", rows_in=n_alive) as st:
+            texts = local["open_text_norm"]
+            # Find too common phrases among the rows still in
+            counts = texts[alive].value_counts()
+            long_repeats = find_long_repeats(counts, n_alive)
+            # Rows rejected earlier are flagged too, for their rejection_reasons
+            ledger.reject(TEMPLATE_REASON, texts.isin(long_repeats).to_numpy())
+            st["rows_out"] = int(ledger.alive.sum())
+
+    # Near-duplicates (MinHash/LSH) across all open-text fields / النصوص شبه المكررة
+    if near_dup_threshold:
+        alive = ledger.alive
+        with metrics.stage("near_duplicates", rows_in=int(alive.sum())) as st:
+            near_dupes = np.zeros(initial_count, dtype=bool)
+            near_dupes[alive] = near_duplicate_rows(df.loc[alive, open_text_columns(df.columns)],
+                                                    near_dup_threshold).to_numpy()
+            stats["rejected_near_duplicate_text"] = int(ledger.reject(NEAR_DUPLICATE_REASON, near_dupes).sum())
+            st["rows_out"] = int(ledger.alive.sum())
+        print(f"📝 Removed {stats['rejected_near_duplicate_text']} near-duplicate open-text answers (threshold {near_dup_threshold}).")
+
+    # Kept rows, copied once; validated items fit in compact integer dtypes (Int8 for Likert/NPS)
+    with metrics.stage("materialize", rows_in=initial_count) as st:
+        cleaned = compact_numeric(df.take(np.flatnonzero(ledger.alive)), [r["column"] for r in range_rules])
+        st["rows_out"] = len(cleaned)
 
     # 6. Impute Missing Values (Probabilistic or Mode)
     # If "demo_education" is missing, impute based on distribution
-    if "demo_education" in df.columns:
-        missing_ed = df["demo_education"].isna() | (df["demo_education"] == "")
-        if missing_ed.sum() > 0:
-            probs = df.loc[~missing_ed, "demo_education"].value_counts(normalize=True)
-            if not probs.empty:
-                imputed_vals = np.random.choice(probs.index, size=missing_ed.sum(), p=probs.values)
-                df.loc[missing_ed, "demo_education"] = imputed_vals
-                stats["imputed"] += int(missing_ed.sum())
+    if "demo_education" in cleaned.columns:
+        with metrics.stage("imputation", rows_in=len(cleaned)) as st:
+            missing_ed = cleaned["demo_education"].isna() | (cleaned["demo_education"] == "")
+            if missing_ed.sum() > 0:
+                probs = cleaned.loc[~missing_ed, "demo_education"].value_counts(normalize=True)
+                stats["imputed"] += impute_education(cleaned, probs, rng)
+            st["rows_out"] = len(cleaned)
 
     # Finalize
-    stats["final_rows"] = len(df)
-    stats["rejected"] = len(rejected_rows)
+    stats["final_rows"] = len(cleaned)
+    stats["rejected"] = len(ledger)
+    stats["rejected_multiple_reasons"] = ledger.multi_reason_count()
     
     # Save Outputs
-    df.to_csv(output_path, index=False)
-    rejected_rows.to_csv("rejected_rows.csv", index=False)
+    rejected_path = rejected_path_for(output_path)
+    with metrics.stage("write", rows_in=initial_count):
+        write_table(cleaned, output_path)
+        del cleaned
+        write_table(ledger.materialize(df), rejected_path)
     
-    with open("quality_summary.json", "w", encoding="utf-8") as f:
-        json.dump(stats, f, indent=4, ensure_ascii=False)
+    write_summary(stats, metrics)
+    print_report(stats, output_path, rejected_path)
 
-    print("\n" + "="*40)
-    print("✅ ETL Cleaning Pipeline Completed / اكتمل التنظيف")
-    print("="*40)
-    print(f"Initial Rows: {stats['initial_rows']}")
-    print(f"Final Rows:   {stats['final_rows']} ({(stats['final_rows']/stats['initial_rows'])*100:.1f}%)")
-    print(f"Rejected:     {stats['rejected']}")
-    print(f"Imputed:      {stats['imputed']}")
-    print(f"\nOutputs generated:")
-    print(f"- {output_path}")
-    print(f"- rejected_rows.csv")
-    print(f"- quality_summary.json")
+def _append_csv(df, path, header):
+    df.to_csv(path, mode="w" if header else "a", header=header, index=False)
+
+# Outputs written by the pipeline are re-read as text; only "" means missing
+OUTPUT_READ_KWARGS = {"dtype": str, "keep_default_na": False, "na_values": [""]}
+
+def new_state():
+    """Everything an incremental run needs to know about earlier runs."""
+    return {
+        "watermark": None,         # max parsed timestamp processed so far (ISO)
+        "watermark_ids": [],       # respondentIds seen at exactly that timestamp
+        "row_hashes": set(),       # stage 1: hashes of every first occurrence
+        "survivor_rows": 0,        # stage 5: rows that reached it (its 5% base)
+        "text_counts": {},         # stage 5: normalized open text -> count
+        "templates": [],           # stage 5: texts currently rejected as templates
+        "education_counts": {},    # stage 6: observed demo_education of kept rows
+        "imputed_by_text": {},     # stage 6: long text -> {education: n} imputed into kept rows
+        "rng": None,               # stage 6: imputation RandomState where the last run left it
+        "stats": None,             # cumulative quality_summary.json
+    }
+
+def rng_state(rng):
+    """JSON-safe RandomState.get_state(), for the state file."""
+    name, keys, pos, has_gauss, cached_gaussian = rng.get_state()
+    return [name, keys.tolist(), int(pos), int(has_gauss), float(cached_gaussian)]
+
+def restore_rng(rng, saved):
+    name, keys, pos, has_gauss, cached_gaussian = saved
+    rng.set_state((name, np.array(keys, dtype=np.uint32), pos, has_gauss, cached_gaussian))
+
+def load_state(path):
+    if not path or not os.path.exists(path):
+        return new_state()
+    with np.load(path, allow_pickle=False) as data:
+        state = json.loads(str(data["meta"]))
+        state["row_hashes"] = set(data["row_hashes"].tolist())
+    return refold_text_keys(state)
+
+def refold_text_keys(state):
+    """
+    Stage 5 keys are fold_text of the answer. Older states stored a coarser
+    key (spaces removed, lower-cased); fold_text of that key equals
+    fold_text of the answer, so re-folding merges them onto current keys.
+    """
+    text_counts, imputed_by_text = {}, {}
+    for text, n in state["text_counts"].items():
+        key = fold_text(text)
+        text_counts[key] = text_counts.get(key, 0) + n
+    for text, per_edu in state["imputed_by_text"].items():
+        merged = imputed_by_text.setdefault(fold_text(text), {})
+        for edu, n in per_edu.items():
+            merged[edu] = merged.get(edu, 0) + n
+    state["text_counts"], state["imputed_by_text"] = text_counts, imputed_by_text
+    state["templates"] = list(dict.fromkeys(fold_text(t) for t in state["templates"]))
+    return state
+
+def save_state(path, state):
+    """Row hashes go in a uint64 array, the rest as JSON, in one compressed .npz."""
+    meta = {k: v for k, v in state.items() if k != "row_hashes"}
+    hashes = np.fromiter(state["row_hashes"], dtype=np.uint64, count=len(state["row_hashes"]))
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, row_hashes=hashes, meta=np.array(json.dumps(meta, ensure_ascii=False)))
+    os.replace(tmp_path, path)
+
+def rows_after_watermark(chunk, state):
+    """Mask of rows newer than the (timestamp, respondentId) watermark."""
+    if state["watermark"] is None:
+        return pd.Series(True, index=chunk.index)
+    ts = pd.to_datetime(chunk["timestamp"], utc=True, errors="coerce")
+    watermark = pd.Timestamp(state["watermark"])
+    return (ts > watermark) | ((ts == watermark) & ~chunk["respondentId"].isin(state["watermark_ids"]))
+
+def advance_watermark(chunk, watermark):
+    """Move a {"watermark", "watermark_ids"} dict past the rows of `chunk`."""
+    ts = pd.to_datetime(chunk["timestamp"], utc=True, errors="coerce")
+    if ts.notna().sum() == 0:
+        return
+    latest = ts.max()
+    ids = chunk.loc[ts == latest, "respondentId"].astype(str).tolist()
+    if watermark["watermark"] is None or latest > pd.Timestamp(watermark["watermark"]):
+        watermark["watermark"], watermark["watermark_ids"] = latest.isoformat(), ids
+    elif latest == pd.Timestamp(watermark["watermark"]):
+        watermark["watermark_ids"] = sorted(set(watermark["watermark_ids"]) | set(ids))
+
+def _rewrite_csv(path, chunksize, split):
+    """
+    Stream `path` through split(chunk) -> (keep, moved); rewrite it with the
+    kept rows and yield the moved ones.
+    """
+    tmp_path = path + ".tmp"
+    header = True
+    for chunk in pd.read_csv(path, chunksize=chunksize, **OUTPUT_READ_KWARGS):
+        keep, moved = split(chunk)
+        _append_csv(keep, tmp_path, header=header)
+        header = False
+        if not moved.empty:
+            yield moved
+    if header:
+        pd.read_csv(path, nrows=0).to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+def _timed_chunks(chunks, metrics, name):
+    """Iterate `chunks`, recording the time spent producing each one as stage `name`."""
+    chunks = iter(chunks)
+    while True:
+        with metrics.stage(name) as st:
+            chunk = next(chunks, None)
+            st["rows_out"] = 0 if chunk is None else len(chunk)
+        if chunk is None:
+            return
+        yield chunk
+
+def run_pipeline_chunked(input_path, output_path, chunksize, schema, state_path=None, rng=None, metrics=None,
+                         state=None):
+    """
+    Bounded-memory variant of run_pipeline for exports that do not fit in RAM.
+    نسخة بذاكرة محدودة من خط المعالجة للملفات الكبيرة
+
+    Pass 1 streams the raw file through stages 1-4 (duplicates via a set of
+    row hashes, normalization, ranges, logic rules) and spills survivors to a temp file.
+    Stages 5 and 6 need dataset-wide frequencies, so they run over the spill
+    once the open-text counts and education distribution are known.
+    Rows rejected in pass 1 wait in a second spill until the template set is
+    known, so their rejection_reasons can list the template stage too.
+    Produces the same quality_summary.json as a single-pass run.
+
+    With `state_path` the run is incremental: only rows past the stored
+    timestamp watermark are cleaned and appended to the existing outputs.
+    Earlier outputs are only rewritten when a text crosses the 5% template
+    threshold, so the kept and rejected rows and quality_summary.json match
+    a full rebuild. Imputed demo_education values do not: each run imputes
+    its new rows from the distribution of the rows kept so far, and earlier
+    rows keep what they were given, so the values depend on how the data
+    was split into runs. The RNG continues across runs (state "rng"), so
+    batches do not repeat the same draws.
+
+    A caller that keeps the state in memory between runs (ingest_daemon.py)
+    passes `state` instead. It tracks which rows are new itself, so no
+    watermark is applied and nothing is saved; `state` is updated in place.
+    """
+    incremental = bool(state_path) or state is not None
+    state = state if state is not None else load_state(state_path)
+    rng = rng or np.random.RandomState(DEFAULT_SEED)
+    if state_path and state.get("rng"):
+        restore_rng(rng, state["rng"])
+    metrics = metrics or StageRecorder()
+    resuming = state["stats"] is not None
+    mode = "incremental" if incremental else "streaming"
+    print(f"🔄 Starting ETL Pipeline on: {input_path} ({mode}, chunksize={chunksize})")
+
+    if not os.path.exists(input_path):
+        _, input_path = load_dummy_data(input_path)
+
+    columns = list(pd.read_csv(input_path, nrows=0).columns)
+    if state_path and not {"respondentId", "timestamp"} <= set(columns):
+        raise ValueError("Incremental mode needs 'respondentId' and 'timestamp' columns.")
+    if resuming and not (os.path.exists(output_path) and os.path.exists("rejected_rows.csv")):
+        raise FileNotFoundError(f"State {state_path} exists but {output_path} / rejected_rows.csv are missing; "
+                                "delete the state file to rebuild.")
+    cols_to_check = dedup_columns(columns)
+    rejected_path = "rejected_rows.csv"
+    rejected_cols = columns + ["rejection_reason", "rejection_reasons"]
+    if not resuming:
+        pd.DataFrame(columns=rejected_cols).to_csv(rejected_path, index=False)
+    elif "rejection_reasons" not in pd.read_csv(rejected_path, nrows=0).columns:
+        raise ValueError(f"{rejected_path} predates the rejection_reasons column; "
+                         "delete the state file to rebuild.")
+
+    range_rules = build_range_rules(columns, schema)
+    logic_rules = build_logic_rules(columns, schema)
+    column_options = resolve_column_options(columns, schema)
+    stats = state["stats"]
+    if stats is None:
+        stats = {"initial_rows": 0, "rejected": 0, "imputed": 0, "final_rows": 0}
+        stats["rejected_exact_duplicates"] = 0
+        if range_rules:
+            stats["rejected_out_of_range"] = 0
+        stats["rejected_multiple_reasons"] = 0
+    rule_counts = pd.Series(stats.get("range_rule_rejections", {}), dtype="int64")
+    rule_counts = rule_counts.reindex([r["name"] for r in range_rules], fill_value=0)
+    if logic_rules:
+        # State files from before the logic stage have no logic counts yet
+        stats.setdefault("rejected_logic", 0)
+    logic_counts = pd.Series(stats.get("logic_rule_rejections", {}), dtype="int64")
+    logic_counts = logic_counts.reindex([r["id"] for r in logic_rules], fill_value=0)
+
+    def write_rejected(rows):
+        _append_csv(rows[rejected_cols], rejected_path, header=False)
+        stats["rejected"] += len(rows)
+        stats["rejected_multiple_reasons"] += multi_reason_rows(rows["rejection_reasons"])
+
+    def reject(rows, reason):
+        # Rows that passed stages 1-4 and fail only `reason`
+        if rows.empty:
+            return
+        rows = rows.copy()
+        rows["rejection_reason"] = reason
+        rows["rejection_reasons"] = reason
+        write_rejected(rows)
+
+    has_text = "open_challenges" in columns
+    has_education = "demo_education" in columns
+    seen_hashes = state["row_hashes"]
+    text_counts = pd.Series(state["text_counts"], dtype="int64")
+    new_rows = skipped_rows = spill_rows = rejected_spill_rows = 0
+    next_watermark = {"watermark": state["watermark"], "watermark_ids": list(state["watermark_ids"])}
+    spill_paths = []
+    for prefix in ("etl_spill_", "etl_rejected_spill_"):
+        spill_fd, path = tempfile.mkstemp(suffix=".csv", prefix=prefix,
+                                          dir=os.path.dirname(os.path.abspath(output_path)))
+        os.close(spill_fd)
+        spill_paths.append(path)
+    spill_path, rejected_spill_path = spill_paths
+
+    try:
+        # ── Pass 1: stages 1-4, row-local apart from the hash set ──
+        # dtype=str keeps hashes stable even when chunks infer different dtypes
+        for chunk in _timed_chunks(pd.read_csv(input_path, chunksize=chunksize, dtype=str), metrics, "read"):
+            if state_path:
+                with metrics.stage("watermark", rows_in=len(chunk)) as st:
+                    is_new = rows_after_watermark(chunk, state)
+                    skipped_rows += int((~is_new).sum())
+                    chunk = chunk[is_new]
+                    advance_watermark(chunk, next_watermark)
+                    st["rows_out"] = len(chunk)
+            new_rows += len(chunk)
+            stats["initial_rows"] += len(chunk)
+            # Every stage sees the whole chunk, as in a single-pass run, so a
+            # rejected row collects the bits of all the checks it fails
+            ledger = RejectionLedger(len(chunk), REJECTION_STAGES)
+
+            # 1. Exact Duplicates (across chunk boundaries) / إزالة التكرار التام
+            with metrics.stage("exact_duplicates", rows_in=len(chunk)) as st:
+                hashes = row_hashes(chunk, cols_to_check)
+                dupes = pd.Series(hashes).duplicated().to_numpy() | \
+                        np.array([h in seen_hashes for h in hashes], dtype=bool)
+                seen_hashes.update(hashes[~dupes].tolist())
+                stats["rejected_exact_duplicates"] += int(ledger.reject(DUPLICATE_REASON, dupes).sum())
+                st["rows_out"] = int(ledger.alive.sum())
+
+            # 2. Normalize Categorical Strings / توحيد النصوص
+            with metrics.stage("normalize", rows_in=int(ledger.alive.sum())) as st:
+                chunk = chunk.copy()
+                for col, values in normalize_text(chunk, column_options, range_rules).items():
+                    chunk[col] = values
+                st["rows_out"] = int(ledger.alive.sum())
+
+            # 3. Numeric Ranges Validation / التحقق من النطاقات الرقمية
+            if range_rules:
+                checked = ledger.alive
+                with metrics.stage("ranges", rows_in=int(checked.sum())) as st:
+                    violations = range_violations(chunk, range_rules)
+                    invalid = violations.any(axis=1).to_numpy()
+                    reasons = first_violation_reason(violations[invalid], range_rules)
+                    stats["rejected_out_of_range"] += int(ledger.reject(RANGE_REASON, invalid, reasons).sum())
+                    rule_counts += violations[checked].sum()
+                    st["rows_out"] = int(ledger.alive.sum())
+
+            # 4. Logical Constraints / الاتساق المنطقي
+            if logic_rules:
+                checked = ledger.alive
+                with metrics.stage("logic", rows_in=int(checked.sum())) as st:
+                    violations = rule_violations(chunk, logic_rules)
+                    invalid = violations.any(axis=1).to_numpy()
+                    reasons = first_violation_reason(violations[invalid], logic_rules)
+                    stats["rejected_logic"] += int(ledger.reject(LOGIC_REASON, invalid, reasons).sum())
+                    logic_counts += violations[checked].sum()
+                    st["rows_out"] = int(ledger.alive.sum())
+
+            with metrics.stage("spill", rows_in=len(chunk)) as st:
+                # Rejected rows wait for the template set (stage 5) before they are written
+                rejected = ledger.materialize(chunk)
+                _append_csv(rejected, rejected_spill_path, header=(rejected_spill_rows == 0))
+                rejected_spill_rows += len(rejected)
+                chunk = chunk[ledger.alive]
+                if has_text:
+                    counts = open_text_key(chunk["open_challenges"]).value_counts()
+                    text_counts = text_counts.add(counts, fill_value=0).astype("int64")
+
+                _append_csv(chunk, spill_path, header=(spill_rows == 0))
+                spill_rows += len(chunk)
+                st["rows_out"] = len(chunk)
+
+        if state_path:
+            print(f"⏩ {new_rows} new rows past watermark {state['watermark']} ({skipped_rows} already processed).")
+        print(f"🗑️ Removed {stats['rejected_exact_duplicates']} exact duplicates.")
+        if range_rules:
+            stats["range_rule_rejections"] = {name: int(n) for name, n in rule_counts.items()}
+            if "nps_score" in rule_counts.index:
+                stats["rejected_out_of_range_nps"] = int(rule_counts["nps_score"])
+            print(f"📉 Removed {stats['rejected_out_of_range']} rows with out-of-range values ({len(range_rules)} rules).")
+        if logic_rules:
+            stats["logic_rule_rejections"] = {name: int(n) for name, n in logic_counts.items()}
+            print(f"🧩 Removed {stats['rejected_logic']} rows with inconsistent answers ({len(logic_rules)} rules).")
+
+        state["survivor_rows"] += spill_rows
+        long_repeats = pd.Index([])
+        if has_text:
+            long_repeats = find_long_repeats(text_counts, state["survivor_rows"])
+        old_templates = set(state["templates"])
+        entered = [t for t in long_repeats if t not in old_templates]
+        left = old_templates - set(long_repeats)
+
+        ed_counts = pd.Series(state["education_counts"], dtype="int64")
+        imputed_by_text = state["imputed_by_text"]
+
+        # ── Pass 2: education distribution over rows that survive stage 5 ──
+        if has_education and spill_rows:
+            usecols = [c for c in ["demo_education", "open_challenges"] if c in columns]
+            spill = pd.read_csv(spill_path, chunksize=chunksize, usecols=usecols, **OUTPUT_READ_KWARGS)
+            for chunk in _timed_chunks(spill, metrics, "read_spill"):
+                with metrics.stage("education_counts", rows_in=len(chunk)) as st:
+                    if len(long_repeats):
+                        chunk = chunk[~open_text_key(chunk["open_challenges"]).isin(long_repeats)]
+                    ed = chunk["demo_education"]
+                    ed_counts = ed_counts.add(ed[~(ed.isna() | (ed == ""))].value_counts(), fill_value=0)
+                    st["rows_out"] = len(chunk)
+
+        # ── Reconcile earlier outputs with the new template set ──
+        restored = []
+        with metrics.stage("reconcile"):
+            if resuming and entered:
+                def split_cleaned(chunk):
+                    hit = open_text_key(chunk["open_challenges"]).isin(entered)
+                    return chunk[~hit], chunk[hit]
+                for moved in _rewrite_csv(output_path, chunksize, split_cleaned):
+                    reject(moved, TEMPLATE_REASON)
+                    stats["final_rows"] -= len(moved)
+                    if has_education:
+                        observed = moved["demo_education"].value_counts()
+                        for text in open_text_key(moved["open_challenges"]).unique():
+                            imputed = pd.Series(imputed_by_text.pop(text, {}), dtype="int64")
+                            stats["imputed"] -= int(imputed.sum())
+                            observed = observed.sub(imputed, fill_value=0)
+                        ed_counts = ed_counts.sub(observed, fill_value=0).clip(lower=0)
+                print(f"♻️ {len(entered)} open texts crossed the template threshold; earlier rows moved to rejected.")
+            if resuming and (entered or left):
+                def split_rejected(chunk):
+                    keys = open_text_key(chunk["open_challenges"])
+                    before = multi_reason_rows(chunk["rejection_reasons"])
+                    # Earlier rows gain or lose the template stage in rejection_reasons
+                    chunk["rejection_reasons"] = retag_reasons(chunk["rejection_reasons"], REJECTION_STAGES,
+                                                               TEMPLATE_REASON, keys.isin(long_repeats))
+                    hit = (chunk["rejection_reason"] == TEMPLATE_REASON) & keys.isin(left)
+                    stats["rejected_multiple_reasons"] += multi_reason_rows(chunk.loc[~hit, "rejection_reasons"]) - before
+                    return chunk[~hit], chunk[hit]
+                for moved in _rewrite_csv(rejected_path, chunksize, split_rejected):
+                    moved = moved.drop(columns=["rejection_reason", "rejection_reasons"])
+                    stats["rejected"] -= len(moved)
+                    if has_education:
+                        ed = moved["demo_education"]
+                        ed_counts = ed_counts.add(ed[~(ed.isna() | (ed == ""))].value_counts(), fill_value=0)
+                    restored.append(moved)
+                if left:
+                    print(f"♻️ {len(left)} open texts fell below the template threshold; their rows were restored.")
+
+        probs = pd.Series(dtype="float64")
+        if ed_counts.sum():
+            probs = (ed_counts / ed_counts.sum()).sort_values(ascending=False)
+
+        def finish(chunk, header):
+            # 6. Impute Missing Values / معالجة القيم المفقودة
+            if has_education:
+                with metrics.stage("imputation", rows_in=len(chunk)) as st:
+                    missing_ed = chunk["demo_education"].isna() | (chunk["demo_education"] == "")
+                    stats["imputed"] += impute_education(chunk, probs, rng)
+                    if incremental and has_text and missing_ed.any():
+                        texts = open_text_key(chunk.loc[missing_ed, "open_challenges"])
+                        long_texts = texts[texts.str.len() > 10]
+                        for (text, edu), n in chunk.loc[long_texts.index].groupby(
+                                [long_texts, chunk.loc[long_texts.index, "demo_education"]]).size().items():
+                            per_text = imputed_by_text.setdefault(text, {})
+                            per_text[edu] = per_text.get(edu, 0) + int(n)
+                    st["rows_out"] = len(chunk)
+            with metrics.stage("write", rows_in=len(chunk)):
+                _append_csv(chunk, output_path, header=header)
+            stats["final_rows"] += len(chunk)
+
+        # ── Pass 3: stages 5-6 and incremental output ──
+        header = not resuming
+        for chunk in restored:
+            finish(chunk, header)
+            header = False
+        if spill_rows:
+            spill = pd.read_csv(spill_path, chunksize=chunksize, **OUTPUT_READ_KWARGS)
+            for chunk in _timed_chunks(spill, metrics, "read_spill"):
+                # 5. Repeated Open Text Templates / النصوص المكررة
+                if len(long_repeats):
+                    with metrics.stage("open_text_templates", rows_in=len(chunk)) as st:
+                        is_template = open_text_key(chunk["open_challenges"]).isin(long_repeats)
+                        reject(chunk[is_template], TEMPLATE_REASON)
+                        chunk = chunk[~is_template].copy()
+                        st["rows_out"] = len(chunk)
+                finish(chunk, header)
+                header = False
+        if header:
+            pd.DataFrame(columns=columns).to_csv(output_path, index=False)
+        if rejected_spill_rows:
+            spill = pd.read_csv(rejected_spill_path, chunksize=chunksize, **OUTPUT_READ_KWARGS)
+            for chunk in _timed_chunks(spill, metrics, "read_rejected_spill"):
+                with metrics.stage("write_rejected", rows_in=len(chunk)):
+                    if len(long_repeats):
+                        is_template = open_text_key(chunk["open_challenges"]).isin(long_repeats)
+                        chunk["rejection_reasons"] = retag_reasons(chunk["rejection_reasons"], REJECTION_STAGES,
+                                                                   TEMPLATE_REASON, is_template)
+                    write_rejected(chunk)
+    finally:
+        for path in spill_paths:
+            os.remove(path)
+
+    if incremental:
+        if state_path:
+            state.update(next_watermark, rng=rng_state(rng))
+        state.update({
+            "row_hashes": seen_hashes,
+            "text_counts": {str(k): int(v) for k, v in text_counts.items()},
+            "templates": [str(t) for t in long_repeats],
+            "education_counts": {str(k): int(v) for k, v in ed_counts.items() if v > 0},
+            "imputed_by_text": imputed_by_text,
+            "stats": stats,
+        })
+    if state_path:
+        save_state(state_path, state)
+        print(f"💾 State saved to {state_path} (watermark {state['watermark']}).")
+
+    write_summary(stats, metrics)
+    print_report(stats, output_path)
+
+def cache_outputs(output_path):
+    """Files a run produces, by cache entry name."""
+    return {"cleaned": output_path, "rejected": rejected_path_for(output_path), "summary": "quality_summary.json"}
+
+def cache_config(args):
+    """Everything besides the input bytes and the code that changes the outputs."""
+    return {
+        "schema": load_schema(args.schema),
+        "output_format": os.path.splitext(args.output)[1].lower(),
+        "chunksize": args.chunksize,
+        "near_dup_threshold": args.near_dup_threshold,
+        "seed": args.seed,
+    }
+
+def profiled(fn, *args, **kwargs):
+    """Run fn under cProfile; print the top hot spots and keep the full profile on disk."""
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(fn, *args, **kwargs)
+    finally:
+        profiler.dump_stats(PROFILE_PATH)
+        print(f"\n🔥 Top {PROFILE_TOP_N} hot spots by cumulative time (full profile: {PROFILE_PATH}):")
+        pstats.Stats(profiler).strip_dirs().sort_stats("cumulative").print_stats(PROFILE_TOP_N)
 
 if __name__ == "__main__":
     args = parse_args()
-    run_pipeline(args.input, args.output)
+    cache = None if args.no_cache or args.state or not os.path.exists(args.input) \
+        else ResultCache(args.cache_dir, args.cache_max_mb)
+    if cache:
+        cache_key = cache.key("clean_survey_data", args.input, cache_config(args))
+        if cache.restore(cache_key, cache_outputs(args.output)):
+            print(f"♻️ Cache hit / نتائج محفوظة: {args.input} is unchanged; outputs restored ({cache_key[:12]}).")
+            for path in cache_outputs(args.output).values():
+                print(f"- {path}")
+            raise SystemExit(0)
+
+    metrics = StageRecorder(trace_memory=args.trace_memory)
+    run = profiled if args.profile else (lambda fn, *a, **kw: fn(*a, **kw))
+    run(run_pipeline, args.input, args.output, chunksize=args.chunksize, schema_path=args.schema,
+        near_dup_threshold=args.near_dup_threshold, state_path=args.state,
+        workers=args.workers, seed=args.seed, metrics=metrics)
+    metrics.print_table()
+    if cache and all(os.path.exists(path) for path in cache_outputs(args.output).values()):
+        cache.store(cache_key, files=cache_outputs(args.output))
+    if args.trace:
+        metrics.write_chrome_trace(args.trace)
+        print(f"- {args.trace}")
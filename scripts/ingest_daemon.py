@@ -0,0 +1,371 @@
+"""
+Live Survey Ingestion Daemon
+----------------------------
+استيعاب ردود الاستبيان أولاً بأول على دفعات صغيرة
+
+Tails an append-only JSONL stream of survey submissions and cleans them in
+micro-batches with the incremental stages of clean_survey_data.py, so the
+cleaned dataset trails submissions by seconds instead of a full re-run.
+The stream is one JSON object per line: a file, or a directory of *.jsonl
+files read in name order (a local stand-in for the Firestore export).
+Nested objects are flattened with "_" ({"demo": {"relationship": ...}} ->
+demo_relationship), matching the CSV export's column names.
+
+The CSV header is written once, so the output columns are fixed by the
+first batch: its fields, plus the export column of every schema field and
+item it did not have. A later field naming a schema field under another
+column name (resolve_column_ids) is written to that field's column; any
+other new field is dropped with a warning.
+
+A batch is cleaned once --batch-size submissions are waiting or the oldest
+has waited --max-latency seconds. The stage state (row hashes, open-text
+counts and templates, education distribution) stays in memory between
+batches. It is checkpointed to --state every --checkpoint-interval seconds,
+whenever the template set changes (earlier outputs were rewritten) and on
+exit. A checkpoint also records the read offset of every stream file and
+the size of both outputs. On restart the outputs are truncated back to
+those sizes and reading resumes from the offsets, so a crash between
+checkpoints neither loses nor repeats submissions.
+
+Per-batch latency (oldest submission read -> batch written), cleaning time
+and throughput are logged and written to --metrics as JSON, with p50/p95
+over the last RECENT_BATCHES batches and the stage breakdown of the latest.
+
+Usage / الاستخدام:
+  python ingest_daemon.py --source submissions/ --output cleaned_dataset.csv --state ingest_state.npz
+  # Clean what is in the stream now, then exit / معالجة المتاح ثم الخروج:
+  python ingest_daemon.py --source submissions.jsonl --output cleaned_dataset.csv --once
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import signal
+import tempfile
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from clean_survey_data import DEFAULT_SEED, load_state, run_pipeline_chunked, save_state
+from stage_metrics import StageRecorder
+from survey_schema import export_columns, load_schema, resolve_column_ids
+
+DEFAULT_BATCH_SIZE = 5_000
+DEFAULT_MAX_LATENCY_S = 2.0
+DEFAULT_POLL_S = 0.2
+DEFAULT_CHECKPOINT_S = 30.0
+RECENT_BATCHES = 1_000
+
+# Where run_pipeline_chunked writes rejected rows
+REJECTED_PATH = "rejected_rows.csv"
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Clean live NutriAware survey submissions in micro-batches")
+    parser.add_argument("--source", required=True, help="JSONL file, or directory of *.jsonl files, to tail")
+    parser.add_argument("--output", default="cleaned_dataset.csv", help="Cleaned dataset (CSV, appended to)")
+    parser.add_argument("--state", default="ingest_state.npz", help="Checkpoint of the stage state and read offsets")
+    parser.add_argument("--schema", default=None, help="Survey schema JSON (defaults to docs/surveySchema.json)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Most submissions per batch")
+    parser.add_argument("--max-latency", type=float, default=DEFAULT_MAX_LATENCY_S,
+                        help="Clean a partial batch once its oldest submission has waited this many seconds")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_S, help="Seconds between reads of an idle stream")
+    parser.add_argument("--checkpoint-interval", type=float, default=DEFAULT_CHECKPOINT_S,
+                        help="Seconds between state checkpoints")
+    parser.add_argument("--metrics", default="ingest_metrics.json", help="Latency/throughput metrics, rewritten per batch")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="RNG seed for probabilistic imputation")
+    parser.add_argument("--once", action="store_true", help="Clean everything in the stream now, then exit")
+    parser.add_argument("--verbose", action="store_true", help="Print the full ETL report of every batch")
+    return parser.parse_args()
+
+def flatten(record, prefix=""):
+    """One flat row per submission; lists (multi-select answers) are kept as JSON text."""
+    flat = {}
+    for key, value in record.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, name + "_"))
+        elif isinstance(value, list):
+            flat[name] = json.dumps(value, ensure_ascii=False)
+        else:
+            flat[name] = value
+    return flat
+
+def output_columns(keys, schema):
+    """
+    `keys` (the first batch's fields, one per schema field), then the export
+    columns of the schema fields and items they lack.
+    """
+    key_ids = resolve_column_ids(list(keys), schema)
+    columns, held = [], set()
+    for key in keys:
+        if key in key_ids:
+            if key_ids[key] in held:
+                continue
+            held.add(key_ids[key])
+        columns.append(key)
+    exported = list(export_columns(schema))
+    exported_ids = resolve_column_ids(exported, schema)
+    return columns + [col for col in exported if col not in columns and exported_ids.get(col) not in held]
+
+class JsonlTail:
+    """
+    Complete new lines of the stream. `offsets` maps file name -> bytes
+    consumed; a last line without its newline is still being written and is
+    left for the next read.
+    """
+
+    def __init__(self, source, offsets=None):
+        self.source = source
+        self.offsets = dict(offsets or {})
+
+    def files(self):
+        if os.path.isdir(self.source):
+            return sorted(glob.glob(os.path.join(self.source, "*.jsonl")))
+        return [self.source] if os.path.exists(self.source) else []
+
+    def read(self, max_lines):
+        lines = []
+        for path in self.files():
+            if len(lines) >= max_lines:
+                break
+            name = os.path.basename(path)
+            offset = self.offsets.get(name, 0)
+            with open(path, "rb") as f:
+                f.seek(offset)
+                while len(lines) < max_lines:
+                    line = f.readline()
+                    if not line.endswith(b"\n"):
+                        break
+                    offset += len(line)
+                    if line.strip():
+                        lines.append(line)
+            self.offsets[name] = offset
+        return lines
+
+def _percentiles(values):
+    if not values:
+        return None
+    p50, p95 = np.percentile(values, [50, 95])
+    return {"p50": round(float(p50), 4), "p95": round(float(p95), 4), "max": round(float(max(values)), 4)}
+
+def _file_size(path):
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+class IngestDaemon:
+    """
+    Usage:
+        daemon = IngestDaemon("submissions/", "cleaned_dataset.csv", state_path="ingest_state.npz")
+        daemon.run()            # until SIGINT/SIGTERM (daemon.stop())
+        daemon.run(once=True)   # drain the stream and return
+    """
+
+    def __init__(self, source, output_path, state_path=None, schema=None, batch_size=DEFAULT_BATCH_SIZE,
+                 max_latency=DEFAULT_MAX_LATENCY_S, checkpoint_interval=DEFAULT_CHECKPOINT_S, metrics_path=None,
+                 seed=DEFAULT_SEED, verbose=False):
+        self.output_path, self.state_path, self.metrics_path = output_path, state_path, metrics_path
+        self.schema = schema or load_schema()
+        self.batch_size, self.max_latency = batch_size, max_latency
+        self.checkpoint_interval, self.verbose = checkpoint_interval, verbose
+        self.rng = np.random.RandomState(seed)
+
+        self.state = load_state(state_path)
+        checkpoint = self.state.pop("daemon", None) or {}
+        self.columns = checkpoint.get("columns")
+        if checkpoint.get("rng"):
+            # Imputation draws continue where the checkpointed batches left them
+            name, keys, pos, has_gauss, cached_gaussian = checkpoint["rng"]
+            self.rng.set_state((name, np.array(keys, dtype=np.uint32), pos, has_gauss, cached_gaussian))
+        self.aliases, self.dropped = {}, set()
+        self.tail = JsonlTail(source, checkpoint.get("offsets"))
+        # Offsets up to the last cleaned batch; the tail's own run ahead over pending lines
+        self.committed = dict(self.tail.offsets)
+        # Drop whatever was appended after the checkpoint; it is read again from the offsets
+        for path, size in ((output_path, checkpoint.get("output_bytes")), (REJECTED_PATH, checkpoint.get("rejected_bytes"))):
+            if size is not None and _file_size(path) > size:
+                with open(path, "r+b") as f:
+                    f.truncate(size)
+
+        self.pending, self.first_seen = [], None
+        self.stopping, self.dirty = False, False
+        self.last_checkpoint = time.monotonic()
+        self.started = time.monotonic()
+        self.totals = {"batches": 0, "rows": 0, "malformed_lines": 0, "dropped_fields": 0, "clean_s": 0.0}
+        self.recent = deque(maxlen=RECENT_BATCHES)
+
+    def stop(self, *_):
+        self.stopping = True
+
+    def poll(self):
+        """Read new submissions; True when a batch is due."""
+        lines = self.tail.read(self.batch_size - len(self.pending))
+        if lines and not self.pending:
+            self.first_seen = time.monotonic()
+        self.pending.extend(lines)
+        return bool(self.pending) and (len(self.pending) >= self.batch_size
+                                       or time.monotonic() - self.first_seen >= self.max_latency)
+
+    def _parse(self, lines):
+        records, malformed = [], 0
+        for line in lines:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if isinstance(record, dict):
+                nested = any(isinstance(value, (dict, list)) for value in record.values())
+                records.append(flatten(record) if nested else record)
+            else:
+                malformed += 1
+        if records and self.columns is None:
+            # The first batch fixes the output columns (the CSV header is written once)
+            self.columns = output_columns(dict.fromkeys(key for record in records for key in record), self.schema)
+        return self._align(records), malformed
+
+    def _align(self, records):
+        """Rename fields to the output column of the same schema field; drop the rest, with a warning."""
+        known = set(self.columns or [])
+        unknown = {key for record in records for key in record} - known - self.aliases.keys() - self.dropped
+        if unknown:
+            by_id = {}
+            for col, field_id in resolve_column_ids(self.columns, self.schema).items():
+                by_id.setdefault(field_id, col)
+            for key, field_id in resolve_column_ids(sorted(unknown), self.schema).items():
+                if field_id in by_id:
+                    self.aliases[key] = by_id[field_id]
+            dropped = sorted(unknown - self.aliases.keys())
+            if dropped:
+                self.dropped.update(dropped)
+                print(f"⚠️ Dropping fields that are not output columns / حقول غير موجودة في الملف الناتج: "
+                      f"{', '.join(dropped)}")
+        if self.aliases:
+            records = [{self.aliases.get(key, key): value for key, value in record.items()} for record in records]
+        self.totals["dropped_fields"] += sum(len(record.keys() - known) for record in records)
+        return records
+
+    def process_batch(self):
+        lines, first_seen, offsets = self.pending, self.first_seen, dict(self.tail.offsets)
+        self.pending, self.first_seen = [], None
+        start = time.perf_counter()
+        records, malformed = self._parse(lines)
+        before = dict(self.state["stats"] or {})
+        templates = list(self.state["templates"])
+        metrics = StageRecorder()
+        if records:
+            batch = pd.DataFrame(records, columns=self.columns, dtype=object)
+            fd, batch_path = tempfile.mkstemp(suffix=".csv", prefix="ingest_batch_",
+                                              dir=os.path.dirname(os.path.abspath(self.output_path)))
+            os.close(fd)
+            try:
+                batch.to_csv(batch_path, index=False)
+                # The per-run report of every batch would flood the log
+                quiet = contextlib.nullcontext() if self.verbose else contextlib.redirect_stdout(io.StringIO())
+                with quiet:
+                    run_pipeline_chunked(batch_path, self.output_path, max(len(batch), 1), self.schema,
+                                         rng=self.rng, metrics=metrics, state=self.state)
+            finally:
+                os.remove(batch_path)
+        clean_s = time.perf_counter() - start
+        stats = self.state["stats"] or {}
+        result = {
+            "batch": self.totals["batches"] + 1,
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "rows": len(records),
+            "kept": stats.get("final_rows", 0) - before.get("final_rows", 0),
+            "rejected": stats.get("rejected", 0) - before.get("rejected", 0),
+            "malformed_lines": malformed,
+            "clean_s": round(clean_s, 4),
+            "latency_s": round(time.monotonic() - first_seen, 4),
+            "rows_per_s": round(len(records) / clean_s, 1) if clean_s else None,
+            "stages": metrics.summary(),
+        }
+        self.committed = offsets
+        self.totals["batches"] += 1
+        self.totals["rows"] += len(records)
+        self.totals["malformed_lines"] += malformed
+        self.totals["clean_s"] += clean_s
+        self.recent.append(result)
+        self.dirty = True
+        print(f"📥 Batch {result['batch']}: {result['rows']} rows -> {result['kept']} kept, "
+              f"{result['rejected']} rejected in {clean_s * 1000:.0f} ms "
+              f"(latency {result['latency_s']:.2f} s, {result['rows_per_s'] or 0:,.0f} rows/s)")
+        if malformed:
+            print(f"⚠️ Skipped {malformed} lines that are not JSON objects.")
+        self.write_metrics()
+        # Template changes rewrite earlier outputs, which the truncation on restart cannot undo
+        if self.state["templates"] != templates:
+            self.checkpoint()
+        return result
+
+    def checkpoint(self):
+        if not self.state_path:
+            return
+        name, keys, pos, has_gauss, cached_gaussian = self.rng.get_state()
+        self.state["daemon"] = {"offsets": self.committed, "columns": self.columns,
+                                "rng": [name, keys.tolist(), int(pos), int(has_gauss), float(cached_gaussian)],
+                                "output_bytes": _file_size(self.output_path),
+                                "rejected_bytes": _file_size(REJECTED_PATH)}
+        try:
+            save_state(self.state_path, self.state)
+        finally:
+            del self.state["daemon"]
+        self.last_checkpoint, self.dirty = time.monotonic(), False
+
+    def metrics(self):
+        recent = list(self.recent)
+        busy = self.totals["clean_s"]
+        return {
+            **self.totals,
+            "clean_s": round(busy, 4),
+            "uptime_s": round(time.monotonic() - self.started, 4),
+            "rows_per_s": round(self.totals["rows"] / busy, 1) if busy else None,
+            "pending_rows": len(self.pending),
+            "recent_batches": len(recent),
+            "latency_s": _percentiles([b["latency_s"] for b in recent]),
+            "batch_clean_s": _percentiles([b["clean_s"] for b in recent]),
+            "last_batch": recent[-1] if recent else None,
+        }
+
+    def write_metrics(self):
+        if not self.metrics_path:
+            return
+        tmp_path = self.metrics_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.metrics(), f, indent=4, ensure_ascii=False)
+        os.replace(tmp_path, self.metrics_path)
+
+    def run(self, once=False, poll_interval=DEFAULT_POLL_S):
+        """Clean batches until stop() (or, with `once`, until the stream has nothing new)."""
+        while not self.stopping:
+            due = self.poll()
+            if due or (once and self.pending):
+                self.process_batch()
+                continue
+            if once:
+                break
+            if self.dirty and time.monotonic() - self.last_checkpoint >= self.checkpoint_interval:
+                self.checkpoint()
+            time.sleep(poll_interval)
+        if self.pending:
+            self.process_batch()
+        # Not after a failed batch: its rows are re-read from the last checkpoint instead
+        self.checkpoint()
+
+if __name__ == "__main__":
+    args = parse_args()
+    daemon = IngestDaemon(args.source, args.output, state_path=args.state,
+                          schema=load_schema(args.schema) if args.schema else None, batch_size=args.batch_size,
+                          max_latency=args.max_latency, checkpoint_interval=args.checkpoint_interval,
+                          metrics_path=args.metrics, seed=args.seed, verbose=args.verbose)
+    signal.signal(signal.SIGINT, daemon.stop)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    print(f"🔄 Tailing {args.source} (batches of ≤{args.batch_size} rows, ≤{args.max_latency} s wait). "
+          "Ctrl+C to stop.")
+    daemon.run(once=args.once, poll_interval=args.poll_interval)
+    print(f"💾 Stopped after {daemon.totals['batches']} batches, {daemon.totals['rows']} rows; "
+          f"state saved to {args.state}.")
@@ -0,0 +1,229 @@
+"""
+Cross-Field Logic Rules
+-----------------------
+قواعد الاتساق المنطقي بين الحقول
+
+A rule describes an impossible combination of answers as a Python-style
+expression over schema field/item IDs or raw column names:
+    DEM_RELATIONSHIP == 'أب' and health_guardianGender in ('أنثى', 'female')
+    IF_LOGINS == '0' and IF_STORIES != '0'
+    KN_AC != 4
+Supported: == != < <= > >= in, not in, and, or, not, parentheses, and
+missing(X). A comparison involving a missing answer is unknown, and
+unknown stays unknown through `not` (SQL-style three-valued logic), so
+blank answers never break a rule; the missingness checks deal with them.
+Text is compared by fold_text, so "ام" == "أم" and "Female" == "female".
+
+The rules come from the schema (dataQualityRules): one per attention
+check, plus every entry of consistencyRules. A rule naming a column the
+dataset does not have is skipped.
+
+Expressions are parsed once with Python's ast (nothing is eval'd) into
+predicates on single columns. Evaluation factorizes each column once for
+all rules, evaluates each predicate on the column's distinct values and
+maps the result to rows by code, then combines the masks with NumPy & | ~
+(a pair per node: rows where it is true, rows where it is known).
+There is no per-row Python, so hundreds of rules cost hundreds of array
+operations.
+"""
+
+import ast
+
+import numpy as np
+import pandas as pd
+
+from arabic_text import fold_many, fold_text
+from survey_schema import resolve_column_ids
+
+_COMPARISONS = {ast.Eq: "==", ast.NotEq: "!=", ast.Lt: "<", ast.LtE: "<=", ast.Gt: ">", ast.GtE: ">=",
+                ast.In: "in", ast.NotIn: "not in"}
+_FLIPPED = {"<": ">", "<=": ">=", ">": "<", ">=": "<=", "==": "==", "!=": "!="}
+_ORDERING = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal}
+
+def schema_rules(schema):
+    """Rule dicts (id, violation, reason) from the schema's attention checks and consistencyRules."""
+    quality = schema.get("dataQualityRules", {})
+    rules = [{"id": f"ATTENTION_{check['id']}",
+              "violation": f"{check['id']} != {check['expectedValue']!r}",
+              "reason": f"Failed Attention Check ({check['id']})"}
+             for check in quality.get("attentionChecks", [])]
+    for rule in quality.get("consistencyRules", []):
+        rules.append({"id": rule["id"], "violation": rule["violation"],
+                      "reason": f"Inconsistent Answers ({rule.get('descriptionEn', rule['id'])})"})
+    return rules
+
+def _constant(node, expression):
+    if isinstance(node, ast.Constant) and isinstance(node.value, (str, int, float)) \
+            and not isinstance(node.value, bool):
+        return node.value
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub) and isinstance(node.operand, ast.Constant):
+        return -node.operand.value
+    if isinstance(node, (ast.Tuple, ast.List, ast.Set)):
+        values = tuple(_constant(elt, expression) for elt in node.elts)
+        if len({isinstance(v, str) for v in values}) > 1:
+            raise ValueError(f"Mixed text and numbers in {ast.unparse(node)!r} ({expression})")
+        return values
+    raise ValueError(f"Expected a constant, got {ast.unparse(node)!r} ({expression})")
+
+def _comparison(left, op, right, expression):
+    if isinstance(right, ast.Name) and not isinstance(left, ast.Name) and op in _FLIPPED:
+        left, op, right = right, _FLIPPED[op], left
+    if not isinstance(left, ast.Name):
+        raise ValueError(f"Comparisons need a field on one side: {expression}")
+    value = _constant(right, expression)
+    if op in ("in", "not in") and not isinstance(value, tuple):
+        raise ValueError(f"'{op}' needs a tuple of values: {expression}")
+    if op in _ORDERING and not isinstance(value, (int, float)):
+        raise ValueError(f"'{op}' compares against one number: {expression}")
+    return ("cmp", left.id, op, value)
+
+def _parse(node, expression):
+    if isinstance(node, ast.BoolOp):
+        return ("and" if isinstance(node.op, ast.And) else "or", [_parse(v, expression) for v in node.values])
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        return ("not", _parse(node.operand, expression))
+    if isinstance(node, ast.Compare):
+        # a < b <= c means a < b and b <= c
+        terms = [node.left] + node.comparators
+        parts = [_comparison(terms[i], _COMPARISONS[type(op)], terms[i + 1], expression)
+                 for i, op in enumerate(node.ops)]
+        return parts[0] if len(parts) == 1 else ("and", parts)
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id == "missing" \
+            and len(node.args) == 1 and isinstance(node.args[0], ast.Name):
+        return ("missing", node.args[0].id)
+    raise ValueError(f"Unsupported expression {ast.unparse(node)!r} ({expression})")
+
+def parse_rule(expression):
+    """Predicate tree of a rule expression; ValueError on anything outside the rule language."""
+    try:
+        tree = ast.parse(expression.strip(), mode="eval").body
+    except SyntaxError as e:
+        raise ValueError(f"Invalid rule expression {expression!r}: {e.msg}") from None
+    return _parse(tree, expression)
+
+def _names(tree):
+    if tree[0] in ("and", "or"):
+        return [name for child in tree[1] for name in _names(child)]
+    if tree[0] == "not":
+        return _names(tree[1])
+    return [tree[1]]
+
+def _bind(tree, columns):
+    """The tree with field names replaced by dataset columns."""
+    if tree[0] in ("and", "or"):
+        return (tree[0], [_bind(child, columns) for child in tree[1]])
+    if tree[0] == "not":
+        return ("not", _bind(tree[1], columns))
+    return (tree[0], columns[tree[1]]) + tree[2:]
+
+def compile_rules(rules, columns, schema):
+    """
+    The `rules` that apply to a dataset with `columns`, each with its
+    parsed "tree" bound to column names and the "columns" it reads.
+    """
+    by_id = {}
+    for col, item_id in resolve_column_ids(columns, schema).items():
+        by_id.setdefault(item_id, col)
+    names = {**by_id, **{str(c): c for c in columns}}
+    compiled = []
+    for rule in rules:
+        tree = parse_rule(rule["violation"])
+        used = list(dict.fromkeys(_names(tree)))
+        if all(name in names for name in used):
+            compiled.append(dict(rule, tree=_bind(tree, names), columns=[names[n] for n in used]))
+    return compiled
+
+def build_logic_rules(columns, schema):
+    """Compiled schema rules for a dataset with `columns`."""
+    return compile_rules(schema_rules(schema), columns, schema)
+
+def _as_text(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return value if isinstance(value, str) else str(value)
+
+class _ColumnValues:
+    """Each column factorized once; predicates run on its distinct values."""
+
+    def __init__(self, df):
+        self.df = df
+        self._factorized, self._folded, self._numbers = {}, {}, {}
+
+    def factorized(self, col):
+        if col not in self._factorized:
+            values = self.df[col]
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+            else:
+                codes, uniques = pd.factorize(values)
+            self._factorized[col] = (codes, np.asarray(uniques, dtype=object))
+        return self._factorized[col]
+
+    def folded(self, col):
+        if col not in self._folded:
+            uniques = self.factorized(col)[1]
+            self._folded[col] = np.array(fold_many([_as_text(v) for v in uniques]), dtype=object)
+        return self._folded[col]
+
+    def numbers(self, col):
+        if col not in self._numbers:
+            uniques = self.factorized(col)[1]
+            self._numbers[col] = pd.to_numeric(pd.Series(uniques, dtype=object), errors="coerce").to_numpy(float)
+        return self._numbers[col]
+
+    def predicate(self, col, op, value):
+        """
+        Two booleans per distinct value of `col`: does it satisfy `col op value`,
+        and is it an answer at all (blank and non-numbers for numeric tests are not)?
+        """
+        values = value if isinstance(value, tuple) else (value,)
+        if op in _ORDERING:
+            numbers = self.numbers(col)
+            return _ORDERING[op](numbers, value), ~np.isnan(numbers)
+        if values and isinstance(values[0], str):
+            keys = self.folded(col)
+            present = keys != ""
+            hit = np.isin(keys, [fold_text(v) for v in values])
+        else:
+            numbers = self.numbers(col)
+            present = ~np.isnan(numbers)
+            hit = np.isin(numbers, values)
+        return present & (hit if op in ("==", "in") else ~hit), present
+
+    def masks(self, tree):
+        """(rows where `tree` is true, rows where it is known); a missing answer makes a comparison unknown."""
+        kind = tree[0]
+        if kind in ("and", "or"):
+            children = [self.masks(child) for child in tree[1]]
+            true = np.logical_and.reduce([t for t, _ in children]) if kind == "and" \
+                else np.logical_or.reduce([t for t, _ in children])
+            false = np.logical_or.reduce([k & ~t for t, k in children]) if kind == "and" \
+                else np.logical_and.reduce([k & ~t for t, k in children])
+            return true, true | false
+        if kind == "not":
+            true, known = self.masks(tree[1])
+            return known & ~true, known
+        codes, _ = self.factorized(tree[1])
+        if kind == "missing":
+            blank = self.folded(tree[1]) == ""
+            true = np.append(blank, True)[codes]  # code -1 (NaN) -> True
+            return true, np.ones(len(codes), dtype=bool)
+        hit, present = self.predicate(*tree[1:])
+        return np.append(hit, False)[codes], np.append(present, False)[codes]
+
+    def mask(self, tree):
+        """Rows where `tree` is true (unknown counts as not broken)."""
+        return self.masks(tree)[0]
+
+def rule_violations(df, rules):
+    """
+    Boolean frame (rows x rules), True where a row breaks a compiled rule.
+    Same layout as the ETL's range_violations.
+    """
+    values = _ColumnValues(df)
+    violations = {rule["id"]: values.mask(rule["tree"]) for rule in rules}
+    return pd.DataFrame(violations, index=df.index, columns=[r["id"] for r in rules])
+
+def rule_violation_counts(df, rules):
+    """{rule id: rows breaking it}."""
+    return {rule_id: int(n) for rule_id, n in rule_violations(df, rules).sum().items()}
@@ -0,0 +1,111 @@
+"""
+Near-Duplicate Open Text Detection (MinHash / LSH)
+--------------------------------------------------
+كشف النصوص المفتوحة شبه المكررة
+
+Pairwise Levenshtein is O(n²). Here each answer is reduced to Arabic-aware
+character shingles, summarised as a MinHash signature, and bucketed with
+LSH banding so only answers sharing a band are ever compared. Cost is
+roughly linear in the number of answers.
+"""
+
+import numpy as np
+import pandas as pd
+
+from arabic_text import open_text_key
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+def shingle_hashes(texts, k=3):
+    """
+    Hashes of the distinct k-character shingles of each normalized string,
+    flattened into one uint64 array plus the shingle count per string.
+    """
+    grams, lengths = [], []
+    for text in texts:
+        if len(text) <= k:
+            doc = {text} if text else set()
+        else:
+            doc = {text[i:i + k] for i in range(len(text) - k + 1)}
+        grams.extend(doc)
+        lengths.append(len(doc))
+    hashes = pd.util.hash_array(np.array(grams, dtype=object)) & _MAX_HASH
+    return hashes, np.array(lengths, dtype=np.int64)
+
+def _permutations(num_perm, seed):
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+    b = rng.randint(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+    return a, b
+
+def minhash_signatures(hashes, lengths, num_perm=64, seed=42, batch_shingles=200_000):
+    """
+    (n_docs x num_perm) MinHash matrix from shingle_hashes() output.
+    Documents are processed in batches and reduced with np.minimum.reduceat,
+    so there is no per-document loop.
+    """
+    a, b = _permutations(num_perm, seed)
+    n = len(lengths)
+    sigs = np.full((n, num_perm), _MAX_HASH, dtype=np.uint64)
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+
+    doc = 0
+    while doc < n:
+        # Take as many documents as fit in ~batch_shingles shingles (at least one)
+        stop = max(doc + 1, int(np.searchsorted(ends, starts[doc] + batch_shingles, side="right")))
+        docs = np.arange(doc, stop)[lengths[doc:stop] > 0]
+        if len(docs):
+            flat = hashes[starts[doc]:ends[stop - 1]]
+            offsets = starts[docs] - starts[doc]
+            with np.errstate(over="ignore"):
+                hv = ((np.outer(a, flat) + b[:, None]) % _MERSENNE_PRIME) & _MAX_HASH
+            sigs[docs] = np.minimum.reduceat(hv, offsets, axis=1).T
+        doc = stop
+    return sigs
+
+def lsh_bands(threshold, num_perm):
+    """
+    Pick (bands, rows) with bands * rows == num_perm whose S-curve midpoint
+    (1/bands) ** (1/rows) sits closest to the similarity threshold.
+    """
+    options = [(num_perm // r, r) for r in range(1, num_perm + 1) if num_perm % r == 0]
+    return min(options, key=lambda br: abs((1.0 / br[0]) ** (1.0 / br[1]) - threshold))
+
+def near_duplicate_mask(texts, threshold=0.8, num_perm=64, shingle_size=3, min_chars=10, seed=42):
+    """
+    Boolean array, True for answers that are near-duplicates (estimated
+    Jaccard >= threshold) of an earlier answer. The first occurrence of each
+    group is kept. Answers shorter than `min_chars` after normalization
+    ("لا يوجد", "الوقت", ...) are legitimately common and never flagged.
+    """
+    texts = pd.Series(texts).reset_index(drop=True)
+    flagged = np.zeros(len(texts), dtype=bool)
+
+    normalized = open_text_key(texts)
+    eligible = np.flatnonzero(normalized.str.len().to_numpy() > min_chars)
+    if len(eligible) < 2:
+        return flagged
+
+    # Identical normalized strings share one signature
+    uniques, inverse = np.unique(normalized.to_numpy()[eligible].astype(str), return_inverse=True)
+    hashes, lengths = shingle_hashes(uniques, shingle_size)
+    sigs = minhash_signatures(hashes, lengths, num_perm=num_perm, seed=seed)[inverse.ravel()]
+
+    bands, rows = lsh_bands(threshold, num_perm)
+    is_dupe = np.zeros(len(eligible), dtype=bool)
+    for band in range(bands):
+        block = np.ascontiguousarray(sigs[:, band * rows:(band + 1) * rows])
+        keys = block.view(np.dtype((np.void, block.dtype.itemsize * rows))).ravel()
+        _, first, bucket = np.unique(keys, return_index=True, return_inverse=True)
+        # Compare each answer only with the earliest answer in its bucket
+        rep = first[bucket.ravel()]
+        cand = np.flatnonzero(rep != np.arange(len(eligible)))
+        if len(cand) == 0:
+            continue
+        similarity = (sigs[cand] == sigs[rep[cand]]).mean(axis=1)
+        is_dupe[cand[similarity >= threshold]] = True
+
+    flagged[eligible[is_dupe]] = True
+    return flagged
@@ -0,0 +1,112 @@
+"""
+Rejection Ledger
+----------------
+سجل الصفوف المرفوضة بمواقعها وأسبابها
+
+Instead of copying every rejected row into a growing DataFrame, a run
+keeps one small integer per input row:
+  - failed: bitmask of the checks the row failed (bit i = stage i). A row
+    can fail several, e.g. an exact duplicate that is also out of range.
+  - removed_by: the reason that removed it (the first stage it failed in
+    pipeline order), as an index into the interned reason labels.
+The rejected table is materialized once, at the end, with a single `take`
+on the input frame, so memory is a few bytes per row until then.
+"""
+
+import numpy as np
+import pandas as pd
+
+REASONS_SEPARATOR = "; "
+
+class RejectionLedger:
+    def __init__(self, n_rows, stages):
+        if len(stages) > 16:
+            raise ValueError("RejectionLedger supports at most 16 stages")
+        self.stages = list(stages)
+        self.failed = np.zeros(n_rows, dtype=np.uint16)
+        self.removed_by = np.full(n_rows, -1, dtype=np.int32)
+        self.labels = []
+        self._label_codes = {}
+
+    @property
+    def alive(self):
+        """Rows not rejected so far."""
+        return self.removed_by < 0
+
+    def __len__(self):
+        return int((self.removed_by >= 0).sum())
+
+    def _bit(self, stage):
+        return np.uint16(1 << self.stages.index(stage))
+
+    def flag(self, stage, failed):
+        """Record that rows (bool mask over all input rows) fail `stage`, rejected or not."""
+        self.failed[np.asarray(failed, dtype=bool)] |= self._bit(stage)
+
+    def reject(self, stage, failed, reasons=None):
+        """
+        Flag `failed` and remove the rows among them that are still alive,
+        with `reasons` (one per True in `failed`) or the stage name as the
+        rejection reason. Returns the mask of newly removed rows.
+        """
+        failed = np.asarray(failed, dtype=bool)
+        removed = failed & self.alive
+        self.flag(stage, failed)
+        if reasons is None:
+            reasons = np.full(int(removed.sum()), stage, dtype=object)
+        else:
+            reasons = np.asarray(reasons, dtype=object)[removed[failed]]
+        codes, uniques = pd.factorize(reasons)
+        for label in uniques:
+            if label not in self._label_codes:
+                self._label_codes[label] = len(self.labels)
+                self.labels.append(label)
+        lookup = np.array([self._label_codes[label] for label in uniques], dtype=np.int32)
+        self.removed_by[removed] = lookup[codes]
+        return removed
+
+    def multi_reason_count(self):
+        """Rejected rows that failed more than one stage."""
+        combos, counts = np.unique(self.failed[self.removed_by >= 0], return_counts=True)
+        return int(sum(n for combo, n in zip(combos, counts) if bin(int(combo)).count("1") > 1))
+
+    def failed_reasons(self, bits):
+        """'; '-joined stage names of each bitmask in `bits`."""
+        combos, inverse = np.unique(bits, return_inverse=True)
+        text = np.array([REASONS_SEPARATOR.join(s for i, s in enumerate(self.stages) if int(c) >> i & 1)
+                         for c in combos], dtype=object)
+        return text[inverse.ravel()]
+
+    def materialize(self, df):
+        """
+        The rejected rows of `df` (the frame the ledger's positions refer to)
+        in input order, with `rejection_reason` (the reason that removed the
+        row) and `rejection_reasons` (every stage it failed).
+        """
+        positions = np.flatnonzero(self.removed_by >= 0)
+        rejected = df.take(positions)
+        labels = np.array(self.labels, dtype=object)
+        rejected["rejection_reason"] = labels[self.removed_by[positions]]
+        rejected["rejection_reasons"] = self.failed_reasons(self.failed[positions])
+        return rejected
+
+def retag_reasons(reasons, stages, stage, present):
+    """
+    `reasons` ('; '-joined stage names, as written by materialize) with
+    `stage` added where `present` is True and dropped elsewhere, in pipeline
+    order. For rows written out before a dataset-wide check (the template
+    stage of a streaming run) was decided.
+    """
+    reasons = pd.Series(reasons).fillna("")
+    combos = pd.MultiIndex.from_arrays([reasons.to_numpy(dtype=object), np.asarray(present, dtype=bool)])
+    codes, uniques = combos.factorize()
+    text = []
+    for joined, flagged in uniques:
+        names = set(joined.split(REASONS_SEPARATOR)) - {""}
+        names = names | {stage} if flagged else names - {stage}
+        text.append(REASONS_SEPARATOR.join(s for s in stages if s in names))
+    return pd.Series(np.array(text, dtype=object)[codes], index=reasons.index)
+
+def multi_reason_rows(reasons):
+    """Rows of a written `rejection_reasons` column that list more than one stage."""
+    return int(pd.Series(reasons).fillna("").str.contains(REASONS_SEPARATOR, regex=False).sum())
@@ -0,0 +1,125 @@
+"""
+Content-Addressed Result Cache
+------------------------------
+تخزين مؤقت لنتائج التنظيف والفحص عند عدم تغير المدخلات
+
+A run's key is the SHA-256 of the input file's bytes, the rule
+configuration the caller passes (schema content, thresholds, flags) and
+the code version (the source of every script in this directory, plus the
+pandas and NumPy versions). A hit copies the stored outputs back instead
+of recomputing them.
+
+Entries live in <cache dir>/<key>/ and are written to a temporary
+directory first, then renamed, so an interrupted run never leaves a half
+entry. When the cache exceeds its size limit the least recently used
+entries are removed (use = last hit or store).
+
+Location: --cache-dir, else $NUTRIAWARE_CACHE_DIR, else ~/.cache/nutriaware.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CACHE_DIR = os.environ.get("NUTRIAWARE_CACHE_DIR") or os.path.join(
+    os.path.expanduser("~"), ".cache", "nutriaware")
+DEFAULT_MAX_MB = 1024
+META_FILE = "meta.json"
+_SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+_BLOCK = 1 << 20
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while block := f.read(_BLOCK):
+            digest.update(block)
+    return digest.hexdigest()
+
+def code_version():
+    """Digest of every script here plus the libraries that shape the output."""
+    digest = hashlib.sha256(f"pandas={pd.__version__};numpy={np.__version__}".encode())
+    for path in sorted(glob.glob(os.path.join(_SCRIPTS_DIR, "*.py"))):
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def _entry_size(path):
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names)
+
+class ResultCache:
+    def __init__(self, root=None, max_mb=DEFAULT_MAX_MB):
+        self.root = root or DEFAULT_CACHE_DIR
+        self.max_bytes = int(max_mb * 1024 ** 2)
+        os.makedirs(self.root, exist_ok=True)
+
+    def key(self, kind, input_path, config):
+        """Cache key for running `kind` on `input_path` with `config` (JSON-serialisable)."""
+        payload = json.dumps({"kind": kind, "input": file_digest(input_path), "config": config,
+                              "code": code_version()}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self.root, key)
+
+    def lookup(self, key):
+        """Stored metadata on a hit (and marks the entry used), else None."""
+        meta_path = os.path.join(self._entry(key), META_FILE)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        os.utime(meta_path)
+        return meta
+
+    def restore(self, key, files):
+        """Copy the stored files to {name: destination path}. False on a miss."""
+        meta = self.lookup(key)
+        if meta is None or not set(files) <= set(meta["files"]):
+            return False
+        for name, dest in files.items():
+            shutil.copyfile(os.path.join(self._entry(key), name), dest)
+        return True
+
+    def store(self, key, files=None, data=None):
+        """Store {name: source path} copies and a JSON-serialisable `data` under `key`."""
+        files = files or {}
+        tmp = tempfile.mkdtemp(dir=self.root, prefix=".tmp-")
+        try:
+            for name, src in files.items():
+                shutil.copyfile(src, os.path.join(tmp, name))
+            with open(os.path.join(tmp, META_FILE), "w", encoding="utf-8") as f:
+                json.dump({"created": time.time(), "files": sorted(files), "data": data}, f, ensure_ascii=False)
+            entry = self._entry(key)
+            if os.path.exists(entry):
+                shutil.rmtree(entry)
+            os.rename(tmp, entry)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            meta_path = os.path.join(path, META_FILE)
+            if name.startswith(".") or not os.path.exists(meta_path):
+                continue
+            entries.append((os.path.getmtime(meta_path), _entry_size(path), path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
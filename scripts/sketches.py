@@ -0,0 +1,134 @@
+"""
+Fixed-Memory Sketches
+---------------------
+هياكل بيانات تقريبية بذاكرة ثابتة للبيانات الكبيرة
+
+Bloom filter (seen-before tests for duplicate rates) and count-min sketch
+with top-k tracking (dominant-value shares). Both take uint64 hashes from
+`hash_values` and update a whole chunk per call with NumPy, so their
+memory is set by the error parameters, not by the number of rows.
+
+Error bounds:
+  BloomFilter(capacity n, fpr p): m = -n ln p / (ln 2)^2 bits and
+    k = (m / n) ln 2 hash functions. A new key is reported as seen with
+    probability <= p while at most n keys have been added, so counted
+    duplicates are an overestimate by at most p * rows in expectation.
+    Past `capacity` the false-positive rate rises; `expected_fpr()`
+    reports the current value.
+  CountMinTopK(epsilon, delta): width ceil(e / epsilon) counters in each of
+    ceil(ln(1 / delta)) rows. Every estimate is >= the true count and,
+    with probability >= 1 - delta, <= true count + epsilon * N (N = total
+    counted). The top value's estimated share is therefore within
+    [true top share, true top share + epsilon]; when two values are closer
+    than epsilon the reported *value* may be either.
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+def hash_values(values, categorize=True):
+    """
+    uint64 hash per element (Series) or per row (DataFrame), stable across
+    chunks. `categorize` speeds up repetitive columns; turn it off for
+    values that are already unique.
+    """
+    return pd.util.hash_pandas_object(values, index=False, categorize=categorize).to_numpy(dtype=np.uint64)
+
+def _probe_positions(hashes, k, size):
+    """k positions per hash by double hashing: (h1 + i * h2) mod size."""
+    h1 = (hashes & np.uint64(0xFFFFFFFF)).astype(np.uint64)
+    h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+    steps = np.arange(k, dtype=np.uint64)[:, None]
+    return (h1[None, :] + steps * h2[None, :]) % np.uint64(size)
+
+class BloomFilter:
+    def __init__(self, capacity, fpr=0.001):
+        self.capacity = max(1, int(capacity))
+        self.fpr = fpr
+        self.size = max(8, math.ceil(-self.capacity * math.log(fpr) / math.log(2) ** 2))
+        self.k = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        self.added = 0
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def expected_fpr(self):
+        """False-positive rate for the keys added so far."""
+        return (1 - math.exp(-self.k * self.added / self.size)) ** self.k
+
+    def add_and_check(self, hashes):
+        """
+        Boolean array: True where the key was already present (in an earlier
+        call, or earlier in `hashes`). All keys are added.
+        """
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        # Repeats inside the chunk are exact; the filter answers for earlier chunks
+        seen = pd.Series(hashes).duplicated().to_numpy(copy=True)
+        first = np.flatnonzero(~seen)
+        positions = _probe_positions(hashes[first], self.k, self.size)
+        byte, bit = (positions >> np.uint64(3)).astype(np.intp), (positions & np.uint64(7)).astype(np.uint8)
+        present = ((self.bits[byte] >> bit) & 1).astype(bool).all(axis=0)
+        seen[first[present]] = True
+        np.bitwise_or.at(self.bits, byte.ravel(), np.left_shift(np.uint8(1), bit.ravel()))
+        self.added += len(first) - int(present.sum())
+        return seen
+
+class CountMinTopK:
+    def __init__(self, epsilon=0.001, delta=0.001, k=32):
+        self.epsilon = epsilon
+        self.delta = delta
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        self.table = np.zeros((self.depth, self.width), dtype=np.int64)
+        self.k = k
+        self.total = 0
+        self.candidates = {}  # value -> hash, at most k entries
+
+    @property
+    def nbytes(self):
+        return self.table.nbytes
+
+    def _estimate(self, hashes):
+        positions = _probe_positions(hashes, self.depth, self.width).astype(np.intp)
+        return self.table[np.arange(self.depth)[:, None], positions].min(axis=0)
+
+    def update(self, values):
+        """Count the non-null elements of a Series."""
+        counts = values.dropna().value_counts()
+        counts = counts[counts > 0]  # categoricals list unused categories
+        if counts.empty:
+            return
+        # Hash as objects so a value hashes the same whatever a chunk's dtype is
+        hashes = hash_values(pd.Series(np.asarray(counts.index, dtype=object)), categorize=False)
+        positions = _probe_positions(hashes, self.depth, self.width).astype(np.intp)
+        weights = counts.to_numpy(dtype=np.float64)
+        for row in range(self.depth):
+            self.table[row] += np.bincount(positions[row], weights=weights, minlength=self.width).astype(np.int64)
+        self.total += int(counts.sum())
+
+        # Candidates: previous top-k plus this chunk's k best, re-estimated
+        chunk_best = self._estimate(hashes)
+        if len(chunk_best) > self.k:
+            chunk_best = np.argpartition(-chunk_best, self.k - 1)[: self.k]
+        else:
+            chunk_best = np.arange(len(chunk_best))
+        pool = dict(self.candidates)
+        pool.update(zip(counts.index[chunk_best], hashes[chunk_best]))
+        estimates = self._estimate(np.fromiter(pool.values(), dtype=np.uint64, count=len(pool)))
+        keep = np.argsort(-estimates, kind="stable")[: self.k]
+        items = list(pool.items())
+        self.candidates = dict(items[i] for i in keep)
+
+    def top(self):
+        """[(value, estimated count)] for the tracked candidates, largest first."""
+        if not self.candidates:
+            return []
+        estimates = self._estimate(np.fromiter(self.candidates.values(), dtype=np.uint64,
+                                               count=len(self.candidates)))
+        order = np.argsort(-estimates, kind="stable")
+        values = list(self.candidates)
+        return [(values[i], int(estimates[i])) for i in order]
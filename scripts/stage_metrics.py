@@ -0,0 +1,127 @@
+"""
+ETL Stage Instrumentation
+-------------------------
+قياس زمن وذاكرة كل مرحلة في خط المعالجة
+
+Records wall time, CPU time (including finished worker processes), peak
+RSS and optionally tracemalloc allocations for every pipeline stage, plus
+rows in/out. A stage entered several times (once per chunk in streaming
+mode) is summed in the summary and kept as separate events in the trace.
+
+The trace file uses the Chrome trace-event format; open it in
+chrome://tracing or https://ui.perfetto.dev.
+"""
+
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def peak_rss_mb():
+    """Process high-water mark of resident memory, or None where unsupported."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 ** 2 if sys.platform == "darwin" else 1024)
+
+def cpu_seconds():
+    """User + system CPU of this process and of its reaped children (--workers)."""
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system
+
+class StageRecorder:
+    """
+    Usage:
+        metrics = StageRecorder()
+        with metrics.stage("exact_duplicates", rows_in=len(df)) as s:
+            ...
+            s["rows_out"] = len(df)
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.events = []
+        self._origin = time.perf_counter()
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name, rows_in=None):
+        event = {"name": name, "rows_in": rows_in, "rows_out": None}
+        rss_before = peak_rss_mb()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            alloc_before = tracemalloc.get_traced_memory()[0]
+        cpu_start = cpu_seconds()
+        start = time.perf_counter()
+        try:
+            yield event
+        finally:
+            event["start_s"] = start - self._origin
+            event["wall_s"] = time.perf_counter() - start
+            event["cpu_s"] = cpu_seconds() - cpu_start
+            event["peak_rss_mb"] = peak_rss_mb()
+            event["rss_growth_mb"] = None if rss_before is None else event["peak_rss_mb"] - rss_before
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                event["alloc_peak_mb"] = (peak - alloc_before) / 1024 ** 2
+                event["alloc_delta_mb"] = (current - alloc_before) / 1024 ** 2
+            self.events.append(event)
+
+    def summary(self):
+        """Per-stage totals in first-seen order, for quality_summary.json."""
+        stages = {}
+        for event in self.events:
+            s = stages.setdefault(event["name"], {
+                "stage": event["name"], "calls": 0, "wall_s": 0.0, "cpu_s": 0.0,
+                "rows_in": None, "rows_out": None, "peak_rss_mb": None, "rss_growth_mb": None,
+            })
+            s["calls"] += 1
+            s["wall_s"] += event["wall_s"]
+            s["cpu_s"] += event["cpu_s"]
+            for key in ("rows_in", "rows_out", "rss_growth_mb"):
+                if event[key] is not None:
+                    s[key] = (s[key] or 0) + event[key]
+            if event["peak_rss_mb"] is not None:
+                s["peak_rss_mb"] = max(s["peak_rss_mb"] or 0, event["peak_rss_mb"])
+            if self.trace_memory:
+                s["alloc_peak_mb"] = max(s.get("alloc_peak_mb", 0.0), event["alloc_peak_mb"])
+                s["alloc_delta_mb"] = s.get("alloc_delta_mb", 0.0) + event["alloc_delta_mb"]
+        for s in stages.values():
+            for key, value in s.items():
+                if isinstance(value, float):
+                    s[key] = round(value, 4)
+        return list(stages.values())
+
+    def write_chrome_trace(self, path):
+        """One complete ("X") event per stage entry, with the metrics as args."""
+        pid = os.getpid()
+        trace = []
+        for event in self.events:
+            args = {k: v for k, v in event.items() if k not in ("name", "start_s", "wall_s")}
+            trace.append({
+                "name": event["name"], "cat": "etl", "ph": "X", "pid": pid, "tid": 0,
+                "ts": round(event["start_s"] * 1e6), "dur": round(event["wall_s"] * 1e6), "args": args,
+            })
+            if event["peak_rss_mb"] is not None:
+                trace.append({"name": "peak_rss_mb", "ph": "C", "pid": pid, "tid": 0,
+                              "ts": round((event["start_s"] + event["wall_s"]) * 1e6),
+                              "args": {"peak_rss_mb": round(event["peak_rss_mb"], 2)}})
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+
+    def print_table(self):
+        print(f"\n{'stage':<20} {'calls':>5} {'wall s':>8} {'cpu s':>8} {'rows in':>10} {'rows out':>10} {'peak RSS MB':>11}")
+        for s in self.summary():
+            rss = "" if s["peak_rss_mb"] is None else f"{s['peak_rss_mb']:.0f}"
+            rows_in = "" if s["rows_in"] is None else s["rows_in"]
+            rows_out = "" if s["rows_out"] is None else s["rows_out"]
+            print(f"{s['stage']:<20} {s['calls']:>5} {s['wall_s']:>8.3f} {s['cpu_s']:>8.3f} {rows_in:>10} {rows_out:>10} {rss:>11}")
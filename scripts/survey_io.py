@@ -0,0 +1,121 @@
+"""
+NutriAware Survey Table I/O
+---------------------------
+قراءة وكتابة ملفات البيانات (CSV / Parquet / Feather)
+
+The format is picked from the file extension. Parquet and Arrow IPC
+(Feather) need pyarrow; CSV works with plain pandas.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+PARQUET_EXTS = (".parquet", ".pq")
+ARROW_EXTS = (".feather", ".arrow", ".ipc")
+
+# A text column becomes `category` when it has at most this many distinct
+# values per row (Arabic answer options repeat; free text does not)
+CATEGORY_MAX_UNIQUE_RATIO = 0.5
+
+def table_format(path):
+    ext = os.path.splitext(str(path))[1].lower()
+    if ext in PARQUET_EXTS:
+        return "parquet"
+    if ext in ARROW_EXTS:
+        return "arrow"
+    return "csv"
+
+def read_table(path, columns=None, **csv_kwargs):
+    """Read CSV, Parquet or Arrow IPC/Feather; `columns` is pushed down to the reader."""
+    fmt = table_format(path)
+    if fmt == "parquet":
+        return pd.read_parquet(path, columns=columns)
+    if fmt == "arrow":
+        return pd.read_feather(path, columns=columns)
+    return pd.read_csv(path, usecols=columns, **csv_kwargs)
+
+def read_table_chunks(path, chunksize, columns=None, **csv_kwargs):
+    """Yield DataFrames of at most `chunksize` rows, without loading the whole table."""
+    fmt = table_format(path)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+    elif fmt == "arrow":
+        import pyarrow as pa
+        with pa.memory_map(str(path)) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                if columns is not None:
+                    batch = batch.select(columns)
+                for start in range(0, batch.num_rows, chunksize):
+                    yield batch.slice(start, chunksize).to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunksize, **csv_kwargs)
+
+def read_columns(path):
+    """Column names without loading any rows."""
+    fmt = table_format(path)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return list(pq.read_schema(path).names)
+    if fmt == "arrow":
+        import pyarrow as pa
+        with pa.memory_map(str(path)) as source:
+            return list(pa.ipc.open_file(source).schema.names)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+def _arrow_safe(df):
+    """Arrow needs one type per column; rejected raw rows can mix numbers and text."""
+    mixed = [c for c in df.columns if pd.api.types.is_object_dtype(df[c])
+             and pd.api.types.infer_dtype(df[c], skipna=True).startswith("mixed")]
+    if mixed:
+        df = df.copy()
+        for col in mixed:
+            df[col] = df[col].astype("string")
+    return df
+
+def write_table(df, path):
+    fmt = table_format(path)
+    if fmt != "csv":
+        df = _arrow_safe(df)
+    if fmt == "parquet":
+        df.to_parquet(path, index=False)
+    elif fmt == "arrow":
+        df.reset_index(drop=True).to_feather(path)
+    else:
+        df.to_csv(path, index=False)
+
+def categorize(df, exclude=()):
+    """Cast low-cardinality text columns to `category` (lossless)."""
+    for col in df.columns:
+        if col in exclude or isinstance(df[col].dtype, pd.CategoricalDtype):
+            continue
+        if not (pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col])):
+            continue
+        n_unique = df[col].nunique(dropna=True)
+        if n_unique <= max(1, len(df) * CATEGORY_MAX_UNIQUE_RATIO):
+            df[col] = df[col].astype("category")
+    return df
+
+def compact_numeric(df, columns):
+    """
+    Downcast validated numeric columns (Likert items, NPS, DDS) to the
+    smallest nullable integer dtype, or float32 if they hold fractions.
+    Only call this after range validation: unparseable values become NA.
+    """
+    for col in columns:
+        values = pd.to_numeric(df[col], errors="coerce")
+        present = values.dropna()
+        if present.empty or np.array_equal(present, np.floor(present)):
+            lo, hi = (present.min(), present.max()) if not present.empty else (0, 0)
+            for dtype, info in (("Int8", np.iinfo(np.int8)), ("Int16", np.iinfo(np.int16)), ("Int32", np.iinfo(np.int32))):
+                if info.min <= lo and hi <= info.max:
+                    df[col] = values.astype(dtype)
+                    break
+        else:
+            df[col] = values.astype("float32")
+    return df
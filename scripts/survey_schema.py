@@ -0,0 +1,171 @@
+"""
+NutriAware Survey Schema Helpers
+--------------------------------
+قراءة مخطط الاستبيان (docs/surveySchema.json) للسكربتات
+
+Shared by the ETL and CI scripts so validation bounds come from the
+instrument definition instead of being hard-coded per column.
+"""
+
+import json
+import os
+
+DEFAULT_SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "docs", "surveySchema.json")
+
+# Flat export columns that predate the schema item IDs (see src/lib/surveyExport.ts)
+# أعمدة التصدير القديمة وما يقابلها في المخطط
+LEGACY_COLUMN_ALIASES = {
+    "nps_score": "NPS1",
+}
+LEGACY_SECTION_PREFIXES = {
+    "knowledge": "nutritionalKnowledge",
+    "practices": "dietaryPractices",
+    "satisfaction": "satisfaction",
+    "retro": "retrospective",
+}
+# v1 demographic/health export columns and their schema field IDs
+LEGACY_FIELD_ALIASES = {
+    "demo_relationship": "DEM_RELATIONSHIP",
+    "demo_parentAge": "DEM_PARENT_AGE",
+    "demo_education": "DEM_EDUCATION",
+    "demo_childrenCount": "DEM_CHILDREN_COUNT",
+    "demo_childAge": "DEM_CHILD_AGE",
+    "health_gender": "HI_GENDER",
+    "health_weightPerception": "HI_WEIGHT_PERCEPTION",
+}
+# v1 open-ended answer columns and their schema item IDs
+LEGACY_OPEN_TEXT_ALIASES = {
+    "open_likes": "OE1",
+    "open_challenges": "OE2",
+    "open_suggestions": "OE3",
+}
+
+# Words that generated open-ended answers (synthetic_survey.py, the load
+# test payloads) are drawn from / مفردات الإجابات المفتوحة المولّدة
+OPEN_TEXT_WORDS = [
+    "طفلي", "يرفض", "الخضروات", "الوجبات", "السريعة", "الوقت", "ضيق", "المنصة", "القصص", "مفيدة",
+    "الأسعار", "مرتفعة", "المدرسة", "الحلويات", "السكريات", "أتمنى", "إضافة", "وصفات", "صحية", "سهلة",
+    "الاستشارات", "ساعدتني", "فهم", "التغذية", "السليمة", "الإفطار", "الحليب", "الفواكه", "الماء", "النوم",
+]
+
+def load_schema(path=None):
+    with open(path or DEFAULT_SCHEMA_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+def section_bounds(schema):
+    """(min, max) answer range of every scored section, keyed by section id."""
+    bounds = {}
+    for section in schema.get("sections", []):
+        kind = section.get("type")
+        if kind == "likert":
+            bounds[section["id"]] = (1, section.get("scaleLength", 5))
+        elif kind in ("nps", "slider_paired") and "scale" in section:
+            bounds[section["id"]] = (section["scale"]["min"], section["scale"]["max"])
+        elif kind == "binary_checklist":
+            bounds[section["id"]] = (0, 1)
+    return bounds
+
+def item_bounds(schema):
+    """(min, max) answer range of every scored item, keyed by schema item id."""
+    per_section = section_bounds(schema)
+    bounds = {}
+    for section in schema.get("sections", []):
+        if section["id"] not in per_section:
+            continue
+        for item in section.get("items", []):
+            bounds[item["id"]] = per_section[section["id"]]
+        # Retrospective sliders are exported as a before/after pair per dimension
+        for dim in section.get("dimensions", []):
+            bounds[f"{dim['id']}_PRE"] = per_section[section["id"]]
+            bounds[f"{dim['id']}_POST"] = per_section[section["id"]]
+    return bounds
+
+def resolve_column_bounds(columns, schema):
+    """
+    Map dataset columns to schema bounds.
+    Returns {column: (item_id, min, max)} for every column the schema covers.
+    """
+    by_item = item_bounds(schema)
+    by_section = section_bounds(schema)
+    resolved = {}
+    for col in columns:
+        key = str(col)
+        item_id = LEGACY_COLUMN_ALIASES.get(key)
+        if item_id is None and key.upper() in by_item:
+            item_id = key.upper()
+        if item_id is None:
+            # "{section.key}_{item.id}" export naming, e.g. "nutritionalKnowledge_KN3"
+            suffix = next((i for i in by_item if key.upper().endswith("_" + i.upper())), None)
+            item_id = suffix
+        if item_id is not None:
+            resolved[col] = (item_id,) + tuple(by_item[item_id])
+            continue
+        prefix = key.split("_", 1)[0]
+        section_id = LEGACY_SECTION_PREFIXES.get(prefix)
+        if section_id in by_section:
+            resolved[col] = (section_id,) + tuple(by_section[section_id])
+    return resolved
+
+def field_options(schema):
+    """Answer choices of every single-choice (radio) field, keyed by field id."""
+    return {field["id"]: field["options"]
+            for section in schema.get("sections", [])
+            for field in section.get("fields", [])
+            if field.get("type") == "radio" and field.get("options")}
+
+def resolve_column_options(columns, schema):
+    """
+    Map dataset columns to the answer choices of their schema field.
+    Covers v1 names ("demo_relationship") and v2 "{prefix}_{field.id}" names.
+    """
+    by_field = field_options(schema)
+    resolved = {}
+    for col in columns:
+        key = str(col)
+        field_id = LEGACY_FIELD_ALIASES.get(key)
+        if field_id is None:
+            field_id = next((f for f in by_field if key.endswith("_" + f)), None)
+        if field_id in by_field:
+            resolved[col] = by_field[field_id]
+    return resolved
+
+def resolve_column_ids(columns, schema):
+    """
+    Map dataset columns to the schema item or field they hold, e.g.
+    "nps_score" -> "NPS1", "demo_relationship" -> "DEM_RELATIONSHIP".
+    v1 section columns ("knowledge_1") hold no single item and are left out.
+    """
+    items = item_bounds(schema)
+    fields = [f["id"] for section in schema.get("sections", []) for f in section.get("fields", [])]
+    resolved = {col: item_id for col, (item_id, _, _) in resolve_column_bounds(columns, schema).items()
+                if item_id in items}
+    for col in columns:
+        key = str(col)
+        field_id = LEGACY_FIELD_ALIASES.get(key) or next((f for f in fields if key.endswith("_" + f)), None)
+        if field_id is not None:
+            resolved.setdefault(col, field_id)
+    return resolved
+
+def export_columns(schema):
+    """
+    Export column of every schema field and item, in schema order:
+    {column: ("choice", options) | ("scored", (min, max)) | ("open", None)}.
+    """
+    field_names = {field: col for col, field in LEGACY_FIELD_ALIASES.items()}
+    item_names = {item: col for col, item in LEGACY_COLUMN_ALIASES.items()}
+    open_names = {item: col for col, item in LEGACY_OPEN_TEXT_ALIASES.items()}
+    bounds = item_bounds(schema)
+    columns = {}
+    for section in schema.get("sections", []):
+        sid = section["id"]
+        for field in section.get("fields", []):
+            if field.get("options"):
+                columns[field_names.get(field["id"], f"{sid}_{field['id']}")] = ("choice", field["options"])
+        items = [i["id"] for i in section.get("items", [])]
+        items += [f"{d['id']}_{side}" for d in section.get("dimensions", []) for side in ("PRE", "POST")]
+        for item in items:
+            if section.get("type") == "open":
+                columns[open_names.get(item, f"open_{item}")] = ("open", None)
+            elif item in bounds:
+                columns[item_names.get(item, f"{sid}_{item}")] = ("scored", bounds[item])
+    return columns
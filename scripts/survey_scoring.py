@@ -0,0 +1,177 @@
+"""
+NutriAware Composite Scoring
+----------------------------
+حساب المؤشرات المركبة (KAP / DDS) حسب دليل التصحيح v3
+
+Python port of docs/survey_scoring_manual_v3.md (sections 2-4). Item
+lists, reverse items, methods and cutoffs are read from the
+`compositeIndices` block of docs/surveySchema.json. All items are loaded
+into one float matrix and every composite is reduced from it at once,
+so cost is a handful of NumPy passes regardless of the number of indices.
+
+Missing answers follow the manual's R code: means and sums ignore them
+(rowMeans / rowSums with na.rm = TRUE), and a composite with no answered
+items is NaN (sums are 0, as in R).
+
+Usage / الاستخدام:
+  pip install pandas numpy
+  python survey_scoring.py --input cleaned_dataset.csv --output scored_dataset.csv
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from survey_io import read_table, write_table
+from survey_schema import load_schema, resolve_column_bounds
+
+# Overall KAP is not in the schema; manual section 2.10
+OVERALL_KAP = {
+    "id": "KAP",
+    "column": "OverallKAP",
+    "components": ["NKS", "FSKS", "ATTS", "PS", "FSPS"],
+    "cutoffs": [{"label": "Poor", "max": 2.0}, {"label": "Below Average", "max": 3.0},
+                {"label": "Good", "max": 4.0}, {"label": "Excellent", "max": 5.0}],
+}
+
+# Manual section 3 (NPS recode) and section 5 (DDS interpretation)
+NPS_CATEGORIES = [{"label": "Detractor", "max": 6}, {"label": "Passive", "max": 8}, {"label": "Promoter", "max": 10}]
+DDS_LEVELS = [{"label": "Very Low Diversity", "max": 2}, {"label": "Low Diversity", "max": 4},
+              {"label": "Adequate Diversity", "max": 6}, {"label": "High Diversity", "max": 8}]
+
+# AttentionPassed = (KN_AC = 4 AND PR_AC = 1)
+ATTENTION_CHECKS = {"KN_AC": 4, "PR_AC": 1}
+
+def composite_definitions(schema):
+    """Composite indices from the schema, with the output column of each score."""
+    composites = []
+    for index in schema.get("compositeIndices", {}).values():
+        composites.append({
+            "id": index["id"],
+            "column": "DDS_Total" if index["method"] == "sum" else index["nameEn"].replace(" ", ""),
+            "items": index["items"],
+            "reverse": set(index.get("reverseItems", [])),
+            "method": index["method"],
+            "range": tuple(index["range"]),
+            "cutoffs": index.get("cutoffs", []),
+            "adequacy": index.get("adequacyThreshold"),
+        })
+    return composites
+
+def item_columns(columns, schema):
+    """{item_id: dataset column} for every column that is a schema item."""
+    return {item_id: col for col, (item_id, _, _) in resolve_column_bounds(columns, schema).items()}
+
+def label_scores(scores, cutoffs):
+    """
+    Categorical labels for `scores`, right-inclusive like R's cut():
+    a score belongs to the first cutoff whose `max` it does not exceed.
+    Scores above the last cutoff get the last label; NaN stays missing.
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    labels = [c["label"] for c in cutoffs]
+    # Count the breaks each score exceeds; cheaper than searchsorted for 2-3 breaks
+    codes = np.zeros(scores.shape, dtype=np.int8)
+    for cutoff in cutoffs[:-1]:
+        codes += scores > cutoff["max"]
+    codes[np.isnan(scores)] = -1
+    return pd.Categorical.from_codes(codes, categories=labels, ordered=True)
+
+def _numeric(df, col):
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+def score_survey(df, schema=None):
+    """
+    Every composite score and category the manual defines, as a DataFrame
+    aligned with `df`. Composites whose items are all absent from `df`
+    (e.g. post-test indices on pre-test data) are skipped.
+    """
+    schema = schema or load_schema()
+    by_item = item_columns(df.columns, schema)
+    composites = [c for c in composite_definitions(schema) if any(i in by_item for i in c["items"])]
+    out = pd.DataFrame(index=df.index)
+
+    if composites:
+        # items x respondents matrix (each item loaded once) and a
+        # composites x items membership matrix, so all sums and answered
+        # counts come out of two matrix products
+        layout = list(dict.fromkeys(i for c in composites for i in c["items"] if i in by_item))
+        position = {item: k for k, item in enumerate(layout)}
+        matrix = np.stack([_numeric(df, by_item[item]) for item in layout])
+        membership = np.zeros((len(composites), len(layout)), dtype=np.float64)
+        for j, comp in enumerate(composites):
+            membership[j, [position[i] for i in comp["items"] if i in by_item]] = 1.0
+
+        # Reverse coding: (min + max) - raw, i.e. 6 - raw on a 1-5 scale.
+        # Once per item, however many composites list it
+        reverse = {}
+        for comp in composites:
+            for item in comp["reverse"] & set(layout):
+                reverse.setdefault(item, sum(comp["range"]))
+        for item, total in reverse.items():
+            row = matrix[position[item]]
+            np.subtract(total, row, out=row)
+
+        answered = ~np.isnan(matrix)
+        np.copyto(matrix, 0.0, where=~answered)
+        sums = membership @ matrix
+        counts = membership @ answered.astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = sums / counts
+
+        for j, comp in enumerate(composites):
+            if comp["method"] == "sum":
+                out[comp["column"]] = sums[j]
+                if comp["adequacy"] is not None:
+                    out[f"{comp['id']}_Adequate"] = (sums[j] >= comp["adequacy"]).astype(np.int8)
+                    out[f"{comp['id']}_Level"] = label_scores(sums[j], DDS_LEVELS)
+            else:
+                out[comp["column"]] = means[j]
+                if comp["cutoffs"]:
+                    out[f"{comp['id']}_Label"] = label_scores(means[j], comp["cutoffs"])
+
+        # Overall KAP: mean of the available component means
+        scored = {c["id"]: means[j] for j, c in enumerate(composites) if c["method"] == "mean"}
+        parts = [scored[k] for k in OVERALL_KAP["components"] if k in scored]
+        if parts:
+            stacked = np.stack(parts)
+            answered = ~np.isnan(stacked)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                kap = np.where(answered, stacked, 0.0).sum(axis=0) / answered.sum(axis=0)
+            out[OVERALL_KAP["column"]] = kap
+            out[f"{OVERALL_KAP['id']}_Label"] = label_scores(kap, OVERALL_KAP["cutoffs"])
+
+    if "NPS1" in by_item:
+        out["NPS_Category"] = label_scores(_numeric(df, by_item["NPS1"]), NPS_CATEGORIES)
+
+    # Retrospective change scores: POST - PRE per dimension
+    for section in schema.get("sections", []):
+        for dim in section.get("dimensions", []):
+            pre, post = f"{dim['id']}_PRE", f"{dim['id']}_POST"
+            if pre in by_item and post in by_item:
+                out[f"{dim['id']}_Change"] = _numeric(df, by_item[post]) - _numeric(df, by_item[pre])
+
+    # A missing attention-check answer counts as a failed check
+    if all(item in by_item for item in ATTENTION_CHECKS):
+        passed = np.ones(len(df), dtype=bool)
+        for item, expected in ATTENTION_CHECKS.items():
+            passed &= _numeric(df, by_item[item]) == expected
+        out["AttentionPassed"] = passed
+
+    return out
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Score NutriAware composite indices")
+    parser.add_argument("--input", default="cleaned_dataset.csv", help="Cleaned dataset path")
+    parser.add_argument("--output", default="scored_dataset.csv", help="Dataset with score columns appended")
+    parser.add_argument("--schema", default=None, help="Survey schema JSON (defaults to docs/surveySchema.json)")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    data = read_table(args.input)
+    scores = score_survey(data, load_schema(args.schema))
+    write_table(pd.concat([data, scores], axis=1), args.output)
+    print(f"✅ Scored {len(data)} respondents: {', '.join(scores.columns)}")
+    print(f"- {args.output}")
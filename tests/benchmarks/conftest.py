@@ -0,0 +1,61 @@
+"""
+Inputs and measurement helpers for the pipeline and quality-gate benchmarks.
+
+Needs pytest-benchmark (the modules skip without it):
+  pip install pytest-benchmark
+  pytest tests/benchmarks --benchmark-autosave             # 10k, 100k and 1M rows
+  NUTRIAWARE_BENCH_ROWS=10000,100000 pytest tests/benchmarks --benchmark-compare
+Timings are pytest-benchmark's; each benchmark's tracemalloc allocation
+peak (alloc_peak_mb) and row count are stored in its extra_info, so they
+are saved and compared with the timings.
+"""
+
+import os
+import sys
+import tracemalloc
+
+import pytest
+
+# The ETL scripts import each other as top-level modules (run from scripts/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "scripts"))
+
+from synthetic_survey import synthetic_survey  # noqa: E402
+
+BENCH_ROWS = [int(n) for n in os.environ.get("NUTRIAWARE_BENCH_ROWS", "10000,100000,1000000").split(",")]
+
+def rows_id(n_rows):
+    return f"{n_rows // 1_000_000}M" if n_rows >= 1_000_000 else f"{n_rows // 1000}k"
+
+def allocation_peak_mb(fn, *args):
+    """Peak Python heap allocated while `fn(*args)` runs (NumPy buffers included)."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        fn(*args)
+        return (tracemalloc.get_traced_memory()[1] - before) / 1024 ** 2
+    finally:
+        tracemalloc.stop()
+
+@pytest.fixture(scope="session", params=BENCH_ROWS, ids=rows_id)
+def survey_csv(request, tmp_path_factory):
+    """A synthetic survey export (default injection rates) of each benchmark size."""
+    path = tmp_path_factory.mktemp("survey") / f"survey_{rows_id(request.param)}.csv"
+    synthetic_survey(request.param).to_csv(path, index=False)
+    return str(path)
+
+@pytest.fixture
+def measure(benchmark):
+    """
+    measure(fn, *args, rows=n, setup=None): time `fn` over a fixed number of
+    rounds (10 at 10k rows, 1 from 100k up), after one untimed run under
+    tracemalloc.
+    `setup()` returns fresh args for functions that modify their input.
+    """
+    def run(fn, *args, rows, setup=None):
+        benchmark.extra_info["rows"] = rows
+        benchmark.extra_info["alloc_peak_mb"] = round(allocation_peak_mb(fn, *(setup() if setup else args)), 2)
+        rounds = max(1, 100_000 // max(rows, 1))
+        if setup:
+            return benchmark.pedantic(fn, setup=lambda: (setup(), {}), rounds=rounds)
+        return benchmark.pedantic(fn, args=args, rounds=rounds)
+    return run
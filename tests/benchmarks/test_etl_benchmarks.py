@@ -0,0 +1,82 @@
+"""
+Time and allocation peak of each clean_survey_data.py stage, and of the
+whole in-memory run, on synthetic surveys of every benchmark size.
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from arabic_text import open_text_key  # noqa: E402
+from clean_survey_data import (build_range_rules, compact_numeric, dedup_columns, find_long_repeats,  # noqa: E402
+                               impute_education, near_duplicate_rows, normalize_text, open_text_columns,
+                               range_violations, row_hashes, run_pipeline)
+from logic_rules import build_logic_rules, rule_violations  # noqa: E402
+from stage_metrics import StageRecorder  # noqa: E402
+from survey_io import categorize, read_table, write_table  # noqa: E402
+from survey_schema import load_schema, resolve_column_options  # noqa: E402
+
+NEAR_DUP_THRESHOLD = 0.8
+
+@pytest.fixture(scope="module")
+def etl(survey_csv):
+    """The frame as the ETL's read stage leaves it, with the schema rules for its columns."""
+    schema = load_schema()
+    df = read_table(survey_csv)
+    rules = build_range_rules(df.columns, schema)
+    options = resolve_column_options(df.columns, schema)
+    logic_rules = build_logic_rules(df.columns, schema)
+    df = categorize(df, exclude=[r["column"] for r in rules])
+    return SimpleNamespace(df=df, rules=rules, logic_rules=logic_rules, options=options, rows=len(df))
+
+def test_read(measure, survey_csv, etl):
+    measure(read_table, survey_csv, rows=etl.rows)
+
+def test_exact_duplicate_hashes(measure, etl):
+    measure(row_hashes, etl.df, dedup_columns(etl.df.columns), rows=etl.rows)
+
+def test_normalize(measure, etl):
+    measure(normalize_text, etl.df, etl.options, etl.rules, rows=etl.rows)
+
+def test_ranges(measure, etl):
+    measure(range_violations, etl.df, etl.rules, rows=etl.rows)
+
+def test_logic_rules(measure, etl):
+    measure(rule_violations, etl.df, etl.logic_rules, rows=etl.rows)
+
+def test_open_text_key(measure, etl):
+    measure(open_text_key, etl.df["open_challenges"], rows=etl.rows)
+
+def test_open_text_templates(measure, etl):
+    keys = open_text_key(etl.df["open_challenges"])
+    measure(lambda: find_long_repeats(keys.value_counts(), len(keys)), rows=etl.rows)
+
+def test_near_duplicates(measure, etl):
+    measure(near_duplicate_rows, etl.df[open_text_columns(etl.df.columns)], NEAR_DUP_THRESHOLD, rows=etl.rows)
+
+def test_materialize(measure, etl):
+    kept = np.arange(etl.rows)
+    measure(lambda: compact_numeric(etl.df.take(kept), [r["column"] for r in etl.rules]), rows=etl.rows)
+
+def test_imputation(measure, etl):
+    probs = etl.df["demo_education"].value_counts(normalize=True)
+    measure(impute_education, rows=etl.rows,
+            setup=lambda: (etl.df[["demo_education"]].copy(), probs, np.random.RandomState(0)))
+
+def test_write(measure, etl, tmp_path):
+    measure(write_table, etl.df, str(tmp_path / "clean.csv"), rows=etl.rows)
+
+def test_full_pipeline(measure, survey_csv, etl, tmp_path, monkeypatch, benchmark):
+    """End to end; the per-stage breakdown of the last round goes to extra_info["stages"]."""
+    monkeypatch.chdir(tmp_path)
+    metrics = []
+
+    def run():
+        metrics.append(StageRecorder())
+        run_pipeline(survey_csv, "clean.csv", near_dup_threshold=NEAR_DUP_THRESHOLD, metrics=metrics[-1])
+
+    measure(run, rows=etl.rows)
+    benchmark.extra_info["stages"] = metrics[-1].summary()
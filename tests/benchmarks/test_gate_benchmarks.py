@@ -0,0 +1,34 @@
+"""
+Time and allocation peak of each ci_quality_gates.py gate (its aggregates
+plus its check), and of the exact and streaming runs over all gates.
+"""
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from ci_quality_gates import (AGGREGATES, GATES, check_gates, evaluate_gates, load_gate_inputs,  # noqa: E402
+                              stream_gate_inputs)
+
+@pytest.fixture(scope="module")
+def gate_inputs(survey_csv):
+    return load_gate_inputs(survey_csv)
+
+@pytest.mark.parametrize("gate", GATES, ids=[g["name"] for g in GATES])
+def test_gate(measure, gate_inputs, gate):
+    df, header, _ = gate_inputs
+
+    def run():
+        keys = gate["needs"](header)
+        return gate["check"]({key: AGGREGATES[key[0]](df, *key[1:]) for key in keys}, len(df), header)
+
+    measure(run, rows=len(df))
+
+def test_load_gate_inputs(measure, survey_csv, gate_inputs):
+    measure(load_gate_inputs, survey_csv, rows=len(gate_inputs[0]))
+
+def test_all_gates(measure, gate_inputs):
+    measure(evaluate_gates, *gate_inputs, rows=len(gate_inputs[0]))
+
+def test_all_gates_streaming(measure, survey_csv, gate_inputs):
+    measure(lambda: check_gates(*stream_gate_inputs(survey_csv)[:3]), rows=len(gate_inputs[0]))
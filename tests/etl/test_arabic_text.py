@@ -0,0 +1,54 @@
+"""
+Arabic normalization shared by the ETL and the CI quality gates.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from arabic_text import clean_text, fold_text, normalize_choices, normalize_text_columns, open_text_key
+from survey_schema import load_schema, resolve_column_options
+
+RELATIONSHIP = ["أب", "أم", "أخرى"]
+
+@pytest.mark.parametrize("variant", ["لا يوجد، شكراً لكم", "لايوجد شكرا لكم!", "ﻻ يوجد شكـــراً لكم", "لا يوجد\u200f شكرا لكم"])
+def test_fold_ignores_spacing_punctuation_and_diacritics(variant):
+    assert fold_text(variant) == "لايوجدشكرالكم"
+
+def test_fold_unifies_alef_ya_and_ta_marbuta():
+    assert fold_text("إقناع أطفالي بالخضروات") == fold_text("اقناع اطفالى بالخضروات")
+    assert fold_text("وجبة صحية") == fold_text("وجبه صحيه")
+
+def test_clean_keeps_spelling_and_collapses_spaces():
+    assert clean_text("  نحيف   جدًا ") == "نحيف جدًا"
+    assert clean_text("٢–٣ أطفال") == "2–3 أطفال"
+    assert clean_text("أمّ") == "أمّ"
+
+def test_choices_snap_to_schema_spelling():
+    values = pd.Series(["ام", " أم", "اب", "أخري", "جدة", None])
+    result = normalize_choices(values, RELATIONSHIP)
+    assert result.tolist()[:5] == ["أم", "أم", "أب", "أخرى", "جدة"]
+    assert pd.isna(result.iloc[5])
+
+def test_categorical_variants_merge_into_one_category():
+    values = pd.Series(["ام", "أم", np.nan, "اب"], dtype="category")
+    result = normalize_choices(values, RELATIONSHIP)
+    assert isinstance(result.dtype, pd.CategoricalDtype)
+    assert sorted(result.cat.categories) == ["أب", "أم"]
+    assert result.isna().tolist() == [False, False, True, False]
+
+def test_open_text_key_keeps_missing_values_missing():
+    result = open_text_key(pd.Series(["لا يوجد", None, "لا  يوجد."], dtype=object))
+    assert result.iloc[0] == result.iloc[2] == "لايوجد"
+    assert pd.isna(result.iloc[1])
+
+def test_normalize_text_columns_skips_excluded_and_numeric_columns():
+    df = pd.DataFrame({"respondentId": [" R1 "], "nps_score": [7], "demo_relationship": ["ام"]})
+    normalize_text_columns(df, {"demo_relationship": RELATIONSHIP}, exclude=["respondentId"])
+    assert df.iloc[0].tolist() == [" R1 ", 7, "أم"]
+
+def test_schema_options_cover_v1_and_v2_export_names():
+    options = resolve_column_options(["demo_relationship", "demo_DEM_EDUCATION", "open_challenges"], load_schema())
+    assert options["demo_relationship"] == RELATIONSHIP
+    assert "جامعي" in options["demo_DEM_EDUCATION"]
+    assert "open_challenges" not in options
@@ -0,0 +1,106 @@
+"""
+Cross-field logic rules: the expression language, vectorized evaluation,
+and the ETL stage and CI gate built on them.
+"""
+
+import json
+
+import pandas as pd
+import pytest
+
+import clean_survey_data
+from ci_quality_gates import evaluate_gates, load_gate_inputs, run_quality_gates
+from logic_rules import build_logic_rules, compile_rules, parse_rule, rule_violations
+from result_cache import ResultCache
+from survey_schema import load_schema
+
+GUARDIAN = {"id": "FATHER_FEMALE_GUARDIAN", "reason": "Inconsistent Answers (father)",
+            "violation": "DEM_RELATIONSHIP == 'أب' and health_guardianGender in ('أنثى', 'female')"}
+
+def violations(df, *rules):
+    return rule_violations(df, compile_rules(rules, df.columns, load_schema()))
+
+@pytest.mark.parametrize("expression", [
+    "DEM_RELATIONSHIP = 'أب'",           # syntax error
+    "__import__('os').system('true')",   # calls other than missing()
+    "DEM_RELATIONSHIP == OTHER_FIELD",   # field compared with a field
+    "KN_AC in 4",                        # `in` needs a tuple
+    "NPS1 > 'high'",                     # ordering needs a number
+])
+def test_expressions_outside_the_rule_language_are_rejected(expression):
+    with pytest.raises(ValueError):
+        parse_rule(expression)
+
+def test_text_is_compared_by_folded_spelling_and_missing_answers_pass():
+    df = pd.DataFrame({
+        "demo_relationship": ["أب", "اب", "أم", "أب", None],
+        "health_guardianGender": ["أنثى", "Female", "أنثى", None, "أنثى"],
+    })
+    assert violations(df, GUARDIAN)["FATHER_FEMALE_GUARDIAN"].tolist() == [True, True, False, False, False]
+
+def test_numbers_chained_comparisons_and_missing():
+    df = pd.DataFrame({"nps_score": ["3", "9", None, "x"], "IF_LOGINS": [0, 2, 0, None]})
+    found = violations(df, {"id": "LOW", "violation": "0 <= NPS1 < 5 and not IF_LOGINS > 1"},
+                       {"id": "BLANK", "violation": "missing(nps_score) or missing(IF_LOGINS)"})
+    assert found["LOW"].tolist() == [True, False, False, False]
+    assert found["BLANK"].tolist() == [False, False, True, True]
+
+def test_negating_a_comparison_on_a_missing_answer_stays_unbroken():
+    df = pd.DataFrame({"nps_score": ["1", "2", None, "2"], "IF_LOGINS": ["0", "0", "0", None]})
+    found = violations(df, {"id": "NOT", "violation": "not (NPS1 == 1)"},
+                       {"id": "NOT_AND", "violation": "not (NPS1 == 1 and IF_LOGINS == 0)"},
+                       {"id": "NOT_OR", "violation": "not (NPS1 == 2 or IF_LOGINS == 1)"})
+    assert found["NOT"].tolist() == [False, True, False, True]
+    # false and unknown is false, true or unknown is true; anything else with unknown stays unknown
+    assert found["NOT_AND"].tolist() == [False, True, False, True]
+    assert found["NOT_OR"].tolist() == [True, False, False, False]
+
+def test_rules_on_absent_columns_are_skipped():
+    ids = [r["id"] for r in build_logic_rules(["demo_relationship", "health_gender"], load_schema())]
+    assert "FATHER_FEMALE_GUARDIAN" not in ids
+
+def test_etl_and_gates_reject_inconsistent_rows(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    pd.DataFrame({
+        "respondentId": ["R1", "R2", "R3", "R4"],
+        "demo_relationship": ["أب", "أم", "اب", "أم"],
+        "health_guardianGender": ["ذكر", "أنثى", "انثى", "ذكر"],
+        "nps_score": [9, 8, 7, 10],
+    }).to_csv("raw.csv", index=False)
+    for chunksize in (None, 2):
+        clean_survey_data.run_pipeline("raw.csv", "clean.csv", chunksize=chunksize)
+        with open("quality_summary.json", encoding="utf-8") as f:
+            stats = json.load(f)
+        assert stats["rejected_logic"] == 2
+        assert stats["logic_rule_rejections"] == {"FATHER_FEMALE_GUARDIAN": 1, "MOTHER_MALE_GUARDIAN": 1}
+        assert pd.read_csv("clean.csv")["respondentId"].tolist() == ["R1", "R2"]
+        reasons = pd.read_csv("rejected_rows.csv")["rejection_reason"]
+        assert reasons.str.startswith("Inconsistent Answers").all()
+    errors = evaluate_gates(*load_gate_inputs("raw.csv"))
+    assert [e for e in errors if e.startswith("Logic error")] == [
+        "Logic error: Found 1 rows where DEM_RELATIONSHIP == 'أب' and health_guardianGender in ('أنثى', 'female') "
+        "(Inconsistent Answers (Father recorded with a female guardian gender)).",
+        "Logic error: Found 1 rows where DEM_RELATIONSHIP == 'أم' and health_guardianGender in ('ذكر', 'male') "
+        "(Inconsistent Answers (Mother recorded with a male guardian gender)).",
+    ]
+
+def test_gate_cache_is_keyed_by_the_schema_in_use(tmp_path, capsys):
+    pd.DataFrame({"demo_relationship": ["أب"], "health_guardianGender": ["أنثى"]}).to_csv(tmp_path / "raw.csv", index=False)
+    schema = load_schema()
+    schema["dataQualityRules"]["consistencyRules"] = []
+    with open(tmp_path / "schema.json", "w", encoding="utf-8") as f:
+        json.dump(schema, f, ensure_ascii=False)
+    cache = ResultCache(str(tmp_path / "cache"))
+
+    verdicts = []
+    for schema_path in (None, str(tmp_path / "schema.json")):
+        with pytest.raises(SystemExit):
+            run_quality_gates(str(tmp_path / "raw.csv"), cache=cache, schema_path=schema_path)
+        verdicts.append(capsys.readouterr().out)
+    assert "Logic error" in verdicts[0]
+    assert "Cache hit" not in verdicts[1] and "Logic error" not in verdicts[1]
+
+    # Each call uses the schema it is given, in either order
+    for schema_path, expected in ((str(tmp_path / "schema.json"), False), (None, True)):
+        errors = evaluate_gates(*load_gate_inputs(str(tmp_path / "raw.csv"), schema_path), schema_path)
+        assert any(e.startswith("Logic error") for e in errors) == expected
@@ -0,0 +1,63 @@
+"""
+Index-based record of rejected rows and the checks they failed.
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import clean_survey_data
+from rejection_ledger import RejectionLedger, retag_reasons
+from synthetic_survey import synthetic_survey
+
+STAGES = ["Exact Duplicate", "Out of Range", "Repeated Open Text Template"]
+
+def test_first_stage_removes_and_later_stages_only_flag():
+    ledger = RejectionLedger(4, STAGES)
+    ledger.reject("Exact Duplicate", np.array([False, True, False, False]))
+    removed = ledger.reject("Out of Range", np.array([False, True, True, False]),
+                            reasons=["Out of Range (nps_score)", "Out of Range (age)"])
+    assert removed.tolist() == [False, False, True, False]
+    assert ledger.alive.tolist() == [True, False, False, True]
+    assert len(ledger) == 2
+    assert ledger.multi_reason_count() == 1
+
+def test_materialize_keeps_input_order_and_lists_every_failed_check():
+    df = pd.DataFrame({"respondentId": ["R1", "R2", "R3", "R4"]}, index=[10, 11, 12, 13])
+    ledger = RejectionLedger(len(df), STAGES)
+    ledger.reject("Out of Range", np.array([False, False, False, True]), reasons=["Out of Range (age)"])
+    ledger.reject("Repeated Open Text Template", np.array([True, False, False, True]))
+    rejected = ledger.materialize(df)
+    assert rejected["respondentId"].tolist() == ["R1", "R4"]
+    assert rejected["rejection_reason"].tolist() == ["Repeated Open Text Template", "Out of Range (age)"]
+    assert rejected["rejection_reasons"].tolist() == [
+        "Repeated Open Text Template", "Out of Range; Repeated Open Text Template"]
+
+def test_too_many_stages_rejected():
+    with pytest.raises(ValueError):
+        RejectionLedger(1, [f"stage {i}" for i in range(17)])
+
+def test_retag_adds_and_drops_a_stage_in_pipeline_order():
+    reasons = ["Exact Duplicate", "Exact Duplicate; Repeated Open Text Template", "Out of Range"]
+    retagged = retag_reasons(reasons, STAGES, "Repeated Open Text Template", [True, False, True])
+    assert retagged.tolist() == [
+        "Exact Duplicate; Repeated Open Text Template", "Exact Duplicate",
+        "Out of Range; Repeated Open Text Template"]
+
+def test_streaming_run_lists_the_same_reasons_as_a_single_pass(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    synthetic_survey(2000, duplicate_rate=0.05, template_rate=0.1).to_csv("raw.csv", index=False)
+    runs = []
+    for chunksize in (None, 300):
+        clean_survey_data.run_pipeline("raw.csv", "clean.csv", chunksize=chunksize, near_dup_threshold=0)
+        with open("quality_summary.json", encoding="utf-8") as f:
+            stats = json.load(f)
+        rejected = pd.read_csv("rejected_rows.csv", dtype=str).sort_values("respondentId", ignore_index=True)
+        runs.append((stats, rejected))
+    (single, single_rows), (streamed, streamed_rows) = runs
+    assert single["rejected_multiple_reasons"] > 0
+    assert streamed["rejected_multiple_reasons"] == single["rejected_multiple_reasons"]
+    assert list(streamed_rows.columns) == list(single_rows.columns)
+    pd.testing.assert_series_equal(streamed_rows["rejection_reasons"], single_rows["rejection_reasons"])
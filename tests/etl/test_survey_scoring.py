@@ -0,0 +1,139 @@
+"""
+Composite scoring pinned to docs/survey_scoring_manual_v3.md.
+"""
+
+import copy
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from survey_schema import load_schema
+from survey_scoring import composite_definitions, label_scores, score_survey
+
+SCHEMA = load_schema()
+LIKERT_ITEMS = [i for c in composite_definitions(SCHEMA) if c["method"] == "mean" for i in c["items"]]
+DDS_ITEMS = [f"DDS{i}" for i in range(1, 9)]
+
+def respondent(likert=3, dds=0, **answers):
+    """One row with every Likert item at `likert`, DDS items at `dds`, then overrides."""
+    row = {item: likert for item in LIKERT_ITEMS}
+    row.update({item: dds for item in DDS_ITEMS})
+    row.update(answers)
+    return row
+
+def score(*rows):
+    return score_survey(pd.DataFrame(list(rows)), SCHEMA)
+
+def test_reverse_item_is_six_minus_raw():
+    # 2.1 NKS: ten items at 4, KN11_R answered 2 -> recoded 4 -> mean 4.0
+    result = score(respondent(likert=4, KN11_R=2))
+    assert result.loc[0, "NutritionalKnowledgeScore"] == pytest.approx(4.0)
+    # KN11_R answered 4 -> recoded 2 -> (10 * 4 + 2) / 11
+    result = score(respondent(likert=4, KN11_R=4))
+    assert result.loc[0, "NutritionalKnowledgeScore"] == pytest.approx(42 / 11)
+
+def test_item_shared_by_two_composites_is_reversed_once():
+    schema = copy.deepcopy(SCHEMA)
+    attitudes = schema["compositeIndices"]["attitudesScore"]
+    attitudes["items"] = attitudes["items"] + ["KN11_R"]
+    attitudes["reverseItems"] = ["KN11_R"]
+    result = score_survey(pd.DataFrame([respondent(likert=4, KN11_R=4)]), schema)
+    # KN11_R answered 4 -> recoded 2 in both composites
+    assert result.loc[0, "NutritionalKnowledgeScore"] == pytest.approx(42 / 11)
+    assert result.loc[0, "AttitudesScore"] == pytest.approx(22 / 6)
+
+def test_every_mean_composite():
+    result = score(respondent(likert=5, KN11_R=1, PR7_R=1, INT_ST6_R=1, SAT4_R=1, BI5_R=1))
+    for column in ["NutritionalKnowledgeScore", "FoodSafetyKnowledgeScore", "FoodSafetyPracticeScore",
+                   "AttitudesScore", "DietaryPracticeScore", "EngagementScore", "SatisfactionIndex",
+                   "BehavioralChangeIndex", "OverallKAP"]:
+        assert result.loc[0, column] == pytest.approx(5.0), column
+
+@pytest.mark.parametrize("score_value, label", [
+    (1.0, "Low"), (2.0, "Low"), (2.05, "Moderate"), (3.5, "Moderate"), (3.55, "High"), (5.0, "High"),
+])
+def test_nks_cutoffs_are_right_inclusive(score_value, label):
+    nks = next(c for c in composite_definitions(SCHEMA) if c["id"] == "NKS")
+    assert label_scores([score_value], nks["cutoffs"])[0] == label
+
+@pytest.mark.parametrize("score_value, label", [
+    (2.0, "Poor"), (2.5, "Fair"), (3.0, "Fair"), (3.1, "Good"), (4.0, "Good"), (4.1, "Excellent"),
+])
+def test_ps_four_band_cutoffs(score_value, label):
+    ps = next(c for c in composite_definitions(SCHEMA) if c["id"] == "PS")
+    assert label_scores([score_value], ps["cutoffs"])[0] == label
+
+def test_engagement_cutoff_is_two_point_five():
+    es = next(c for c in composite_definitions(SCHEMA) if c["id"] == "ES")
+    assert list(label_scores([2.5, 2.6], es["cutoffs"])) == ["Low", "Moderate"]
+
+@pytest.mark.parametrize("yes_count, adequate, level", [
+    (0, 0, "Very Low Diversity"), (2, 0, "Very Low Diversity"), (4, 0, "Low Diversity"),
+    (5, 1, "Adequate Diversity"), (6, 1, "Adequate Diversity"), (8, 1, "High Diversity"),
+])
+def test_dds_total_and_fao_threshold(yes_count, adequate, level):
+    answers = {item: int(i < yes_count) for i, item in enumerate(DDS_ITEMS)}
+    result = score(respondent(**answers))
+    assert result.loc[0, "DDS_Total"] == yes_count
+    assert result.loc[0, "DDS_Adequate"] == adequate
+    assert result.loc[0, "DDS_Level"] == level
+
+def test_overall_kap_is_mean_of_five_components():
+    # NKS 5, FSKS 4, ATTS 3, PS 2, FSPS 1 -> 3.0 -> "Below Average"
+    row = respondent(likert=3)
+    row.update({f"KN{i}": 5 for i in range(1, 11)}, KN11_R=1)
+    row.update({f"FSK{i}": 4 for i in range(1, 6)})
+    row.update({f"PR{i}": 2 for i in range(1, 7)}, PR7_R=4)
+    row.update({f"FSP{i}": 1 for i in range(1, 6)})
+    result = score(row)
+    assert result.loc[0, "DietaryPracticeScore"] == pytest.approx(2.0)
+    assert result.loc[0, "OverallKAP"] == pytest.approx(3.0)
+    assert result.loc[0, "KAP_Label"] == "Below Average"
+
+@pytest.mark.parametrize("nps, category", [(0, "Detractor"), (6, "Detractor"), (7, "Passive"),
+                                           (8, "Passive"), (9, "Promoter"), (10, "Promoter")])
+def test_nps_categories(nps, category):
+    assert score(respondent(NPS1=nps)).loc[0, "NPS_Category"] == category
+
+def test_legacy_nps_column_is_scored():
+    result = score_survey(pd.DataFrame({"nps_score": [3, 10, None]}), SCHEMA)
+    assert list(result["NPS_Category"].astype(object).fillna("missing")) == ["Detractor", "Promoter", "missing"]
+
+def test_retrospective_change_and_attention_check():
+    result = score(respondent(RETRO_KN_PRE=3, RETRO_KN_POST=8, KN_AC=4, PR_AC=1),
+                   respondent(RETRO_KN_PRE=6, RETRO_KN_POST=5, KN_AC=4, PR_AC=2),
+                   respondent(RETRO_KN_PRE=None, RETRO_KN_POST=5, KN_AC=None, PR_AC=1))
+    assert result["RETRO_KN_Change"].tolist()[:2] == [5, -1]
+    assert np.isnan(result.loc[2, "RETRO_KN_Change"])
+    assert result["AttentionPassed"].tolist() == [True, False, False]
+
+def test_missing_items_are_ignored_like_r_na_rm():
+    result = score(respondent(likert=4, FSK1=None, FSK2=None, FSK3=2),
+                   respondent(FSK1=None, FSK2=None, FSK3=None, FSK4=None, FSK5=None))
+    assert result.loc[0, "FoodSafetyKnowledgeScore"] == pytest.approx((2 + 4 + 4) / 3)
+    assert np.isnan(result.loc[1, "FoodSafetyKnowledgeScore"])
+    assert pd.isna(result.loc[1, "FSKS_Label"])
+
+def test_export_column_names_and_absent_composites():
+    # "{section.key}_{item.id}" export naming; no post-test sections present
+    df = pd.DataFrame({f"nutritionalKnowledge_KN{i}": [2] for i in range(1, 11)})
+    df["nutritionalKnowledge_KN11_R"] = [4]
+    result = score_survey(df, SCHEMA)
+    assert result.loc[0, "NutritionalKnowledgeScore"] == pytest.approx(2.0)
+    assert result.loc[0, "NKS_Label"] == "Low"
+    assert "SatisfactionIndex" not in result.columns
+
+def test_matches_row_by_row_reference():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.integers(1, 6, size=(200, len(LIKERT_ITEMS))).astype(float), columns=LIKERT_ITEMS)
+    df = df.mask(rng.random(df.shape) < 0.1)
+    result = score_survey(df, SCHEMA)
+    for comp in composite_definitions(SCHEMA):
+        if comp["method"] != "mean":
+            continue
+        items = df[comp["items"]].copy()
+        for item in comp["reverse"]:
+            items[item] = 6 - items[item]
+        expected = items.mean(axis=1, skipna=True)
+        np.testing.assert_allclose(result[comp["column"]], expected, equal_nan=True)
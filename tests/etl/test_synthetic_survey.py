@@ -0,0 +1,84 @@
+"""
+Synthetic respondents from the survey schema, and what the ETL and the CI
+quality gates make of them.
+"""
+
+import json
+
+import pandas as pd
+import pytest
+
+import clean_survey_data
+from ci_quality_gates import check_gates, evaluate_gates, load_gate_inputs, stream_gate_inputs
+from logic_rules import build_logic_rules, rule_violations
+from survey_schema import export_columns, load_schema, resolve_column_bounds, resolve_column_options
+from synthetic_survey import synthetic_survey
+
+CLEAN = {"duplicate_rate": 0, "out_of_range_rate": 0, "template_rate": 0, "missing_rate": 0, "logic_violation_rate": 0}
+
+def failed_gates(errors):
+    return {e.split(":")[0] for e in errors}
+
+def answers(df):
+    return df.drop(columns=["respondentId", "timestamp"])
+
+def test_every_column_resolves_to_its_schema_rule():
+    schema = load_schema()
+    columns = export_columns(schema)
+    bounds = resolve_column_bounds(columns, schema)
+    options = resolve_column_options(columns, schema)
+    for col, (kind, spec) in columns.items():
+        if kind == "scored":
+            assert bounds[col][1:] == spec, col
+        elif kind == "choice" and col in options:
+            assert options[col] == spec, col
+    assert {"demo_relationship", "health_gender", "nps_score", "open_challenges"} <= set(columns)
+
+def test_clean_survey_has_no_problems():
+    df = synthetic_survey(2000, **CLEAN)
+    rules = clean_survey_data.build_range_rules(df.columns, load_schema())
+    assert not answers(df).isna().any().any()
+    assert not answers(df).duplicated().any()
+    assert not clean_survey_data.range_violations(df, rules).any().any()
+    assert not rule_violations(df, build_logic_rules(df.columns, load_schema())).any().any()
+
+def test_injected_problems_match_the_rates():
+    df = synthetic_survey(5000, duplicate_rate=0.02, out_of_range_rate=0.03, missing_rate=0.05)
+    dupes = answers(df).duplicated().to_numpy()
+    rules = clean_survey_data.build_range_rules(df.columns, load_schema())
+    invalid = clean_survey_data.range_violations(df, rules).any(axis=1).to_numpy()
+    assert dupes.sum() == df.attrs["injected"]["duplicates"] == 100
+    assert (invalid & ~dupes).sum() == df.attrs["injected"]["out_of_range"] == 150
+    assert answers(df).isna().to_numpy().mean() == pytest.approx(0.05, abs=0.005)
+    broken = rule_violations(df, build_logic_rules(df.columns, load_schema())).any(axis=1).to_numpy()
+    assert (broken & ~dupes & ~invalid).sum() == df.attrs["injected"]["logic"] == 50
+
+def test_etl_rejects_exactly_the_injected_rows(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = synthetic_survey(2000, duplicate_rate=0.02, out_of_range_rate=0.03, template_rate=0.1)
+    df.to_csv("raw.csv", index=False)
+    clean_survey_data.run_pipeline("raw.csv", "clean.csv")
+    with open("quality_summary.json", encoding="utf-8") as f:
+        stats = json.load(f)
+    injected = df.attrs["injected"]
+    assert stats["rejected_exact_duplicates"] == injected["duplicates"]
+    assert stats["rejected_out_of_range"] == injected["out_of_range"]
+    assert stats["rejected_logic"] == injected["logic"]
+    reasons = pd.read_csv("rejected_rows.csv")["rejection_reason"]
+    assert (reasons == clean_survey_data.TEMPLATE_REASON).sum() == injected["templates"]
+    assert stats["final_rows"] == 2000 - sum(injected.values())
+
+def test_gates_pass_clean_data_and_flag_each_injected_problem(tmp_path):
+    for name, rates in [("clean", CLEAN), ("dirty", {"out_of_range_rate": 0, "template_rate": 0.05})]:
+        synthetic_survey(3000, **rates).to_csv(tmp_path / f"{name}.csv", index=False)
+    assert evaluate_gates(*load_gate_inputs(str(tmp_path / "clean.csv"))) == []
+    errors = evaluate_gates(*load_gate_inputs(str(tmp_path / "dirty.csv")))
+    assert failed_gates(errors) == {"Missingness error", "Duplication error", "Open-text error",
+                                   "Logic error"}
+
+def test_streaming_gates_agree_with_exact_gates(tmp_path):
+    path = str(tmp_path / "dirty.csv")
+    synthetic_survey(3000, template_rate=0.05).to_csv(path, index=False)
+    aggs, n_rows, header, _ = stream_gate_inputs(path, chunksize=700, expected_rows=10_000)
+    # Count-min may overstate the top share slightly, so compare which gates fail
+    assert failed_gates(check_gates(aggs, n_rows, header)) == failed_gates(evaluate_gates(*load_gate_inputs(path)))
@@ -0,0 +1,276 @@
+"""
+NutriAware Load Test Analyzer & Regression Gate
+تحليل نتائج Locust السابقة ومقارنتها بخط الأساس
+
+Reads any number of Locust --csv runs (<prefix>_stats.csv and
+<prefix>_stats_history.csv), aligns them on elapsed time and user count,
+and reports per-endpoint latency percentiles and the RPS-versus-users
+curve. Against a stored baseline, every user-count level present in both
+is tested for a p95 increase and a throughput drop, and every endpoint
+present in both for a p95 increase.
+
+A regression needs both a significant one-sided Mann-Whitney U test
+(p < --alpha) and a median change larger than --min-change, so noise on
+a quiet run and trivially small shifts on a long run both pass. History
+rows are thinned to one per --sample-every seconds first: Locust's
+"current" p95 and RPS are rolling ~10 s windows, and neighbouring rows
+are not independent samples.
+
+A run's stats file holds one p95 per endpoint, so there is nothing to test
+per endpoint: an endpoint regresses when the median of its p95 over the
+runs rises more than --endpoint-min-change over the baseline runs' median.
+Endpoints with fewer than MIN_ENDPOINT_REQUESTS requests on either side
+are reported but not gated.
+
+Usage / الاستخدام:
+  pip install pandas numpy
+  # Record a baseline from one or more good runs / حفظ خط الأساس
+  python analyze_results.py ../../results/nutriaware --save-baseline ../../results/baseline.json
+
+  # Gate a new deploy (exit code 1 on regression) / فحص نشر جديد
+  python analyze_results.py ../../results/nutriaware_new --baseline ../../results/baseline.json \
+    --curves ../../results/curves.csv
+
+Runs can be given as a --csv prefix, a *_stats.csv file or a directory.
+"""
+
+import argparse
+import glob
+import json
+import math
+import os
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+STATS_SUFFIX = "_stats.csv"
+HISTORY_SUFFIX = "_stats_history.csv"
+PERCENTILES = ["50%", "90%", "95%", "99%"]
+
+# Below this many thinned samples per level a test has no power; the
+# level is reported but not gated
+MIN_SAMPLES = 5
+# Locust's percentiles of an endpoint with only a few requests are a few
+# bucketed response times, too coarse to compare
+MIN_ENDPOINT_REQUESTS = 100
+
+def discover_runs(paths):
+    """{run name: csv prefix} for prefixes, *_stats.csv files and directories."""
+    runs = {}
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(glob.glob(os.path.join(path, f"*{STATS_SUFFIX}")))
+        else:
+            files = [path if path.endswith(STATS_SUFFIX) else path + STATS_SUFFIX]
+        for stats_file in files:
+            if not os.path.exists(stats_file):
+                raise FileNotFoundError(f"No Locust stats file: {stats_file}")
+            prefix = stats_file[: -len(STATS_SUFFIX)]
+            runs[os.path.basename(prefix)] = prefix
+    return runs
+
+def load_run(prefix):
+    stats = pd.read_csv(prefix + STATS_SUFFIX, na_values=["N/A"])
+    history_path = prefix + HISTORY_SUFFIX
+    history = pd.read_csv(history_path, na_values=["N/A"]) if os.path.exists(history_path) else None
+    if history is not None:
+        history["elapsed_s"] = history["Timestamp"] - history["Timestamp"].min()
+    return stats, history
+
+def endpoint_percentiles(stats):
+    """Per-endpoint counts, error rate, RPS and latency percentiles of one run."""
+    table = stats.rename(columns={"Request Count": "requests", "Failure Count": "failures",
+                                  "Requests/s": "rps"})
+    table["error_rate"] = table["failures"] / table["requests"].where(table["requests"] > 0)
+    return table[["Type", "Name", "requests", "failures", "error_rate", "rps"] + PERCENTILES].fillna(
+        {"Type": ""})
+
+def steady_samples(history, warmup_s, sample_every_s):
+    """
+    Aggregated history rows taken while the user count was steady: the
+    first `warmup_s` seconds after every user-count change are dropped,
+    then one row per `sample_every_s` seconds is kept.
+    """
+    if history is None:
+        return pd.DataFrame(columns=["elapsed_s", "users", "rps", "p95"])
+    agg = history[history["Name"] == "Aggregated"].sort_values("elapsed_s")
+    agg = agg[agg["Total Request Count"] > 0]
+    since_change = agg["elapsed_s"] - agg.groupby("User Count")["elapsed_s"].transform("min")
+    keep = since_change >= warmup_s
+    agg, slot = agg[keep], (since_change[keep] // sample_every_s).astype(int)
+    agg = agg.groupby([agg["User Count"], slot], sort=False).head(1)
+    return pd.DataFrame({
+        "elapsed_s": agg["elapsed_s"].to_numpy(),
+        "users": agg["User Count"].to_numpy(),
+        "rps": agg["Requests/s"].to_numpy(dtype=np.float64),
+        "p95": agg["95%"].to_numpy(dtype=np.float64),
+    })
+
+def rps_curve(samples):
+    """Median RPS and p95 at each user count / منحنى الإنتاجية مقابل المستخدمين"""
+    return samples.groupby("users").agg(
+        samples=("rps", "size"), rps=("rps", "median"), p95=("p95", "median")).reset_index()
+
+def mann_whitney_greater(a, b):
+    """
+    One-sided p-value that values in `b` tend to be larger than in `a`
+    (normal approximation with tie correction). NaN without enough data.
+    """
+    a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+    a, b = a[~np.isnan(a)], b[~np.isnan(b)]
+    n1, n2 = len(a), len(b)
+    if n1 < MIN_SAMPLES or n2 < MIN_SAMPLES:
+        return math.nan
+    ranks = pd.Series(np.concatenate([a, b])).rank().to_numpy()
+    u = ranks[n1:].sum() - n2 * (n2 + 1) / 2
+    _, ties = np.unique(np.concatenate([a, b]), return_counts=True)
+    n = n1 + n2
+    variance = n1 * n2 / 12 * ((n + 1) - (ties ** 3 - ties).sum() / (n * (n - 1)))
+    if variance <= 0:
+        return 1.0
+    z = (u - n1 * n2 / 2 - 0.5) / math.sqrt(variance)
+    return 0.5 * math.erfc(z / math.sqrt(2))
+
+def compare(baseline_levels, samples, alpha, min_change):
+    """One row per user count present in both: medians, change, p-values, verdict."""
+    rows = []
+    for users, level in samples.groupby("users"):
+        base = baseline_levels.get(str(int(users)))
+        if base is None:
+            continue
+        base_p95, base_rps = np.asarray(base["p95"], dtype=np.float64), np.asarray(base["rps"], dtype=np.float64)
+        p95_change = np.nanmedian(level["p95"]) / np.nanmedian(base_p95) - 1
+        rps_change = np.nanmedian(level["rps"]) / np.nanmedian(base_rps) - 1
+        p_p95 = mann_whitney_greater(base_p95, level["p95"])
+        p_rps = mann_whitney_greater(level["rps"], base_rps)
+        issues = []
+        if p_p95 < alpha and p95_change > min_change:
+            issues.append(f"p95 +{p95_change:.0%}")
+        if p_rps < alpha and -rps_change > min_change:
+            issues.append(f"RPS {rps_change:.0%}")
+        rows.append({
+            "users": int(users), "samples": len(level), "baseline_samples": len(base_rps),
+            "p95_change": p95_change, "p95_p": p_p95, "rps_change": rps_change, "rps_p": p_rps,
+            "gated": not (math.isnan(p_p95) or math.isnan(p_rps)), "regression": "; ".join(issues),
+        })
+    return pd.DataFrame(rows)
+
+def compare_endpoints(baseline_endpoints, endpoints, min_change):
+    """One row per endpoint (Type, Name) present in both: median p95s, change, verdict."""
+    base = pd.DataFrame(baseline_endpoints, columns=["Type", "Name", "requests", "95%"]).fillna({"Type": ""})
+    keys = ["Type", "Name"]
+    medians = [table[table["Name"] != "Aggregated"].groupby(keys).agg(
+                   requests=("requests", "min"), p95=("95%", "median"))
+               for table in (base, endpoints)]
+    both = medians[0].join(medians[1], lsuffix="_baseline", how="inner").reset_index()
+    both["p95_change"] = both["p95"] / both["p95_baseline"] - 1
+    both["gated"] = (both[["requests_baseline", "requests"]].min(axis=1) >= MIN_ENDPOINT_REQUESTS) \
+        & both["p95_change"].notna()
+    both["regression"] = np.where(both["gated"] & (both["p95_change"] > min_change),
+                                  both["p95_change"].map(lambda c: f"p95 +{c:.0%}"), "")
+    return both[keys + ["requests_baseline", "requests", "p95_baseline", "p95", "p95_change", "gated",
+                        "regression"]]
+
+def _json_values(values):
+    return [None if isinstance(v, float) and math.isnan(v) else v for v in values]
+
+def save_baseline(path, run_names, samples, endpoints):
+    # NaN (N/A percentiles of idle windows) is stored as null and read back as NaN
+    baseline = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "runs": run_names,
+        "levels": {str(int(users)): {"rps": _json_values(level["rps"].tolist()),
+                                     "p95": _json_values(level["p95"].tolist())}
+                   for users, level in samples.groupby("users")},
+        "endpoints": [dict(zip(row, _json_values(row.values()))) for row in endpoints.to_dict(orient="records")],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=2, allow_nan=False, default=str)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Analyze Locust CSV runs and gate p95/throughput regressions")
+    parser.add_argument("runs", nargs="+", help="Run prefixes (results/nutriaware), *_stats.csv files or directories")
+    parser.add_argument("--baseline", help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", help="Write the given runs as a new baseline JSON and exit")
+    parser.add_argument("--alpha", type=float, default=0.01, help="Significance level of the one-sided tests")
+    parser.add_argument("--min-change", type=float, default=0.10,
+                        help="Smallest relative median change counted as a regression")
+    parser.add_argument("--endpoint-min-change", type=float, default=0.25,
+                        help="Smallest relative change of an endpoint's median p95 counted as a regression")
+    parser.add_argument("--warmup", type=float, default=10, help="Seconds skipped after each user-count change")
+    parser.add_argument("--sample-every", type=float, default=10, help="Seconds between kept history samples")
+    parser.add_argument("--curves", help="Write the aligned per-run samples to this CSV")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    runs = discover_runs(args.runs)
+
+    all_samples, all_endpoints = [], []
+    print(f"📂 {len(runs)} run(s) / عدد التشغيلات")
+    for name, prefix in runs.items():
+        stats, history = load_run(prefix)
+        endpoints = endpoint_percentiles(stats).assign(run=name)
+        samples = steady_samples(history, args.warmup, args.sample_every).assign(run=name)
+        all_endpoints.append(endpoints)
+        all_samples.append(samples)
+
+        print(f"\n═══ {name} ═══")
+        print(endpoints.drop(columns="run").to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+        if len(samples):
+            print("\nRPS vs users / الإنتاجية مقابل المستخدمين:")
+            print(rps_curve(samples).to_string(index=False, float_format=lambda v: f"{v:.1f}"))
+        else:
+            print("\n(no steady-state history samples / لا توجد عينات)")
+
+    samples = pd.concat(all_samples, ignore_index=True)
+    endpoints = pd.concat(all_endpoints, ignore_index=True)
+    if args.curves:
+        samples.to_csv(args.curves, index=False)
+        print(f"\n- {args.curves}")
+
+    if args.save_baseline:
+        if samples.empty:
+            sys.exit("❌ No steady-state samples to store as a baseline / لا توجد بيانات لخط الأساس")
+        save_baseline(args.save_baseline, list(runs), samples, endpoints)
+        print(f"\n✅ Baseline saved / تم حفظ خط الأساس: {args.save_baseline} ({len(samples)} samples)")
+        sys.exit(0)
+
+    if not args.baseline:
+        sys.exit(0)
+
+    if not os.path.exists(args.baseline):
+        sys.exit(f"❌ Baseline not found / خط الأساس غير موجود: {args.baseline} "
+                 "(record one with --save-baseline)")
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    result = compare(baseline["levels"], samples, args.alpha, args.min_change)
+    per_endpoint = compare_endpoints(baseline.get("endpoints", []), endpoints, args.endpoint_min_change)
+    print(f"\n═══ vs baseline {os.path.basename(args.baseline)} ({', '.join(baseline['runs'])}) ═══")
+    if result.empty:
+        print("⚠️ No user-count level in common with the baseline / لا توجد مستويات مشتركة")
+    else:
+        print(result.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+        ungated = result[~result["gated"]]
+        if len(ungated):
+            print(f"\nℹ️ Not gated (< {MIN_SAMPLES} samples): users {', '.join(map(str, ungated['users']))}")
+    if per_endpoint.empty:
+        print("\n⚠️ No endpoint in common with the baseline / لا توجد نقاط مشتركة")
+    else:
+        print("\nPer endpoint / لكل نقطة:")
+        print(per_endpoint.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+        ungated = per_endpoint[~per_endpoint["gated"]]
+        if len(ungated):
+            print(f"\nℹ️ Not gated (< {MIN_ENDPOINT_REQUESTS} requests): {', '.join(ungated['Name'])}")
+
+    issues = [f"{row.users} users: {row.regression}" for row in result.itertuples() if row.regression]
+    issues += [f"{row.Type} {row.Name}: {row.regression}".strip() for row in per_endpoint.itertuples()
+               if row.regression]
+    if issues:
+        print("\n❌ PERFORMANCE REGRESSION / تراجع في الأداء:")
+        for issue in issues:
+            print(f"  - {issue}")
+        sys.exit(1)
+    print("\n✅ No significant regression / لا يوجد تراجع ملحوظ")
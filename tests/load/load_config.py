@@ -0,0 +1,45 @@
+"""
+NutriAware Load Test Settings
+إعدادات اختبار الحمل المشتركة
+
+Pass/fail thresholds, the Vercel protection bypass headers and the offline
+switch, shared by the Locust files (locustfile.py, step_load.py) and the
+plain asyncio generator (open_model.py). Importing this module needs
+neither locust nor a secret.
+"""
+
+import os
+import sys
+
+# ─── Vercel Protection Bypass / تخطي حماية Vercel ───
+# Reads the bypass secret to authenticate against Vercel Deployment Protection
+# يقرأ كلمة المرور لتخطي حماية Vercel
+VERCEL_SECRET = os.getenv("VERCEL_AUTOMATION_BYPASS_SECRET") or os.getenv("VERCEL_BYPASS_SECRET")
+
+# Offline mode targets standin_server.py and needs no secret / الوضع المحلي لا يحتاج كلمة المرور
+OFFLINE = os.getenv("NUTRIAWARE_LOAD_OFFLINE", "").lower() in ("1", "true", "yes")
+
+BYPASS_HEADERS = {
+    "x-vercel-protection-bypass": VERCEL_SECRET,
+    "x-vercel-set-bypass-cookie": "true",
+} if VERCEL_SECRET else {}
+
+# ─── Success/Failure Thresholds / معايير النجاح ───
+THRESHOLDS = {
+    "max_p95_ms": 3000,          # p95 latency target / هدف زمن p95
+    "max_error_rate": 0.01,      # Max 1% errors / أقصى نسبة أخطاء 1%
+    "max_avg_response_ms": 2000, # Max avg response / أقصى متوسط استجابة
+}
+
+def require_bypass_secret():
+    """Exit with instructions unless a bypass secret is set or the run is offline."""
+    if VERCEL_SECRET or OFFLINE:
+        return
+    print("\n" + "═" * 60)
+    print("❌ ERROR: Vercel Bypass Secret is missing! / خطأ: كلمة مرور تخطي حماية Vercel مفقودة!")
+    print("Please set the VERCEL_AUTOMATION_BYPASS_SECRET environment variable.")
+    print("يرجى تعيين متغير البيئة VERCEL_AUTOMATION_BYPASS_SECRET قبل تشغيل الاختبار.")
+    print("Example: $env:VERCEL_AUTOMATION_BYPASS_SECRET=\"secret_here\"")
+    print("Offline stand-in runs: set NUTRIAWARE_LOAD_OFFLINE=1 instead.")
+    print("═" * 60 + "\n")
+    sys.exit(1)
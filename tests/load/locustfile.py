@@ -23,11 +23,36 @@ Usage / طريقة التشغيل:
   $env:VERCEL_AUTOMATION_BYPASS_SECRET="<YOUR_SECRET>"; `
   locust -f locustfile.py --host="https://your-staging.web.app"
 
+  # Backend write path against the offline stand-in / مسار الكتابة على الخادم البديل:
+  python standin_server.py --port 8089
+  NUTRIAWARE_LOAD_OFFLINE=1 locust -f locustfile.py NutriAwareApiUser --headless \
+    --host=http://localhost:8089 -u 200 -r 20 -t 5m --csv=results/nutriaware_api
+
+  # The API user is off unless opted in (NUTRIAWARE_LOAD_OFFLINE=1 or
+  # NUTRIAWARE_LOAD_API=1), so page runs never send writes to a live site.
+  # Opted in, pick it by class name as above / مستخدم الواجهة معطل افتراضياً:
+  NUTRIAWARE_LOAD_API=1 locust -f locustfile.py NutriAwareApiUser --host=https://your-staging.web.app
+
+  # Distributed: one master + N local workers, so one CPU no longer caps RPS
+  # موزّع: عدة عمليات لتوليد الحمل (thresholds are checked on the master's aggregated stats)
+  locust -f locustfile.py --headless --processes 4 \
+    --host=https://your-staging.web.app -u 500 -r 25 -t 10m --csv=results/nutriaware
+  # or on separate machines / أو على أجهزة منفصلة:
+  locust -f locustfile.py --master --headless --expect-workers 4 -u 500 -r 25 -t 10m --host=...
+  locust -f locustfile.py --worker --master-host=<master-ip>     # once per worker
+
+  # Step load with break-point detection / تحميل متدرج لتحديد نقطة الانهيار:
+  locust -f locustfile.py,step_load.py --headless --host=https://your-staging.web.app \
+    --step-users 25 --step-duration 60 --step-max-users 500 --csv=results/nutriaware_steps
+
 Parameters / المعاملات:
   -u / --users    : Max concurrent users / أقصى مستخدمين متزامنين
   -r / --spawn-rate : Users spawned per second / معدل إضافة المستخدمين/ثانية
   -t / --run-time : Total test duration / مدة الاختبار الكلية
 
+Exit code / رمز الخروج:
+  1 when any THRESHOLDS entry is violated, so CI fails the job / 1 عند تجاوز أي معيار
+
 ⚠️ WARNING / تحذير:
   - Test on staging FIRST / اختبر على بيئة الاختبار أولاً
   - Monitor server resources / راقب موارد الخادم
@@ -38,32 +63,19 @@ import time
 import random
 import logging
 import os
-import sys
 from locust import HttpUser, task, between, events, tag
-from locust.runners import MasterRunner
+from locust.runners import MasterRunner, WorkerRunner
 
-# ─── Vercel Protection Bypass / تخطي حماية Vercel ───
-# Reads the bypass secret to authenticate against Vercel Deployment Protection
-# يقرأ كلمة المرور لتخطي حماية Vercel
-VERCEL_SECRET = os.getenv("VERCEL_AUTOMATION_BYPASS_SECRET") or os.getenv("VERCEL_BYPASS_SECRET")
+from load_config import BYPASS_HEADERS, OFFLINE, THRESHOLDS, require_bypass_secret
+from survey_payloads import avatar_data_uri, firestore_document, load_schema, log_event, survey_submission
 
-if not VERCEL_SECRET:
-    print("\n" + "═" * 60)
-    print("❌ ERROR: Vercel Bypass Secret is missing! / خطأ: كلمة مرور تخطي حماية Vercel مفقودة!")
-    print("Please set the VERCEL_AUTOMATION_BYPASS_SECRET environment variable.")
-    print("يرجى تعيين متغير البيئة VERCEL_AUTOMATION_BYPASS_SECRET قبل تشغيل الاختبار.")
-    print("Example: $env:VERCEL_AUTOMATION_BYPASS_SECRET=\"secret_here\"")
-    print("═" * 60 + "\n")
-    sys.exit(1)
+# Secret, thresholds and offline switch: load_config.py (shared with open_model.py)
+require_bypass_secret()
 
-logger = logging.getLogger(__name__)
+# NutriAwareApiUser (backend writes) only runs when asked for / مسار الكتابة عند الطلب فقط
+API_USER = OFFLINE or os.getenv("NUTRIAWARE_LOAD_API", "").lower() in ("1", "true", "yes")
 
-# ─── Success/Failure Thresholds / معايير النجاح ───
-THRESHOLDS = {
-    "max_p95_ms": 3000,          # p95 latency target / هدف زمن p95
-    "max_error_rate": 0.01,      # Max 1% errors / أقصى نسبة أخطاء 1%
-    "max_avg_response_ms": 2000, # Max avg response / أقصى متوسط استجابة
-}
+logger = logging.getLogger(__name__)
 
 
 class NutriAwareUser(HttpUser):
@@ -83,8 +95,7 @@ class NutriAwareUser(HttpUser):
         "User-Agent": "Locust-NutriAware-QA/1.0",
         
         # Vercel Automation Bypass Headers
-        "x-vercel-protection-bypass": VERCEL_SECRET,
-        "x-vercel-set-bypass-cookie": "true",
+        **BYPASS_HEADERS,
     }
 
     def on_start(self):
@@ -230,6 +241,113 @@ class NutriAwareUser(HttpUser):
         self.pages_visited += 4
 
 
+# ─── Backend Write Path / مسار الكتابة في الخادم ───
+# Survey submissions go straight to Firestore (src/services/evaluation.ts), so
+# they are only sent where it is safe: the stand-in, a Firestore emulator, or a
+# staging project given explicitly through SURVEY_SUBMIT_URL.
+SURVEY_SUBMIT_URL = os.getenv("SURVEY_SUBMIT_URL") or (
+    "/v1/projects/nutriaware-offline/databases/(default)/documents/project_evaluations" if OFFLINE else None)
+
+# Auth routes verify a real Firebase ID token; the stand-in accepts any value
+ID_TOKEN = os.getenv("LOAD_TEST_ID_TOKEN") or ("offline-id-token" if OFFLINE else None)
+
+SURVEY_SCHEMA = load_schema()
+
+
+class NutriAwareApiUser(HttpUser):
+    """
+    Exercises the backend instead of CDN-cached pages: survey submissions,
+    activity logging, geo lookups, the session lifecycle and avatar uploads,
+    with payloads generated from docs/surveySchema.json.
+    يختبر مسار الكتابة: إرسال الاستبيان وواجهات api/
+
+    Abstract (never spawned) unless NUTRIAWARE_LOAD_OFFLINE or
+    NUTRIAWARE_LOAD_API is set, so the default page-journey runs keep their
+    traffic mix and send nothing to the write endpoints.
+    """
+
+    abstract = not API_USER
+    wait_time = between(1, 3)
+
+    HEADERS = {
+        "Accept": "application/json",
+        "Content-Type": "application/json",
+        "Accept-Language": "ar,en;q=0.9",
+        "User-Agent": "Locust-NutriAware-QA/1.0",
+        **BYPASS_HEADERS,
+    }
+
+    def _expect(self, response, *codes):
+        if response.status_code in codes:
+            response.success()
+        else:
+            response.failure(f"HTTP {response.status_code}")
+
+    @task(10)
+    @tag("api", "write", "survey")
+    def submit_survey(self):
+        """Full post-test submission (~8-12 KB of Firestore JSON) / إرسال استبيان كامل"""
+        if not SURVEY_SUBMIT_URL:
+            return
+        body = firestore_document(survey_submission(SURVEY_SCHEMA))
+        with self.client.post(SURVEY_SUBMIT_URL, json=body, headers=self.HEADERS,
+                              name="POST survey submission (إرسال الاستبيان)",
+                              catch_response=True) as response:
+            self._expect(response, 200)
+
+    @task(30)
+    @tag("api", "write", "log")
+    def log_activity(self):
+        """Activity event from the client tracker / تسجيل نشاط"""
+        with self.client.post("/api/log", json=log_event(), headers=self.HEADERS,
+                              name="POST /api/log", catch_response=True) as response:
+            # api/log.ts answers 200 with success=false on storage errors
+            if response.status_code == 200 and response.json().get("success") is False:
+                response.failure("Logging failed server-side")
+            else:
+                self._expect(response, 200)
+
+    @task(15)
+    @tag("api", "geo")
+    def geo_lookup(self):
+        with self.client.get("/api/geo", headers=self.HEADERS,
+                             name="GET /api/geo", catch_response=True) as response:
+            self._expect(response, 200)
+
+    @task(5)
+    @tag("api", "write", "auth")
+    def session_lifecycle(self):
+        """Login -> token refresh -> (sometimes revoke all) -> logout / دورة الجلسة"""
+        if not ID_TOKEN:
+            return
+        with self.client.post("/api/auth/session", json={"idToken": ID_TOKEN, "deviceInfo": "Locust"},
+                              headers=self.HEADERS, name="POST /api/auth/session",
+                              catch_response=True) as response:
+            self._expect(response, 200)
+        with self.client.post("/api/auth/refreshToken", headers=self.HEADERS,
+                              name="POST /api/auth/refreshToken", catch_response=True) as response:
+            self._expect(response, 200)
+        if random.random() < 0.1:
+            with self.client.post("/api/auth/revokeAll", headers=self.HEADERS,
+                                  name="POST /api/auth/revokeAll", catch_response=True) as response:
+                self._expect(response, 200)
+        with self.client.post("/api/auth/logout", headers=self.HEADERS,
+                              name="POST /api/auth/logout", catch_response=True) as response:
+            self._expect(response, 200)
+
+    @task(2)
+    @tag("api", "write", "admin")
+    def upload_avatar(self):
+        """Avatar upload, 50-400 KB (API limit is 2 MB) / رفع صورة"""
+        if not ID_TOKEN:
+            return
+        headers = dict(self.HEADERS, Authorization=f"Bearer {ID_TOKEN}")
+        body = {"userId": f"load-{random.randint(1, 1000)}", "photoURL": avatar_data_uri(random.randint(50, 400))}
+        with self.client.patch("/api/admin/users/avatar", json=body, headers=headers,
+                               name="PATCH /api/admin/users/avatar", catch_response=True) as response:
+            self._expect(response, 200)
+
+
 # ─── Event Hooks / أحداث ───
 
 @events.test_start.add_listener
@@ -246,9 +364,15 @@ def on_test_start(environment, **kwargs):
 @events.test_stop.add_listener
 def on_test_stop(environment, **kwargs):
     """
-    Called when test ends — prints summary / يُستدعى عند انتهاء الاختبار
+    Called when test ends — prints summary and fails the run on threshold
+    violations / يُستدعى عند انتهاء الاختبار
     """
-    stats = environment.runner.stats
+    runner = environment.runner
+    # Workers only hold their own share; the master receives every worker's
+    # stats and decides / الخادم الرئيسي يقيّم الإحصاءات المجمعة
+    if isinstance(runner, WorkerRunner):
+        return
+    stats = runner.stats
 
     total_requests = stats.total.num_requests
     total_failures = stats.total.num_failures
@@ -258,9 +382,24 @@ def on_test_stop(environment, **kwargs):
     p99 = stats.total.get_response_time_percentile(0.99) or 0
     rps = stats.total.current_rps
 
-    max_users = environment.runner.user_count if hasattr(environment.runner, 'user_count') else 0
-    break_point = max_users if error_rate > THRESHOLDS["max_error_rate"] else -1
-    safe_users = int(break_point * 0.7) if break_point > 0 else int(max_users * 0.7)
+    if isinstance(runner, MasterRunner):
+        # Workers have already stopped their users by the time test_stop fires
+        max_users = sum(runner.final_user_classes_count.values())
+    else:
+        max_users = runner.user_count
+
+    # Measured knee when run with step_load.py; otherwise only an estimate from
+    # the final user count / نقطة الانهيار المقاسة عند استخدام step_load.py
+    shape = environment.shape_class
+    step_report = shape.finish() if hasattr(shape, "finish") and shape.runner is not None else None
+    if step_report and step_report["steps"]:
+        break_point = step_report["break_point_users"] or -1
+        safe_users = step_report["safe_users"]
+        max_users = max(s["users"] for s in step_report["steps"])
+    else:
+        step_report = None
+        break_point = max_users if error_rate > THRESHOLDS["max_error_rate"] else -1
+        safe_users = int(break_point * 0.7) if break_point > 0 else int(max_users * 0.7)
 
     print("\n" + "═" * 60)
     print("📊 NutriAware Load Test Results / نتائج اختبار الحمل")
@@ -272,8 +411,19 @@ def on_test_stop(environment, **kwargs):
     print(f"⏱  p99 Latency / زمن p99: {p99:.0f}ms")
     print(f"🔄 RPS / طلبات/ثانية: {rps:.1f}")
     print(f"👥 Peak Users / أقصى مستخدمين: {max_users}")
-    print(f"🔴 Break Point / نقطة الانهيار: {'Not reached / لم تُحدد' if break_point < 0 else f'{break_point} users'}")
-    print(f"✅ Safe Concurrent / المستخدمين الآمنين: ~{safe_users}")
+    if isinstance(runner, MasterRunner):
+        print(f"🖥  Workers / عمليات التوليد: {runner.worker_count}")
+    if step_report:
+        from step_load import print_step_report
+        print_step_report(step_report)
+        knee = "; ".join(step_report["knee_violations"])
+        print(f"🔴 Break Point / نقطة الانهيار: {'Not reached / لم تُحدد' if break_point < 0 else f'{break_point} users ({knee})'}")
+        print(f"✅ Safe Concurrent / المستخدمين الآمنين: {safe_users} (measured / مقاس)")
+        print(f"🚀 Throughput Ceiling / أقصى إنتاجية: {step_report['throughput_ceiling_rps']:.1f} req/s "
+              f"@ {step_report['throughput_ceiling_users']} users")
+    else:
+        print(f"🔴 Break Point / نقطة الانهيار: {'Not reached / لم تُحدد' if break_point < 0 else f'{break_point} users'}")
+        print(f"✅ Safe Concurrent / المستخدمين الآمنين: ~{safe_users} (estimate; run with step_load.py to measure)")
     print("═" * 60)
 
     # Threshold checks / فحص المعايير
@@ -289,6 +439,7 @@ def on_test_stop(environment, **kwargs):
         print("\n⚠️ THRESHOLD VIOLATIONS / تجاوزات المعايير:")
         for issue in issues:
             print(f"  {issue}")
+        environment.process_exit_code = 1
     else:
         print("\n✅ ALL THRESHOLDS PASSED / جميع المعايير نجحت!")
 
@@ -0,0 +1,457 @@
+"""
+NutriAware Open-Model Load Generator (constant arrival rate)
+مولّد حمل بمعدل وصول ثابت لتجنب الإغفال المنسق
+
+locustfile.py is a closed model: each simulated user waits for its
+response and then thinks, so when the server slows down fewer requests
+are sent and the slow period is under-sampled (coordinated omission).
+This generator schedules arrivals on a fixed clock instead, whatever the
+server does, and measures every latency from the request's *intended*
+send time. Time spent waiting for a connection or behind a slow previous
+journey step is therefore part of the recorded latency, as it would be
+for a real visitor.
+
+The route mix and names are NutriAwareUser's (homepage 30, survey 25,
+knowledge 15, ai-tools 10, assessment 10, journey 10, about 5, contact 5),
+and the results use the same files as `locust --csv`
+(<prefix>_stats.csv, _stats_history.csv, _failures.csv), so
+analyze_results.py reads them as well. In the history file "User Count"
+is the target arrival rate (--rate), the run's one load level, so the
+analyzer's warm-up and per-level comparison apply to it as to a user
+count. Compare open-model runs with open-model baselines at the same rate.
+
+Latencies go into HDR-style log-linear histograms (<1% relative error, fixed
+memory), one per endpoint plus one per second for the rolling columns.
+Service time measured from the actual send is also kept, and the gap
+between the two is printed at the end.
+
+Usage / الاستخدام:
+  $env:VERCEL_AUTOMATION_BYPASS_SECRET="<YOUR_SECRET>"
+  python open_model.py --host https://your-staging.web.app --rate 50 --duration 300 \
+    --csv results/nutriaware_open
+
+  # Offline against standin_server.py
+  NUTRIAWARE_LOAD_OFFLINE=1 python open_model.py --host http://localhost:8089 --rate 200 --duration 60
+
+Exit code 1 when THRESHOLDS from load_config.py are violated.
+"""
+
+import argparse
+import asyncio
+import csv
+import random
+import ssl
+import sys
+import time
+from collections import Counter, defaultdict
+from urllib.parse import urlsplit
+
+from load_config import BYPASS_HEADERS, THRESHOLDS, require_bypass_secret
+
+# (weight, name, path) — NutriAwareUser's tasks and request names
+ROUTES = [
+    (30, "/ Homepage (الرئيسية)", "/"),
+    (25, "/project-evaluation Survey (الاستبيان)", "/project-evaluation"),
+    (15, "/knowledge (المعرفة)", "/knowledge"),
+    (10, "/ai-tools (أدوات الذكاء)", "/ai-tools"),
+    (10, "/assessment (التقييم)", "/assessment"),
+    (5, "/about (عن المنصة)", "/about"),
+    (5, "/contact (اتصل بنا)", "/contact"),
+]
+JOURNEY_WEIGHT = 10
+# Journey steps with the think time (s) before each, as in full_user_journey
+JOURNEY = [
+    ((0, 0), "Journey: / Homepage", "/"),
+    ((1, 3), "Journey: /knowledge", "/knowledge"),
+    ((2, 5), "Journey: /ai-tools", "/ai-tools"),
+    ((1, 3), "Journey: /project-evaluation", "/project-evaluation"),
+]
+
+HEADERS = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9",
+    "Accept-Language": "ar,en;q=0.9",
+    "User-Agent": "Locust-NutriAware-QA/1.0 (open-model)",
+    **BYPASS_HEADERS,
+}
+
+PERCENTILES = [0.50, 0.66, 0.75, 0.80, 0.90, 0.95, 0.98, 0.99, 0.999, 0.9999, 1.0]
+PERCENTILE_COLUMNS = ["50%", "66%", "75%", "80%", "90%", "95%", "98%", "99%", "99.9%", "99.99%", "100%"]
+CURRENT_WINDOW_S = 10  # rolling window of the history columns, like Locust's
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of microsecond values (HDR layout, 2 significant
+    digits): values below 256 us are exact, above that every power of two
+    is split into 128 sub-buckets, so the relative error stays under 1%.
+    """
+
+    SUB_BITS = 8
+    SUB_COUNT = 1 << SUB_BITS
+    HALF = SUB_COUNT // 2
+    SIZE = SUB_COUNT + 40 * HALF  # up to ~10^14 us
+
+    def __init__(self):
+        self.counts = [0] * self.SIZE
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    @classmethod
+    def index(cls, value):
+        if value < cls.SUB_COUNT:
+            return value
+        shift = value.bit_length() - cls.SUB_BITS
+        return cls.SUB_COUNT + (shift - 1) * cls.HALF + (value >> shift) - cls.HALF
+
+    @classmethod
+    def highest_equivalent(cls, index):
+        if index < cls.SUB_COUNT:
+            return index
+        shift, sub = divmod(index - cls.SUB_COUNT, cls.HALF)
+        shift += 1
+        return ((sub + cls.HALF) << shift) + (1 << shift) - 1
+
+    def record(self, value_us):
+        value_us = max(0, int(value_us))
+        self.counts[self.index(value_us)] += 1
+        self.count += 1
+        self.total += value_us
+        self.max = max(self.max, value_us)
+        self.min = value_us if self.min is None else min(self.min, value_us)
+
+    def merge(self, other):
+        for i, n in enumerate(other.counts):
+            if n:
+                self.counts[i] += n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+
+    def percentiles(self, quantiles):
+        """Values (us) at `quantiles`; the exact max for 1.0, None when empty."""
+        if not self.count:
+            return [None] * len(quantiles)
+        out, seen, k = [], 0, 0
+        targets = [max(1, round(q * self.count)) for q in quantiles]
+        for i, n in enumerate(self.counts):
+            seen += n
+            while k < len(targets) and seen >= targets[k]:
+                out.append(self.max if quantiles[k] >= 1.0 else min(self.highest_equivalent(i), self.max))
+                k += 1
+            if k == len(targets):
+                break
+        return out
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+class EndpointStats:
+    def __init__(self):
+        self.latency = LatencyHistogram()   # from intended send time
+        self.service = LatencyHistogram()   # from actual send time
+        self.failures = 0
+        self.bytes = 0
+
+class ConnectionPool:
+    """Minimal keep-alive HTTP/1.1 client on asyncio streams (GET only)."""
+
+    def __init__(self, base_url, limit, timeout):
+        url = urlsplit(base_url)
+        self.host = url.hostname
+        self.port = url.port or (443 if url.scheme == "https" else 80)
+        self.ssl = ssl.create_default_context() if url.scheme == "https" else None
+        self.host_header = url.netloc
+        self.timeout = timeout
+        self.slots = asyncio.Semaphore(limit)
+        self.idle = []
+
+    async def _connect(self):
+        return await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+
+    async def _exchange(self, reader, writer, request):
+        writer.write(request)
+        await writer.drain()
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("Connection closed by server")
+        status = int(status_line.split()[1])
+        headers = {}
+        while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip().lower()
+        if headers.get("transfer-encoding") == "chunked":
+            size = 0
+            while (chunk := int((await reader.readline()).split(b";")[0], 16)):
+                await reader.readexactly(chunk + 2)
+                size += chunk
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+        elif "content-length" in headers:
+            size = int(headers["content-length"])
+            await reader.readexactly(size)
+        else:
+            size = len(await reader.read())
+            headers["connection"] = "close"
+        return status, size, headers.get("connection") != "close"
+
+    async def get(self, path, headers):
+        """(status, body bytes, actual send time); connection waits count as latency."""
+        request = (f"GET {path} HTTP/1.1\r\nHost: {self.host_header}\r\n"
+                   + "".join(f"{k}: {v}\r\n" for k, v in headers.items())
+                   + "Connection: keep-alive\r\n\r\n").encode("utf-8")
+        async with self.slots:
+            reused = bool(self.idle)
+            reader, writer = self.idle.pop() if reused else await self._connect()
+            sent_at = time.perf_counter()
+            try:
+                try:
+                    status, size, keep = await asyncio.wait_for(self._exchange(reader, writer, request), self.timeout)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    if not reused:
+                        raise
+                    # The server closed an idle keep-alive connection; retry once
+                    writer.close()
+                    reader, writer = await self._connect()
+                    sent_at = time.perf_counter()
+                    status, size, keep = await asyncio.wait_for(self._exchange(reader, writer, request), self.timeout)
+            except BaseException:
+                writer.close()
+                raise
+            if keep:
+                self.idle.append((reader, writer))
+            else:
+                writer.close()
+            return status, size, sent_at
+
+    def close(self):
+        for _, writer in self.idle:
+            writer.close()
+        self.idle.clear()
+
+class OpenModelRun:
+    def __init__(self, pool, rate, duration, arrivals, seed):
+        self.pool = pool
+        self.rate = rate
+        self.duration = duration
+        self.arrivals = arrivals
+        self.rng = random.Random(seed)
+        self.stats = defaultdict(EndpointStats)
+        self.errors = Counter()
+        self.per_second = defaultdict(LatencyHistogram)
+        self.failures_per_second = Counter()
+        self.in_flight = self.max_in_flight = 0
+        self.max_schedule_lag = 0.0
+        self.history = []
+
+    def _second(self, t):
+        return int(t - self.start)
+
+    async def _request(self, name, path, intended):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        stats = self.stats[name]
+        failed = False
+        sent_at = None
+        try:
+            status, size, sent_at = await self.pool.get(path, HEADERS)
+            stats.bytes += size
+            if status >= 400:
+                failed = True
+                self.errors[(name, f"HTTP {status}")] += 1
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+            failed = True
+            self.errors[(name, f"{type(e).__name__}: {e}"[:200])] += 1
+        finally:
+            self.in_flight -= 1
+        done = time.perf_counter()
+        latency_us = (done - intended) * 1e6
+        stats.latency.record(latency_us)
+        if sent_at is not None:
+            stats.service.record((done - sent_at) * 1e6)
+        self.per_second[self._second(done)].record(latency_us)
+        if failed:
+            stats.failures += 1
+            self.failures_per_second[self._second(done)] += 1
+
+    async def _journey(self, intended):
+        at = intended
+        for (low, high), name, path in JOURNEY:
+            at += self.rng.uniform(low, high)
+            delay = at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await self._request(name, path, at)
+
+    def _pick(self):
+        weights = [w for w, _, _ in ROUTES] + [JOURNEY_WEIGHT]
+        choice = self.rng.choices(range(len(weights)), weights=weights)[0]
+        return None if choice == len(ROUTES) else ROUTES[choice]
+
+    async def _history_sampler(self):
+        while True:
+            await asyncio.sleep(1)
+            self.history.append(self._history_row(time.perf_counter()))
+
+    def _history_row(self, now):
+        second = self._second(now)
+        window = LatencyHistogram()
+        span = range(max(0, second - CURRENT_WINDOW_S), second)
+        for s in span:
+            if s in self.per_second:
+                window.merge(self.per_second[s])
+        seconds = max(1, len(span))
+        total = LatencyHistogram()
+        for stats in self.stats.values():
+            total.merge(stats.latency)
+        failures = sum(s.failures for s in self.stats.values())
+        return {
+            "Timestamp": int(time.time()),
+            # The load level; requests in flight change every sample
+            "User Count": f"{self.rate:g}",
+            "Requests/s": window.count / seconds,
+            "Failures/s": sum(self.failures_per_second[s] for s in span) / seconds,
+            "window": window,
+            "total": total,
+            "failures": failures,
+            "bytes": sum(s.bytes for s in self.stats.values()),
+        }
+
+    async def run(self):
+        self.start = time.perf_counter()
+        sampler = asyncio.create_task(self._history_sampler())
+        tasks = set()
+        intended = self.start
+        end = self.start + self.duration
+        while intended < end:
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                self.max_schedule_lag = max(self.max_schedule_lag, -delay)
+            route = self._pick()
+            coro = self._journey(intended) if route is None else self._request(route[1], route[2], intended)
+            task = asyncio.create_task(coro)
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            gap = self.rng.expovariate(self.rate) if self.arrivals == "poisson" else 1 / self.rate
+            intended += gap
+        if tasks:
+            await asyncio.wait(tasks)
+        sampler.cancel()
+        self.elapsed = time.perf_counter() - self.start
+        self.history.append(self._history_row(time.perf_counter()))
+
+def _ms(us):
+    return "N/A" if us is None else round(us / 1000)
+
+def stats_row(method, name, stats_hist, failures, size, elapsed):
+    h = stats_hist
+    pct = h.percentiles(PERCENTILES)
+    return [method, name, h.count, failures, _ms(pct[0]) if h.count else 0, round(h.mean / 1000, 2),
+            _ms(h.min) if h.count else 0, _ms(h.max), round(size / h.count, 2) if h.count else 0,
+            round(h.count / elapsed, 6), round(failures / elapsed, 6)] + [_ms(v) for v in pct]
+
+def write_csv(prefix, run):
+    columns = ["Type", "Name", "Request Count", "Failure Count", "Median Response Time", "Average Response Time",
+               "Min Response Time", "Max Response Time", "Average Content Size", "Requests/s", "Failures/s"]
+    total = LatencyHistogram()
+    with open(f"{prefix}_stats.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns + PERCENTILE_COLUMNS)
+        for name in sorted(run.stats):
+            s = run.stats[name]
+            writer.writerow(stats_row("GET", name, s.latency, s.failures, s.bytes, run.elapsed))
+            total.merge(s.latency)
+        writer.writerow(stats_row("", "Aggregated", total, sum(s.failures for s in run.stats.values()),
+                                  sum(s.bytes for s in run.stats.values()), run.elapsed))
+
+    with open(f"{prefix}_stats_history.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Timestamp", "User Count", "Type", "Name", "Requests/s", "Failures/s"] + PERCENTILE_COLUMNS
+                        + ["Total Request Count", "Total Failure Count", "Total Median Response Time",
+                           "Total Average Response Time", "Total Min Response Time", "Total Max Response Time",
+                           "Total Average Content Size"])
+        for row in run.history:
+            t = row["total"]
+            writer.writerow([row["Timestamp"], row["User Count"], "", "Aggregated",
+                             f"{row['Requests/s']:.6f}", f"{row['Failures/s']:.6f}"]
+                            + [_ms(v) for v in row["window"].percentiles(PERCENTILES)]
+                            + [t.count, row["failures"], _ms(t.percentiles([0.5])[0]) if t.count else 0,
+                               round(t.mean / 1000, 2), _ms(t.min) if t.count else 0, _ms(t.max),
+                               round(row["bytes"] / t.count, 2) if t.count else 0])
+
+    with open(f"{prefix}_failures.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Method", "Name", "Error", "Occurrences"])
+        for (name, error), n in run.errors.most_common():
+            writer.writerow(["GET", name, error, n])
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Constant-arrival-rate load generator for NutriAware")
+    parser.add_argument("--host", required=True, help="Base URL, e.g. https://your-staging.web.app")
+    parser.add_argument("--rate", type=float, required=True, help="Arrivals per second (a journey is one arrival)")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds of arrivals")
+    parser.add_argument("--arrivals", choices=["constant", "poisson"], default="constant",
+                        help="Fixed spacing, or exponential gaps with the same mean rate")
+    parser.add_argument("--connections", type=int, default=500, help="Max concurrent connections")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for the route mix and arrival gaps")
+    parser.add_argument("--csv", help="Write Locust-format CSVs with this prefix")
+    return parser.parse_args()
+
+async def main(args):
+    pool = ConnectionPool(args.host, args.connections, args.timeout)
+    run = OpenModelRun(pool, args.rate, args.duration, args.arrivals, args.seed)
+    try:
+        await run.run()
+    finally:
+        pool.close()
+    return run
+
+if __name__ == "__main__":
+    args = parse_args()
+    require_bypass_secret()
+    print(f"🚀 Open model: {args.rate:g} arrivals/s for {args.duration:g}s → {args.host}")
+    run = asyncio.run(main(args))
+
+    total, service = LatencyHistogram(), LatencyHistogram()
+    for s in run.stats.values():
+        total.merge(s.latency)
+        service.merge(s.service)
+    failures = sum(s.failures for s in run.stats.values())
+    error_rate = failures / total.count if total.count else 0
+    p50, p95, p99 = (_ms(v) for v in total.percentiles([0.5, 0.95, 0.99]))
+    s95, s99 = (_ms(v) for v in service.percentiles([0.95, 0.99]))
+
+    print("\n" + "═" * 60)
+    print("📊 Open-Model Results / نتائج النموذج المفتوح")
+    print("═" * 60)
+    print(f"📝 Requests / الطلبات: {total.count} ({total.count / run.elapsed:.1f}/s)")
+    print(f"❌ Failures / الإخفاقات: {failures} ({error_rate:.2%})")
+    print(f"⏱  Latency from intended send (p50/p95/p99): {p50} / {p95} / {p99} ms")
+    print(f"⏱  Service time from actual send (p95/p99):  {s95} / {s99} ms")
+    print(f"🔀 Max requests in flight / أقصى طلبات متزامنة: {run.max_in_flight}")
+    print(f"🕒 Max scheduler lag / تأخر المجدول: {run.max_schedule_lag * 1000:.0f}ms"
+          + ("  ⚠️ generator saturated, add processes or lower --rate" if run.max_schedule_lag > 0.1 else ""))
+    print("═" * 60)
+    if args.csv:
+        write_csv(args.csv, run)
+        print(f"- {args.csv}_stats.csv, {args.csv}_stats_history.csv, {args.csv}_failures.csv")
+
+    issues = []
+    if error_rate > THRESHOLDS["max_error_rate"]:
+        issues.append(f"⚠️ Error rate {error_rate:.2%} > {THRESHOLDS['max_error_rate']:.0%}")
+    if total.count and p95 > THRESHOLDS["max_p95_ms"]:
+        issues.append(f"⚠️ p95 {p95}ms > {THRESHOLDS['max_p95_ms']}ms")
+    if total.mean / 1000 > THRESHOLDS["max_avg_response_ms"]:
+        issues.append(f"⚠️ Avg {total.mean / 1000:.0f}ms > {THRESHOLDS['max_avg_response_ms']}ms")
+    if issues:
+        print("\n⚠️ THRESHOLD VIOLATIONS / تجاوزات المعايير:")
+        for issue in issues:
+            print(f"  {issue}")
+        sys.exit(1)
+    print("\n✅ ALL THRESHOLDS PASSED / جميع المعايير نجحت!")
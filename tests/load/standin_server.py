@@ -0,0 +1,245 @@
+"""
+NutriAware Offline Stand-in Server
+خادم بديل محلي لاختبار مسار الكتابة بدون الموقع الحقيقي
+
+Mimics the request handling of the Vercel functions in api/ and the
+Firestore REST endpoint the survey submits to, with in-memory storage and
+a configurable write latency standing in for Firestore round-trips. Every
+other GET returns a small SPA shell, so NutriAwareUser can run against it
+too.
+
+  POST   /api/log                      (api/log.ts)
+  GET    /api/geo                      (api/geo.ts)
+  POST   /api/auth/session             (api/auth/session.ts)
+  POST   /api/auth/refreshToken        (api/auth/refreshToken.ts)
+  POST   /api/auth/logout              (api/auth/logout.ts)
+  POST   /api/auth/revokeAll           (api/auth/revokeAll.ts)
+  PATCH  /api/admin/users/avatar       (api/admin/users/avatar.ts)
+  DELETE /api/admin/users/avatar
+  POST   /v1/projects/<p>/databases/(default)/documents/<collection>
+  GET    /__stats                      counters for the run
+
+Usage / الاستخدام:
+  python standin_server.py --port 8089 --write-latency-ms 40
+  NUTRIAWARE_LOAD_OFFLINE=1 locust -f locustfile.py NutriAwareApiUser --host=http://localhost:8089
+"""
+
+import argparse
+import json
+import random
+import re
+import secrets
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MAX_AVATAR_BYTES = 2 * 1024 * 1024
+ALLOWED_AVATAR_TYPES = ("image/jpeg", "image/png", "image/webp")
+FIRESTORE_PATH = re.compile(r"^/v1/projects/[^/]+/databases/\(default\)/documents/(?P<collection>[\w-]+)$")
+SPA_SHELL = b'<!doctype html><html lang="ar" dir="rtl"><head><title>NutriAware</title></head><body><div id="root"></div></body></html>'
+
+class Store:
+    """In-memory stand-in for the Firestore collections and sessions the API touches."""
+
+    def __init__(self, write_latency_ms=0.0, jitter_ms=0.0):
+        self.write_latency_ms = write_latency_ms
+        self.jitter_ms = jitter_ms
+        self.lock = threading.Lock()
+        self.collections = {}
+        self.sessions = {}   # cookie -> uid
+        self.counters = Counter()
+        self.bytes_in = 0
+
+    def write_delay(self):
+        if self.write_latency_ms or self.jitter_ms:
+            time.sleep(max(0.0, random.gauss(self.write_latency_ms, self.jitter_ms)) / 1000)
+
+    def add(self, collection, doc):
+        self.write_delay()
+        doc_id = secrets.token_hex(10)
+        with self.lock:
+            self.collections.setdefault(collection, {})[doc_id] = doc
+            self.counters[f"docs:{collection}"] += 1
+        return doc_id
+
+def _cookies(header):
+    return dict(part.split("=", 1) for part in (header or "").split("; ") if "=" in part)
+
+class StandinHandler(BaseHTTPRequestHandler):
+    server_version = "NutriAwareStandin/1.0"
+    protocol_version = "HTTP/1.1"
+    wbufsize = -1  # send headers and body in one segment (no Nagle/delayed-ACK stalls)
+    store = None  # set by make_server()
+
+    def log_message(self, format, *args):  # keep the load test output readable
+        pass
+
+    # ─── helpers ───
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        with self.store.lock:
+            self.store.bytes_in += len(raw)
+        if not raw:
+            return {}
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return None
+
+    def _send(self, status, payload=None, headers=None, body=None, content_type="application/json"):
+        if body is None:
+            body = b"" if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+        with self.store.lock:
+            self.store.counters[f"{self.command} {self.path.split('?')[0]} {status}"] += 1
+
+    def _session_uid(self):
+        return self.store.sessions.get(_cookies(self.headers.get("Cookie")).get("__session"))
+
+    # ─── routes ───
+    def do_OPTIONS(self):
+        self._send(204)
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        if path == "/api/geo":
+            self._send(200, {
+                "city": self.headers.get("x-vercel-ip-city", "Unknown"),
+                "country": self.headers.get("x-vercel-ip-country", "Unknown"),
+                "countryCode": self.headers.get("x-vercel-ip-country", "Unknown"),
+                "region": self.headers.get("x-vercel-ip-country-region", ""),
+            }, headers={"Cache-Control": "no-store"})
+        elif path == "/__stats":
+            with self.store.lock:
+                stats = {"counters": dict(self.store.counters), "bytes_in": self.store.bytes_in,
+                         "docs": {k: len(v) for k, v in self.store.collections.items()}}
+            self._send(200, stats)
+        elif path.startswith("/api/"):
+            self._send(405, {"error": "Method Not Allowed"})
+        else:
+            self._send(200, body=SPA_SHELL, content_type="text/html; charset=utf-8")
+
+    def do_POST(self):
+        path = self.path.split("?")[0]
+        payload = self._body()
+        if payload is None:
+            return self._send(400, {"error": "Invalid JSON"})
+
+        match = FIRESTORE_PATH.match(path)
+        if match:
+            fields = payload.get("fields", {})
+            # firestore.rules: creates need a createdAt timestamp
+            if "timestampValue" not in fields.get("createdAt", {}):
+                return self._send(403, {"error": {"code": 403, "status": "PERMISSION_DENIED"}})
+            collection = match.group("collection")
+            doc_id = self.store.add(collection, fields)
+            now = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+            return self._send(200, {"name": f"{path}/{doc_id}", "fields": fields, "createTime": now, "updateTime": now})
+
+        if path == "/api/log":
+            if not payload.get("event_type") or not payload.get("event_category"):
+                return self._send(400, {"error": "Missing required schema fields"})
+            entry = dict(payload, user_id=self._session_uid() or "anonymous")
+            self.store.add("activity_logs", entry)
+            return self._send(200, {"success": True})
+
+        if path == "/api/auth/session":
+            if not payload.get("idToken"):
+                return self._send(401, {"error": "UNAUTHORIZED: idToken missing"})
+            cookie = secrets.token_urlsafe(32)
+            uid = "uid-" + secrets.token_hex(6)
+            with self.store.lock:
+                self.store.sessions[cookie] = uid
+            self.store.add("active_sessions", {"uid": uid, "device": payload.get("deviceInfo", "Unknown Device"),
+                                               "status": "active"})
+            return self._send(200, {"success": True, "message": "Session created successfully"},
+                              headers={"Set-Cookie": f"__session={cookie}; Max-Age=1209600; HttpOnly; Path=/; SameSite=strict"})
+
+        if path == "/api/auth/refreshToken":
+            uid = self._session_uid()
+            if not uid:
+                return self._send(401, {"error": "UNAUTHORIZED: Invalid or expired session"})
+            return self._send(200, {"customToken": secrets.token_urlsafe(48)})
+
+        if path == "/api/auth/logout":
+            return self._send(200, {"success": True, "message": "Session revoked"},
+                              headers={"Set-Cookie": "__session=; Max-Age=0; HttpOnly; Path=/; SameSite=strict"})
+
+        if path == "/api/auth/revokeAll":
+            cookie = _cookies(self.headers.get("Cookie")).get("__session")
+            uid = self.store.sessions.get(cookie)
+            if not uid:
+                return self._send(401, {"error": "No active session"})
+            self.store.write_delay()
+            with self.store.lock:
+                for key in [k for k, v in self.store.sessions.items() if v == uid]:
+                    del self.store.sessions[key]
+            return self._send(200, {"success": True},
+                              headers={"Set-Cookie": "__session=; Max-Age=0; HttpOnly; Path=/; SameSite=strict"})
+
+        self._send(404 if not path.startswith("/api/") else 405, {"error": "Not Found"})
+
+    def _avatar(self):
+        if not (self.headers.get("Authorization") or "").startswith("Bearer "):
+            return self._send(401, {"error": "Unauthorized"})
+        payload = self._body()
+        if payload is None:
+            return self._send(400, {"error": "Invalid JSON"})
+        if not isinstance(payload.get("userId"), str) or not payload["userId"]:
+            return self._send(400, {"error": "Missing or invalid user ID"})
+        if self.command == "DELETE":
+            self.store.add("audit_logs", {"action": "avatar_delete", "userId": payload["userId"]})
+            return self._send(200, {"success": True})
+        photo = payload.get("photoURL")
+        if not isinstance(photo, str) or not photo.startswith("data:"):
+            return self._send(400, {"error": "Missing or invalid photoURL (must be base64 data URI)"})
+        if len(photo.split(",", 1)[-1]) * 3 // 4 > MAX_AVATAR_BYTES:
+            return self._send(413, {"error": "Payload Too Large (Max 2MB)"})
+        if not photo[5:].startswith(ALLOWED_AVATAR_TYPES):
+            return self._send(400, {"error": "Invalid file type. Only JPEG, PNG, and WebP are allowed."})
+        self.store.add("avatars", {"userId": payload["userId"], "bytes": len(photo)})
+        return self._send(200, {"success": True})
+
+    def do_PATCH(self):
+        if self.path.split("?")[0] == "/api/admin/users/avatar":
+            return self._avatar()
+        self._send(405, {"error": "Method Not Allowed"})
+
+    def do_DELETE(self):
+        self.do_PATCH()
+
+def make_server(host="127.0.0.1", port=8089, write_latency_ms=0.0, jitter_ms=0.0):
+    handler = type("Handler", (StandinHandler,), {"store": Store(write_latency_ms, jitter_ms)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline stand-in for the NutriAware API and Firestore write path")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--write-latency-ms", type=float, default=30.0,
+                        help="Mean simulated Firestore write latency per document")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="Std-dev of the simulated write latency")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    server = make_server(args.host, args.port, args.write_latency_ms, args.jitter_ms)
+    print(f"🧪 NutriAware stand-in listening on http://{args.host}:{args.port} "
+          f"(write latency {args.write_latency_ms}±{args.jitter_ms} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,185 @@
+"""
+NutriAware Step Load Shape — Break-Point Detection
+تحميل متدرج لتحديد نقطة الانهيار الفعلية
+
+Ramps users in fixed steps and measures every step on its own: once the
+step's users are spawned and settled, a window of requests is sampled and
+its p95, average, error rate and RPS are compared with THRESHOLDS from
+load_config.py. The first step that violates a threshold is the knee; the
+step before it is the measured safe concurrency, and the highest step RPS
+is the throughput ceiling. The run stops after the knee unless
+--step-continue is given.
+
+Usage / الاستخدام:
+  locust -f locustfile.py,step_load.py --headless --host=https://your-staging.web.app \
+    --step-users 25 --step-duration 60 --step-max-users 500 --step-spawn-rate 10 \
+    --csv=results/nutriaware_steps
+
+  # Offline against standin_server.py
+  NUTRIAWARE_LOAD_OFFLINE=1 locust -f locustfile.py,step_load.py NutriAwareApiUser --headless \
+    --host=http://localhost:8089 --step-users 20 --step-duration 30
+
+-u / -r / -t are ignored while this shape is loaded. With --csv, the step
+table is also written to <prefix>_steps.csv.
+"""
+
+import csv
+import math
+
+from locust import LoadTestShape, events
+from locust.stats import calculate_response_time_percentile
+
+from load_config import THRESHOLDS
+
+# Steps with fewer sampled requests are reported but flagged as low-sample
+MIN_STEP_REQUESTS = 50
+
+@events.init_command_line_parser.add_listener
+def _step_options(parser):
+    parser.add_argument("--step-users", type=int, default=25, include_in_web_ui=True,
+                        help="Users added per step")
+    parser.add_argument("--step-duration", type=float, default=60, include_in_web_ui=True,
+                        help="Seconds per step, ramp included")
+    parser.add_argument("--step-max-users", type=int, default=500, include_in_web_ui=True,
+                        help="Stop after the step that reaches this many users")
+    parser.add_argument("--step-spawn-rate", type=float, default=10, include_in_web_ui=True,
+                        help="Users spawned per second when entering a step")
+    parser.add_argument("--step-settle", type=float, default=5, include_in_web_ui=True,
+                        help="Seconds to wait after the ramp before sampling a step")
+    parser.add_argument("--step-continue", action="store_true", default=False, include_in_web_ui=True,
+                        help="Keep stepping after the knee instead of stopping")
+
+def _snapshot(total, run_time):
+    return {
+        "t": run_time,
+        "requests": total.num_requests,
+        "failures": total.num_failures,
+        "response_time": total.total_response_time,
+        "response_times": dict(total.response_times),
+    }
+
+def step_violations(step):
+    """Threshold violations of one sampled step, as readable strings."""
+    issues = []
+    if step["error_rate"] > THRESHOLDS["max_error_rate"]:
+        issues.append(f"error rate {step['error_rate']:.2%} > {THRESHOLDS['max_error_rate']:.0%}")
+    if step["p95_ms"] > THRESHOLDS["max_p95_ms"]:
+        issues.append(f"p95 {step['p95_ms']:.0f}ms > {THRESHOLDS['max_p95_ms']}ms")
+    if step["avg_ms"] > THRESHOLDS["max_avg_response_ms"]:
+        issues.append(f"avg {step['avg_ms']:.0f}ms > {THRESHOLDS['max_avg_response_ms']}ms")
+    return issues
+
+class StepLoadShape(LoadTestShape):
+    """
+    Step ramp with per-step sampling and knee detection.
+    مراحل متزايدة مع قياس كل مرحلة على حدة
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.steps = []
+        self.knee = None
+        self._current = None
+
+    def reset_time(self):
+        super().reset_time()
+        self.steps, self.knee, self._current = [], None, None
+
+    @property
+    def _options(self):
+        return self.runner.environment.parsed_options
+
+    def _open_step(self, index, users, run_time):
+        ramp = math.ceil(self._options.step_users / self._options.step_spawn_rate)
+        self._current = {"step": index + 1, "users": users, "start_s": run_time,
+                         "sample_from_s": run_time + ramp + self._options.step_settle, "window": None}
+
+    def _close_step(self, run_time, partial=False):
+        current, self._current = self._current, None
+        if current is None or current["window"] is None:
+            return None
+        before, after = current["window"], _snapshot(self.runner.stats.total, run_time)
+        requests = after["requests"] - before["requests"]
+        failures = after["failures"] - before["failures"]
+        window_times = {ms: n - before["response_times"].get(ms, 0)
+                        for ms, n in after["response_times"].items() if n > before["response_times"].get(ms, 0)}
+        completed = sum(window_times.values())
+        seconds = max(after["t"] - before["t"], 1e-9)
+        step = {
+            "step": current["step"],
+            "users": current["users"],
+            "window_s": round(seconds, 1),
+            "requests": requests,
+            "rps": requests / seconds,
+            "error_rate": failures / requests if requests else 0.0,
+            "p95_ms": calculate_response_time_percentile(window_times, completed, 0.95) if completed else 0,
+            "avg_ms": (after["response_time"] - before["response_time"]) / completed if completed else 0.0,
+            "low_sample": requests < MIN_STEP_REQUESTS,
+            "partial": partial,
+        }
+        step["violations"] = step_violations(step)
+        self.steps.append(step)
+        if self.knee is None and step["violations"]:
+            self.knee = step
+        return step
+
+    def tick(self):
+        run_time = self.get_run_time()
+        options = self._options
+        index = int(run_time // options.step_duration)
+
+        if self._current is None or self._current["step"] != index + 1:
+            self._close_step(run_time)
+            users = (index + 1) * options.step_users
+            if (self.knee is not None and not options.step_continue) or users > options.step_max_users:
+                return None
+            self._open_step(index, users, run_time)
+
+        if self._current["window"] is None and run_time >= self._current["sample_from_s"]:
+            self._current["window"] = _snapshot(self.runner.stats.total, run_time)
+
+        return self._current["users"], options.step_spawn_rate
+
+    def finish(self):
+        """Closes a step cut short by --run-time or Ctrl+C and returns the report."""
+        if self._current is not None:
+            self._close_step(self.get_run_time(), partial=True)
+        return self.report()
+
+    def report(self):
+        passing = [s for s in self.steps if self.knee is None or s["step"] < self.knee["step"]]
+        ceiling = max(self.steps, key=lambda s: s["rps"], default=None)
+        return {
+            "steps": self.steps,
+            "break_point_users": self.knee["users"] if self.knee else None,
+            "knee_violations": self.knee["violations"] if self.knee else [],
+            "safe_users": passing[-1]["users"] if passing else 0,
+            "throughput_ceiling_rps": ceiling["rps"] if ceiling else 0.0,
+            "throughput_ceiling_users": ceiling["users"] if ceiling else None,
+        }
+
+    def write_csv(self, path):
+        fields = ["step", "users", "window_s", "requests", "rps", "error_rate", "p95_ms", "avg_ms",
+                  "low_sample", "partial", "violations"]
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            for step in self.steps:
+                writer.writerow(dict(step, rps=f"{step['rps']:.2f}", error_rate=f"{step['error_rate']:.4f}",
+                                     avg_ms=f"{step['avg_ms']:.1f}", violations="; ".join(step["violations"])))
+
+def print_step_report(report):
+    print("\n📈 Step Load / التحميل المتدرج")
+    print(f"{'step':>4} {'users':>6} {'reqs':>7} {'rps':>8} {'err':>7} {'p95 ms':>7} {'avg ms':>7}")
+    for s in report["steps"]:
+        flags = ("  ⚠️ " + ", ".join(s["violations"]) if s["violations"] else "") \
+            + (" (low sample)" if s["low_sample"] else "") + (" (partial)" if s["partial"] else "")
+        print(f"{s['step']:>4} {s['users']:>6} {s['requests']:>7} {s['rps']:>8.1f} {s['error_rate']:>7.2%} "
+              f"{s['p95_ms']:>7.0f} {s['avg_ms']:>7.0f}{flags}")
+
+@events.test_stop.add_listener
+def _write_steps_csv(environment, **kwargs):
+    shape = environment.shape_class
+    prefix = getattr(environment.parsed_options, "csv_prefix", None)
+    if isinstance(shape, StepLoadShape) and shape.steps and prefix:
+        shape.write_csv(f"{prefix}_steps.csv")
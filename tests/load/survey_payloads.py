@@ -0,0 +1,115 @@
+"""
+NutriAware Load Test Payloads
+مولّد بيانات واقعية لاختبار الحمل من مخطط الاستبيان
+
+Builds request bodies for the write path from docs/surveySchema.json:
+  - survey submissions (one answer per schema item/field, shaped like the
+    `project_evaluations` documents written by src/services/evaluation.ts),
+    encoded for the Firestore REST API
+  - /api/log activity events
+  - /api/admin/users/avatar data-URI uploads
+
+Used by locustfile.py (NutriAwareApiUser) and standin_server.py.
+"""
+
+import base64
+import os
+import random
+import sys
+from datetime import datetime, timezone
+
+# Schema loading and the answer vocabulary are shared with the ETL scripts
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "scripts"))
+
+from survey_schema import OPEN_TEXT_WORDS, load_schema  # noqa: E402,F401
+
+# Open-ended answers: a few words to a short paragraph / إجابات مفتوحة بأطوال واقعية
+OPEN_TEXT_WORDS_RANGE = (3, 60)
+
+# /api/log events the client tracker sends (src/services/activityTracker.ts)
+LOG_EVENTS = [
+    ("page_viewed", "navigation"), ("ai_tool_opened", "ai_tool"), ("bmi_calculation", "tool"),
+    ("assessment_started", "assessment"), ("assessment_completed", "assessment"),
+    ("meal_plan_generated", "tool"), ("blog_article_read", "content"), ("knowledge_viewed", "content"),
+]
+
+def _open_text(rng):
+    n = rng.randint(*OPEN_TEXT_WORDS_RANGE)
+    return " ".join(rng.choice(OPEN_TEXT_WORDS) for _ in range(n))
+
+def _field_answer(field, rng):
+    options = field.get("options", [])
+    if not options:
+        return _open_text(rng)
+    if field.get("type") == "checkbox":
+        return rng.sample(options, rng.randint(1, len(options)))
+    return rng.choice(options)
+
+def survey_submission(schema, rng=random):
+    """One complete post-test submission, keyed by section id like the survey page state."""
+    answers = {"_schemaVersion": schema.get("version")}
+    for section in schema.get("sections", []):
+        kind = section.get("type")
+        sid = section["id"]
+        if kind == "consent":
+            answers[sid] = True
+        elif kind in ("demographic", "mixed"):
+            answers[sid] = {f["id"]: _field_answer(f, rng) for f in section.get("fields", [])}
+        elif kind == "likert":
+            top = section.get("scaleLength", 5)
+            answers[sid] = {i["id"]: str(rng.randint(1, top)) for i in section.get("items", [])}
+        elif kind == "binary_checklist":
+            answers[sid] = {i["id"]: rng.randint(0, 1) for i in section.get("items", [])}
+        elif kind == "nps":
+            lo, hi = section["scale"]["min"], section["scale"]["max"]
+            answers[sid] = str(rng.randint(lo, hi))
+        elif kind == "slider_paired":
+            lo, hi = section["scale"]["min"], section["scale"]["max"]
+            answers[sid] = {}
+            for dim in section.get("dimensions", []):
+                before = rng.randint(lo, hi)
+                answers[sid][dim["id"]] = {"before": str(before), "after": str(rng.randint(before, hi))}
+        elif kind == "open":
+            answers[sid] = {i["id"]: _open_text(rng) for i in section.get("items", [])}
+    return answers
+
+def to_firestore_value(value):
+    """Python value -> Firestore REST `Value` (what the web SDK sends on addDoc)."""
+    if isinstance(value, bool):
+        return {"booleanValue": value}
+    if isinstance(value, int):
+        return {"integerValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if value is None:
+        return {"nullValue": None}
+    if isinstance(value, datetime):
+        return {"timestampValue": value.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")}
+    if isinstance(value, dict):
+        return {"mapValue": {"fields": {k: to_firestore_value(v) for k, v in value.items()}}}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [to_firestore_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+def firestore_document(answers, user_agent="Locust-NutriAware-QA/1.0"):
+    """
+    Request body for POST .../documents/project_evaluations. firestore.rules
+    only accepts creates carrying a `createdAt` timestamp.
+    """
+    doc = dict(answers, createdAt=datetime.now(timezone.utc), userAgent=user_agent, language="ar")
+    return {"fields": {k: to_firestore_value(v) for k, v in doc.items()}}
+
+def log_event(rng=random):
+    event_type, category = rng.choice(LOG_EVENTS)
+    return {
+        "event_type": event_type,
+        "event_category": category,
+        "event_metadata": {"path": rng.choice(["/", "/knowledge", "/project-evaluation", "/ai-tools"])},
+        "device_type": rng.choice(["mobile", "mobile", "mobile", "desktop", "tablet"]),
+        "duration_ms": rng.randint(200, 120_000),
+    }
+
+def avatar_data_uri(size_kb, rng=random):
+    """A JPEG-typed data URI of roughly `size_kb` (the avatar API caps uploads at 2MB)."""
+    raw = b"\xff\xd8\xff\xe0" + rng.randbytes(max(0, size_kb * 1024 - 4))
+    return "data:image/jpeg;base64," + base64.b64encode(raw).decode("ascii")